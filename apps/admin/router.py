@@ -0,0 +1,177 @@
+"""Router for the Admin app.
+
+This module provides a FastAPI router for admin-related endpoints.
+"""
+
+import tracemalloc
+from typing import Annotated, Any, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
+
+from apps.auth.models import User
+from apps.auth.utils import get_current_admin_user
+from apps.shared.memory import (
+    StatisticsKey,
+    format_statistics,
+    snapshots,
+    stop_tracing,
+    take_snapshot,
+)
+from apps.shared.profiling import profiles
+from apps.shared.responses import MsgspecJSONResponse
+
+router = APIRouter()
+
+
+@router.get(
+    "/admin/profiles/{profile_id}",
+    response_class=MsgspecJSONResponse,
+    response_model=dict[str, Any],
+)
+async def get_profile(
+    profile_id: str,
+    _: Annotated[User, Depends(get_current_admin_user)],
+    profile_format: Annotated[
+        Literal["speedscope", "collapsed"], Query(alias="format")
+    ] = "speedscope",
+) -> Response:
+    """Gets the profile of a request.
+
+    A request is profiled when an admin user sends it with an `X-Profile: 1` header or
+    a `profile=1` query parameter, the ID of its profile being sent in the
+    `X-Profile-Id` header of its response. Profiles are kept for an hour.
+
+    Args:
+        profile_id (str): The ID of the profile.
+        profile_format (str): The format of the profile, "speedscope" (default, to open
+        in https://speedscope.app) or "collapsed" (stacks for flame graph tools).
+
+    Returns:
+        The profile, as an attachment.
+
+    Raises:
+        HTTPException: If the profile is not found or expired, a 404 Not Found
+        exception is raised.
+    """
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    if profile_format == "collapsed":
+        return PlainTextResponse(
+            profile.to_collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.txt"'},
+        )
+    return MsgspecJSONResponse(
+        profile.to_speedscope(),
+        headers={
+            "Content-Disposition": (
+                f'attachment; filename="{profile_id}.speedscope.json"'
+            )
+        },
+    )
+
+
+@router.post(
+    "/admin/memory/snapshots",
+    status_code=status.HTTP_201_CREATED,
+    response_class=MsgspecJSONResponse,
+    response_model=dict[str, Any],
+)
+def create_memory_snapshot(
+    _: Annotated[User, Depends(get_current_admin_user)],
+    group_by: Annotated[StatisticsKey, Query()] = "lineno",
+    limit: Annotated[int, Query(ge=1, le=1000)] = 20,
+) -> Response:
+    """Takes a tracemalloc snapshot of the memory allocated by the app.
+
+    The memory allocations are traced from the first snapshot on (or from startup if
+    `MEMORY_ACCOUNTING` is set), so that the first snapshot is mostly a baseline to
+    compare the next ones with (see `GET /admin/memory/snapshots/{snapshot_id}`).
+    Snapshots are kept for an hour.
+
+    Args:
+        group_by (StatisticsKey): How the allocations are grouped, by "filename",
+        "lineno" (default) or "traceback".
+        limit (int): The maximum number of groups (defaults to 20).
+
+    Returns:
+        A JSON response with a 201 Created code, containing the ID of the snapshot, the
+        current and peak sizes in bytes of the memory traced, and the groups allocating
+        the most memory.
+    """
+    snapshot_id, snapshot = take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    return MsgspecJSONResponse(
+        {
+            "id": snapshot_id,
+            "current": current,
+            "peak": peak,
+            "statistics": format_statistics(snapshot, group_by, limit),
+        },
+        status_code=status.HTTP_201_CREATED,
+        headers={"Location": f"/admin/memory/snapshots/{snapshot_id}"},
+    )
+
+
+@router.get(
+    "/admin/memory/snapshots/{snapshot_id}",
+    response_class=MsgspecJSONResponse,
+    response_model=dict[str, Any],
+)
+def get_memory_snapshot(
+    snapshot_id: str,
+    _: Annotated[User, Depends(get_current_admin_user)],
+    compare_to: Annotated[str | None, Query()] = None,
+    group_by: Annotated[StatisticsKey, Query()] = "lineno",
+    limit: Annotated[int, Query(ge=1, le=1000)] = 20,
+) -> Response:
+    """Gets the statistics of a tracemalloc snapshot, or its difference with another.
+
+    Args:
+        snapshot_id (str): The ID of the snapshot.
+        compare_to (str | None): The ID of an older snapshot to compare with, if any.
+        group_by (StatisticsKey): How the allocations are grouped, by "filename",
+        "lineno" (default) or "traceback".
+        limit (int): The maximum number of groups (defaults to 20).
+
+    Returns:
+        A JSON response containing the ID of the snapshot, the ID of the snapshot
+        compared with if any, and the groups allocating the most memory, or whose
+        allocated memory changed the most if compared, with their size in bytes and
+        number of blocks (and their changes).
+
+    Raises:
+        HTTPException: If a snapshot is not found or expired, a 404 Not Found exception
+        is raised.
+    """
+    snapshot = snapshots.get(snapshot_id)
+    older = None if compare_to is None else snapshots.get(compare_to)
+    if snapshot is None or (compare_to is not None and older is None):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Snapshot not found"
+        )
+    return MsgspecJSONResponse(
+        {
+            "id": snapshot_id,
+            "compare_to": compare_to,
+            "statistics": format_statistics(snapshot, group_by, limit, older),
+        }
+    )
+
+
+@router.delete("/admin/memory/snapshots", status_code=status.HTTP_204_NO_CONTENT)
+def delete_memory_snapshots(
+    _: Annotated[User, Depends(get_current_admin_user)],
+) -> Response:
+    """Drops the tracemalloc snapshots and stops tracing the memory allocations.
+
+    The allocations keep being traced if `MEMORY_ACCOUNTING` is set.
+
+    Returns:
+        An empty response with a 204 No Content code.
+    """
+    stop_tracing()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
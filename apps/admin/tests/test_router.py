@@ -0,0 +1,117 @@
+"""Tests for the router of the Admin app.
+
+This module contains tests for admin-related endpoints.
+"""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from apps.auth.tests.utils import mock_get_user_by_username
+from apps.auth.utils import create_access_token
+from apps.shared.utils import get_formatted_content
+from main import app
+
+
+def test_get_profile(mocker: MockerFixture) -> None:
+    """Tests the /admin/profiles/<profile_id> endpoint.
+
+    Tests that a request of an admin user asking for it is profiled, that its profile
+    can be downloaded in the speedscope and collapsed formats, and that an unknown
+    profile gets a 404 Not Found.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the user lookups and
+        the admin users.
+    """
+    mock_get_user_by_username(mocker, simulate_match=True)
+    mocker.patch("stargazer.settings.ADMIN_USERNAMES", frozenset({"pabroux"}))
+    token = create_access_token(data={"sub": "pabroux"})
+    headers = {"Authorization": f"Bearer {token}"}
+    client = TestClient(app)
+    resp = client.get("/health?profile=1", headers=headers)
+    assert resp.status_code == status.HTTP_200_OK
+    profile_id = resp.headers["X-Profile-Id"]
+
+    resp = client.get(f"/admin/profiles/{profile_id}", headers=headers)
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["Content-Disposition"] == (
+        f'attachment; filename="{profile_id}.speedscope.json"'
+    )
+    assert resp.json()["profiles"][0]["name"] == "GET /health"
+    resp = client.get(f"/admin/profiles/{profile_id}?format=collapsed", headers=headers)
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["Content-Type"].startswith("text/plain")
+
+    resp = client.get("/admin/profiles/unknown", headers=headers)
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+    assert resp.json() == get_formatted_content(
+        "Profile not found", status.HTTP_404_NOT_FOUND
+    )
+
+
+def test_get_profile_forbidden(mocker: MockerFixture) -> None:
+    """Tests the /admin/profiles/<profile_id> endpoint for a user not admin.
+
+    Tests that the request is not profiled and that the profiles cannot be downloaded,
+    with a 403 Forbidden.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the user lookups.
+    """
+    mock_get_user_by_username(mocker, simulate_match=True)
+    headers = {
+        "Authorization": f"Bearer {create_access_token(data={'sub': 'pabroux'})}"
+    }
+    client = TestClient(app)
+    resp = client.get("/health", headers={"X-Profile": "1", **headers})
+    assert "X-Profile-Id" not in resp.headers
+    resp = client.get("/admin/profiles/unknown", headers=headers)
+    assert resp.status_code == status.HTTP_403_FORBIDDEN
+
+
+def test_memory_snapshots(mocker: MockerFixture) -> None:
+    """Tests the /admin/memory/snapshots endpoints.
+
+    Tests that snapshots of the memory allocated can be taken and compared, that an
+    unknown snapshot gets a 404 Not Found, and that the snapshots can be dropped.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the user lookups and
+        the admin users.
+    """
+    mock_get_user_by_username(mocker, simulate_match=True)
+    mocker.patch("stargazer.settings.ADMIN_USERNAMES", frozenset({"pabroux"}))
+    headers = {
+        "Authorization": f"Bearer {create_access_token(data={'sub': 'pabroux'})}"
+    }
+    client = TestClient(app)
+    try:
+        resp = client.post("/admin/memory/snapshots?limit=5", headers=headers)
+        assert resp.status_code == status.HTTP_201_CREATED
+        first = resp.json()
+        assert resp.headers["Location"] == f"/admin/memory/snapshots/{first['id']}"
+        assert first["peak"] >= first["current"] > 0
+        assert len(first["statistics"]) <= 5
+        memory = bytearray(1 << 20)
+        second_id = client.post("/admin/memory/snapshots", headers=headers).json()["id"]
+
+        resp = client.get(
+            f"/admin/memory/snapshots/{second_id}?compare_to={first['id']}",
+            headers=headers,
+        )
+        assert resp.status_code == status.HTTP_200_OK
+        diff = resp.json()
+        assert (diff["id"], diff["compare_to"]) == (second_id, first["id"])
+        assert diff["statistics"][0]["size_diff"] >= len(memory)
+        resp = client.get(
+            f"/admin/memory/snapshots/{second_id}?compare_to=unknown", headers=headers
+        )
+        assert resp.status_code == status.HTTP_404_NOT_FOUND
+    finally:
+        resp = client.delete("/admin/memory/snapshots", headers=headers)
+    assert resp.status_code == status.HTTP_204_NO_CONTENT
+    resp = client.get(f"/admin/memory/snapshots/{second_id}", headers=headers)
+    assert resp.json() == get_formatted_content(
+        "Snapshot not found", status.HTTP_404_NOT_FOUND
+    )
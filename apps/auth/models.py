@@ -7,6 +7,22 @@ from pydantic import BaseModel
 from sqlmodel import Field, SQLModel
 
 
+class ApiKey(SQLModel, table=True):
+    """API key model in the database (ORM).
+
+    Represents a long-lived API key of a user, used for authentication instead of the
+    OAuth2 password flow. Only the prefix of the key is stored in clear, to look it up,
+    along with a keyed hash (HMAC-SHA256) of the full key.
+    """
+
+    id: int | None = Field(default=None, primary_key=True)
+    prefix: str = Field(unique=True, index=True)
+    hashed_key: str
+    name: str = ""
+    revoked: bool = False
+    user_id: int = Field(foreign_key="user.id", index=True)
+
+
 class Token(BaseModel):
     """Token model for the Auth app.
 
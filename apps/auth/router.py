@@ -37,7 +37,7 @@ async def login_for_access_token(
         HTTPException: If the credentials are incorrect, a 401 Unauthorized
         exception is raised.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await authenticate_user(form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -3,7 +3,21 @@
 This module contains tests for the Auth-related models.
 """
 
-from apps.auth.models import Token, TokenData, User
+from apps.auth.models import ApiKey, Token, TokenData, User
+
+
+def test_api_key() -> None:
+    """Tests the ApiKey model.
+
+    Tests that the ApiKey model is correctly initialized.
+    """
+    api_key = ApiKey(id=1, prefix="prefix", hashed_key="hashed_key", user_id=1)
+    assert api_key.id == 1
+    assert api_key.prefix == "prefix"
+    assert api_key.hashed_key == "hashed_key"
+    assert api_key.name == ""
+    assert not api_key.revoked
+    assert api_key.user_id == 1
 
 
 def test_token() -> None:
@@ -135,3 +135,26 @@ def test_login_for_access_token_invalid_input(mocker: MockerFixture) -> None:
         assert response_json == get_formatted_content(
             "Invalid input", status.HTTP_422_UNPROCESSABLE_ENTITY
         )
+
+
+def test_login_for_access_token_overloaded(mocker: MockerFixture) -> None:
+    """Tests the /login_for_access_token endpoint when overloaded.
+
+    Tests the response is a 503 Service Unavailable with a `Retry-After` header when
+    too many passwords are being verified.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+    """
+
+    # Mock the `get_user_by_username` function
+    mock_get_user_by_username(mocker, simulate_match=True)
+    mocker.patch("apps.auth.utils.password_tasks", 10**6)
+
+    response = client.post("/token", data=fake_data)
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers["retry-after"] == "1"
+    assert response.json() == get_formatted_content(
+        "Too many authentications in progress", status.HTTP_503_SERVICE_UNAVAILABLE
+    )
@@ -6,7 +6,7 @@ This module provides test utility functions for the Auth app.
 from pytest_mock import MockerFixture
 
 from apps.auth.models import User
-from apps.auth.utils import get_password_hash
+from apps.auth.utils import get_password_hash, invalidate_user
 
 
 def mock_get_user_by_username(
@@ -16,6 +16,7 @@ def mock_get_user_by_username(
 
     Mocks the `get_user_by_username` function in the `apps.auth.utils` context.
     This mock is used in tests to avoid having to create a user in the database.
+    The cached users are invalidated, so that the mock is queried.
 
     Args:
         mocker (MockerFixture): The mocker fixture used to mock the function.
@@ -36,4 +37,5 @@ def mock_get_user_by_username(
         else None
     )
     mocker.patch("apps.auth.utils.get_user_by_username", return_value=user)
+    invalidate_user()
     return user
@@ -3,36 +3,156 @@
 This module provides utility functions for authenticating users.
 """
 
+import hmac
+from collections.abc import Callable
 from datetime import datetime, timedelta, timezone
-from typing import Annotated, Literal
+from functools import cache, partial
+from hashlib import sha256
+from secrets import token_hex, token_urlsafe
+from time import time
+from typing import Annotated, Any, Literal, TypeVar
 
+import anyio
 import bcrypt
 import jwt
+import sniffio
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jwt.exceptions import InvalidTokenError
-from sqlalchemy.exc import OperationalError
-from sqlmodel import Session, create_engine, select
-
-from apps.auth.models import TokenData, User
+from sqlalchemy import event, make_url, not_
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.orm.attributes import get_history
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.auth.models import ApiKey, TokenData, User
+from apps.shared.cache import TTLCache
+from apps.shared.metrics import collectors
+from apps.shared.tracing import traced
+from apps.shared.utils import handle_database_errors
 from stargazer import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-database_url = settings.DATABASE_URL
-connect_args = {
-    "check_same_thread": False  # Use the same database in different threads
+T = TypeVar("T")
+
+# Leading part of API keys, formatted as `sgz_<prefix>_<secret>`
+API_KEY_PREFIX = "sgz_"
+
+# Number of seconds an invalid API key remains in cache, kept short as the keys created
+# by other processes are only accepted once it expires
+INVALID_API_KEY_TTL = 5.0
+
+# Asynchronous drivers of the supported databases
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
 }
 
-engine = create_engine(database_url, connect_args=connect_args)
 
+def get_async_database_url(url: str) -> str:
+    """Gets the URL of a database with an asynchronous driver.
+
+    Replaces the default driver of the URL (e.g. `sqlite:///`) with its asynchronous
+    counterpart (e.g. `sqlite+aiosqlite:///`). URLs with an explicit driver are kept.
+
+    Args:
+        url (str): The URL of the database.
+
+    Returns:
+        str: The URL of the database with an asynchronous driver.
+    """
+    parsed_url = make_url(url)
+    if parsed_url.drivername in ASYNC_DRIVERS:
+        parsed_url = parsed_url.set(drivername=ASYNC_DRIVERS[parsed_url.drivername])
+    return parsed_url.render_as_string(hide_password=False)
+
+
+def set_sqlite_pragmas(dbapi_connection: Any, _: Any) -> None:
+    """Sets the pragmas of a new SQLite connection.
+
+    Enables the write-ahead log (WAL), so that readers do not block on writers, with
+    the synchronous mode recommended for it.
+
+    Args:
+        dbapi_connection (Any): The DBAPI connection just created.
+        _ (Any): The connection record of the pool.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@cache
+def get_engine() -> AsyncEngine:
+    """Gets the engine of the database, created on first use.
 
-def authenticate_user(username: str, password: str) -> User | Literal[False]:
+    The engine, and the driver of the database it imports, are thus kept off the import
+    of the app.
+
+    Returns:
+        AsyncEngine: The engine of the database set by `DATABASE_URL`.
+    """
+    database_url = get_async_database_url(settings.DATABASE_URL)
+    connect_args: dict[str, Any] = {}
+    if database_url.startswith("sqlite"):
+        # Keep more compiled statements in the cache of each connection
+        connect_args["cached_statements"] = 256
+    elif database_url.startswith("postgresql+asyncpg"):
+        # Keep more prepared statements in the cache of each connection
+        connect_args["prepared_statement_cache_size"] = 256
+
+    pool_args: dict[str, Any] = {}
+    if make_url(database_url).database not in (None, "", ":memory:"):
+        # In-memory SQLite databases live in a single connection (StaticPool), which
+        # takes no pool sizes
+        pool_args["pool_size"] = settings.DATABASE_POOL_SIZE
+        pool_args["max_overflow"] = settings.DATABASE_POOL_MAX_OVERFLOW
+
+    engine = create_async_engine(
+        database_url,
+        connect_args=connect_args,
+        pool_pre_ping=not database_url.startswith("sqlite"),
+        **pool_args,
+    )
+    if engine.url.get_backend_name() == "sqlite":
+        event.listen(engine.sync_engine, "connect", set_sqlite_pragmas)
+    return engine
+
+
+# Verified tokens, keyed by their SHA-256 digest, with their username and expiration time
+token_cache: TTLCache[bytes, tuple[str, float]] = TTLCache(
+    settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL
+)
+# User records, keyed by username
+user_cache: TTLCache[str, User] = TTLCache(
+    settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL
+)
+# Invalid API keys, keyed by their SHA-256 digest, not to query the database again
+invalid_api_key_cache: TTLCache[bytes, bool] = TTLCache(
+    settings.AUTH_CACHE_SIZE, min(settings.AUTH_CACHE_TTL, INVALID_API_KEY_TTL)
+)
+collectors.append(partial(token_cache.collect, "tokens"))
+collectors.append(partial(user_cache.collect, "users"))
+collectors.append(partial(invalid_api_key_cache.collect, "invalid_api_keys"))
+# Incremented on each invalidation, so that a lookup started before is not cached
+user_cache_version = 0  # pylint: disable=invalid-name
+api_key_cache_version = 0  # pylint: disable=invalid-name
+
+# Limiters of the worker threads running password hashing, by asynchronous library
+password_limiters: dict[str, anyio.CapacityLimiter] = {}
+# Number of password hashing tasks running or waiting for a worker thread
+password_tasks = 0  # pylint: disable=invalid-name
+
+
+async def authenticate_user(username: str, password: str) -> User | Literal[False]:
     """Authenticates a user.
 
     Authenticates a user using the provided username and password. If the
     username does not exist or the password is incorrect, the function returns
-    False. Otherwise, the user object is returned.
+    False. Otherwise, the user object is returned. The password is verified in
+    a worker thread, so that the event loop is not blocked.
 
     Args:
         username (str): The username of the user to authenticate.
@@ -41,9 +161,15 @@ def authenticate_user(username: str, password: str) -> User | Literal[False]:
     Returns:
         User | bool: The user object if the user is authenticated, False
         otherwise.
+
+    Raises:
+        HTTPException: If too many passwords are being verified, a 503 Service
+        Unavailable exception is raised.
     """
-    user = get_user_by_username(username)
-    if not user or not verify_password(password, user.hashed_password):
+    user = await get_user_by_username(username)
+    if not user or not await run_password_task(
+        verify_password, password, user.hashed_password
+    ):
         return False
     return user
 
@@ -80,14 +206,75 @@ def create_access_token(
     return encoded_jwt
 
 
+def create_api_key() -> tuple[str, str, str]:
+    """Creates an API key for authentication.
+
+    Generates a random API key, formatted as `sgz_<prefix>_<secret>`. The prefix is
+    stored in clear to look the key up, while the key itself is only stored hashed.
+
+    Returns:
+        tuple[str, str, str]: The API key, to give once to its owner, its prefix and its
+        hashed version, to store in the database.
+    """
+    prefix = token_hex(6)
+    api_key = f"{API_KEY_PREFIX}{prefix}_{token_urlsafe(32)}"
+    return api_key, prefix, hash_api_key(api_key)
+
+
+@traced("db.api_key")
+async def get_api_key_username(api_key: str) -> str | None:
+    """Retrieves the username of the owner of an API key.
+
+    Looks the API key up by its prefix, then compares its hashed version with the stored
+    one in constant time. Invalid API keys are cached for a few seconds (at most the
+    time set by the `AUTH_CACHE_TTL` environment variable), so that a client retrying
+    with one does not query the database each time, until an API key is created or
+    changed through the ORM.
+
+    Args:
+        api_key (str): The API key to validate.
+
+    Returns:
+        str | None: The username of the owner of the API key if the key is valid and not
+        revoked, otherwise None.
+
+    Raises:
+        HTTPException: If unable to connect to the database, a 503 Service
+        Unavailable exception is raised.
+    """
+    api_key_digest = sha256(api_key.encode()).digest()
+    if invalid_api_key_cache.get(api_key_digest):
+        return None
+    version = api_key_cache_version
+    prefix = api_key.removeprefix(API_KEY_PREFIX).partition("_")[0]
+    with handle_database_errors():
+        async with AsyncSession(get_engine()) as session:
+            statement = (
+                select(ApiKey.hashed_key, User.username)
+                .join(User)
+                .where(ApiKey.prefix == prefix, not_(col(ApiKey.revoked)))
+            )
+            row = (await session.exec(statement)).first()
+    if row is None or not hmac.compare_digest(row[0], hash_api_key(api_key)):
+        if version == api_key_cache_version:
+            invalid_api_key_cache.set(api_key_digest, True)
+        return None
+    return row[1]
+
+
+@traced("auth")
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> User:
     """Retrieves the current user based on the provided bearer token.
 
     Validates the provided JWT token, extracts the username from the payload, and
-    retrieves the corresponding user object from the database.
+    retrieves the corresponding user object from the database. An API key (i.e. starting
+    with `sgz_`) is accepted as bearer token too. Verified tokens, API keys and user
+    objects are cached for the time set by the `AUTH_CACHE_TTL` environment variable, so
+    that repeat requests need neither a signature check nor a database query.
 
     Args:
-        token: The bearer token to validate and extract the user information from.
+        token: The bearer token (JWT or API key) to validate and extract the user
+        information from.
 
     Returns:
         User: The user object associated with the provided bearer token.
@@ -101,19 +288,32 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]) -> Use
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM],
-        )
-        username = payload.get("sub")
-        if username is None:
+    token_digest = sha256(token.encode()).digest()
+    cached_token = token_cache.get(token_digest)
+    if cached_token is not None and cached_token[1] > time():
+        username = cached_token[0]
+    elif token.startswith(API_KEY_PREFIX):
+        api_key_username = await get_api_key_username(token)
+        if api_key_username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
-    except InvalidTokenError as exc:
-        raise credentials_exception from exc
-    user = get_user_by_username(token_data.username)
+        username = api_key_username
+        token_cache.set(token_digest, (username, float("inf")))
+    else:
+        try:
+            payload = jwt.decode(
+                token,
+                settings.JWT_SECRET_KEY,
+                algorithms=[settings.JWT_ALGORITHM],
+            )
+            subject = payload.get("sub")
+            if subject is None:
+                raise credentials_exception
+            token_data = TokenData(username=subject)
+        except InvalidTokenError as exc:
+            raise credentials_exception from exc
+        username = token_data.username
+        token_cache.set(token_digest, (username, payload.get("exp", float("inf"))))
+    user = await get_cached_user_by_username(username)
     if user is None:
         raise credentials_exception
     return user
@@ -145,6 +345,82 @@ async def get_current_active_user(
     return current_user
 
 
+async def get_current_admin_user(
+    current_user: Annotated[User, Depends(get_current_active_user)],
+) -> User:
+    """Retrieves the current admin user.
+
+    Checks if the current active user is one of the admin users set by the
+    `ADMIN_USERNAMES` environment variable.
+
+    Args:
+        current_user (User): The user object retrieved from the authentication
+        dependency.
+
+    Returns:
+        User: The admin user object.
+
+    Raises:
+        HTTPException: If the user is not an admin, a 403 Forbidden exception is raised.
+    """
+    if current_user.username not in settings.ADMIN_USERNAMES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required",
+        )
+    return current_user
+
+
+async def is_admin_authorization(authorization: str) -> bool:
+    """Checks whether an `Authorization` header authenticates an active admin user.
+
+    Used outside of the dependencies of the routes (e.g. by a middleware), so that the
+    failures are reported rather than raised.
+
+    Args:
+        authorization (str): The value of the `Authorization` header, e.g. "Bearer
+        <token>".
+
+    Returns:
+        bool: Whether the header holds a valid bearer token (JWT or API key) of an
+        active user set by the `ADMIN_USERNAMES` environment variable.
+    """
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        user = await get_current_user(token)
+    except HTTPException:
+        return False
+    return not user.disabled and user.username in settings.ADMIN_USERNAMES
+
+
+async def get_cached_user_by_username(username: str) -> User | None:
+    """Retrieves a user by the username, through the user cache.
+
+    Gets the user object from the cache if present, otherwise from the database, and
+    caches it for the time set by the `AUTH_CACHE_TTL` environment variable. A user
+    invalidated while being retrieved from the database is not cached.
+
+    Args:
+        username (str): The username to search for.
+
+    Returns:
+        User | None: The user object if found, otherwise None.
+
+    Raises:
+        HTTPException: If unable to connect to the database, a 503 Service
+        Unavailable exception is raised.
+    """
+    user = user_cache.get(username)
+    if user is None:
+        version = user_cache_version
+        user = await get_user_by_username(username)
+        if user is not None and version == user_cache_version:
+            user_cache.set(username, user)
+    return user
+
+
 def get_password_hash(password: str) -> str:
     """Gets the hashed version of the provided password using bcrypt.
 
@@ -164,11 +440,13 @@ def get_password_hash(password: str) -> str:
     return hashed_password_enc.decode()
 
 
-def get_user_by_username(username: str) -> User | None:
+@traced("db.user")
+async def get_user_by_username(username: str) -> User | None:
     """Retrieves a user by the username.
 
     Queries the database to retrieve a user object based on the
-    provided username. If the user is not found, it returns None.
+    provided username, without blocking the event loop. If the user
+    is not found, it returns None.
 
     Args:
         username (str): The username to search for.
@@ -180,16 +458,142 @@ def get_user_by_username(username: str) -> User | None:
         HTTPException: If unable to connect to the database, a 503 Service
         Unavailable exception is raised.
     """
-    try:
-        with Session(engine) as session:
+    with handle_database_errors():
+        async with AsyncSession(get_engine()) as session:
             statement = select(User).where(User.username == username)
-            user = session.exec(statement).first()
+            user = (await session.exec(statement)).first()
             return user
-    except OperationalError as exc:
+
+
+def hash_api_key(api_key: str) -> str:
+    """Gets the hashed version of the provided API key using HMAC-SHA256.
+
+    API keys are random and long, so a fast keyed hash is enough to protect them,
+    unlike passwords that need a slow hash (i.e. bcrypt).
+
+    Args:
+        api_key (str): The API key to be hashed.
+
+    Returns:
+        str: The hashed API key as a hexadecimal string.
+    """
+    return hmac.new(
+        settings.API_KEY_SECRET_KEY.encode(), api_key.encode(), sha256
+    ).hexdigest()
+
+
+def invalidate_user(username: str | None = None) -> None:
+    """Invalidates the cached user object of a user.
+
+    Must be called whenever a user is changed (e.g. disabled), so that the change takes
+    effect on the next request. Changes made through the ORM in the app process call it
+    automatically; other processes see the change once the cached object expires.
+
+    Args:
+        username (str | None): The username of the user to invalidate, or None to
+        invalidate all the users.
+    """
+    global user_cache_version  # pylint: disable=global-statement
+    user_cache_version += 1
+    if username is None:
+        user_cache.clear()
+    else:
+        user_cache.pop(username)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def invalidate_changed_user(_: Any, __: Any, target: User) -> None:
+    """Invalidates the cached user object of a user changed through the ORM.
+
+    Args:
+        _ (Any): The mapper of the `User` model.
+        __ (Any): The connection used to flush the change.
+        target (User): The user changed, whose former usernames are invalidated too.
+    """
+    invalidate_user(target.username)
+    for username in get_history(target, "username").deleted:
+        invalidate_user(username)
+
+
+def clear_invalid_api_keys() -> None:
+    """Clears the cached invalid API keys.
+
+    Invalid API keys are keyed by their digest, so all of them are cleared whenever an
+    API key is created or changed, for the change to take effect on the next request.
+    """
+    global api_key_cache_version  # pylint: disable=global-statement
+    api_key_cache_version += 1
+    invalid_api_key_cache.clear()
+
+
+@event.listens_for(ApiKey, "after_insert")
+def invalidate_created_api_key(_: Any, __: Any, ___: ApiKey) -> None:
+    """Clears the cached invalid API keys when an API key is created through the ORM.
+
+    Args:
+        _ (Any): The mapper of the `ApiKey` model.
+        __ (Any): The connection used to flush the change.
+        ___ (ApiKey): The API key created.
+    """
+    clear_invalid_api_keys()
+
+
+@event.listens_for(ApiKey, "after_update")
+@event.listens_for(ApiKey, "after_delete")
+def invalidate_changed_api_key(_: Any, __: Any, ___: ApiKey) -> None:
+    """Invalidates the verified tokens when an API key is changed through the ORM.
+
+    Verified tokens are keyed by their digest, so all of them are invalidated for the
+    change (e.g. a revocation) to take effect on the next request. The cached invalid
+    API keys are cleared too (e.g. for a key restored).
+
+    Args:
+        _ (Any): The mapper of the `ApiKey` model.
+        __ (Any): The connection used to flush the change.
+        ___ (ApiKey): The API key changed.
+    """
+    token_cache.clear()
+    clear_invalid_api_keys()
+
+
+async def run_password_task(func: Callable[..., T], *args: str) -> T:
+    """Runs a password hashing task (e.g. `verify_password`) in a worker thread.
+
+    At most `PASSWORD_HASHING_WORKERS` tasks run at once, as bcrypt is CPU-bound, and
+    at most `PASSWORD_HASHING_QUEUE_SIZE` more wait for a worker thread. Beyond that,
+    the task is rejected rather than queued, so that logins fail fast under overload.
+
+    Args:
+        func (Callable[..., T]): The password hashing function to run.
+        *args (str): The arguments of the function.
+
+    Returns:
+        T: The result of the function.
+
+    Raises:
+        HTTPException: If too many tasks are running or waiting, a 503 Service
+        Unavailable exception is raised.
+    """
+    global password_tasks  # pylint: disable=global-statement
+    max_tasks = settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_QUEUE_SIZE
+    if password_tasks >= max_tasks:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail="Database not available",
-        ) from exc
+            detail="Too many authentications in progress",
+            headers={"Retry-After": "1"},
+        )
+    library = sniffio.current_async_library()
+    limiter = password_limiters.get(library)
+    if limiter is None:
+        limiter = password_limiters[library] = anyio.CapacityLimiter(
+            settings.PASSWORD_HASHING_WORKERS
+        )
+    password_tasks += 1
+    try:
+        return await anyio.to_thread.run_sync(func, *args, limiter=limiter)
+    finally:
+        password_tasks -= 1
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
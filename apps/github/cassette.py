@@ -0,0 +1,217 @@
+"""Recording and replay of the GitHub API responses.
+
+This module contains HTTPX transports recording the responses of the GitHub API into a
+cassette, and serving them back without network, with their recorded latencies. A
+cassette is a Zstandard-compressed MessagePack file, in which each distinct body is
+stored once, keyed by its digest, so that the pages fetched again and again take no
+more room.
+"""
+
+import os
+from collections import defaultdict, deque
+from hashlib import blake2b
+from pathlib import Path
+from time import perf_counter
+
+import anyio
+import httpx
+import msgspec
+import zstandard
+
+from stargazer import settings
+
+# Headers describing the encoding of a body on the wire, dropped as bodies are recorded
+# decoded
+WIRE_HEADERS = frozenset(
+    {"connection", "content-encoding", "content-length", "transfer-encoding"}
+)
+
+
+class Interaction(msgspec.Struct, frozen=True):  # pylint: disable=too-few-public-methods
+    """Request made to the GitHub API and its response, as recorded.
+
+    The headers of the request (e.g. the token) are not recorded.
+    """
+
+    method: str
+    target: str
+    status: int
+    headers: list[tuple[str, str]]
+    body: str
+    latency: float
+
+
+class Cassette(msgspec.Struct):
+    """Interactions with the GitHub API, in order of recording, and their bodies."""
+
+    interactions: list[Interaction] = msgspec.field(default_factory=list)
+    bodies: dict[str, bytes] = msgspec.field(default_factory=dict)
+
+    def add(
+        self, request: httpx.Request, response: httpx.Response, latency: float
+    ) -> None:
+        """Adds an interaction, storing its body unless already stored.
+
+        Args:
+            request (httpx.Request): The request.
+            response (httpx.Response): The response, whose body is read.
+            latency (float): The number of seconds until the body was received.
+        """
+        digest = blake2b(response.content, digest_size=16).hexdigest()
+        self.bodies.setdefault(digest, response.content)
+        self.interactions.append(
+            Interaction(
+                method=request.method,
+                target=request.url.raw_path.decode("ascii"),
+                status=response.status_code,
+                headers=[
+                    (name, value)
+                    for name, value in response.headers.items()
+                    if name not in WIRE_HEADERS
+                ],
+                body=digest,
+                latency=latency,
+            )
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "Cassette":
+        """Loads a cassette from a file.
+
+        Args:
+            path (str | Path): The path of the cassette.
+
+        Returns:
+            Cassette: The cassette.
+        """
+        data = zstandard.ZstdDecompressor().decompress(Path(path).read_bytes())
+        return msgspec.msgpack.decode(data, type=cls)
+
+    def save(self, path: str | Path) -> None:
+        """Saves the cassette to a file, replacing it at once.
+
+        Args:
+            path (str | Path): The path of the cassette.
+        """
+        path = Path(path)
+        data = zstandard.ZstdCompressor(level=10).compress(msgspec.msgpack.encode(self))
+        # Unique to the process, as each worker process saves its own cassette
+        temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        temporary.write_bytes(data)
+        temporary.replace(path)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """HTTPX transport recording the responses of another transport into a cassette.
+
+    The transport is meant to be shared by the clients, which do not close it, so that
+    the interactions of all of them end up in the same cassette, saved by `save`.
+    """
+
+    def __init__(
+        self, path: str | Path, transport: httpx.AsyncBaseTransport | None = None
+    ):
+        self.path = Path(path)
+        self.transport = transport or httpx.AsyncHTTPTransport()
+        self.cassette = Cassette()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Sends a request through the wrapped transport and records its response.
+
+        Args:
+            request (httpx.Request): The request.
+
+        Returns:
+            httpx.Response: The response, with its body read.
+        """
+        start = perf_counter()
+        response = await self.transport.handle_async_request(request)
+        try:
+            content = await response.aread()
+        finally:
+            await response.aclose()
+        # Served decoded, as recorded
+        recorded = httpx.Response(
+            response.status_code,
+            headers=[
+                (name, value)
+                for name, value in response.headers.items()
+                if name not in WIRE_HEADERS
+            ],
+            content=content,
+        )
+        self.cassette.add(request, recorded, perf_counter() - start)
+        return recorded
+
+    async def aclose(self) -> None:
+        """Keeps the transport open, as it is shared by the clients."""
+
+    def save(self) -> None:
+        """Saves the cassette recorded so far."""
+        self.cassette.save(self.path)
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """HTTPX transport serving the responses recorded in a cassette, without network.
+
+    The responses to a request are served in order of recording, the last one being
+    served again once all were. Each response is delayed by its recorded latency,
+    multiplied by a time scale (e.g. 0 to serve them at once).
+    """
+
+    def __init__(self, cassette: Cassette, time_scale: float = 1.0):
+        self.cassette = cassette
+        self.time_scale = time_scale
+        self.interactions: defaultdict[tuple[str, str], deque[Interaction]] = (
+            defaultdict(deque)
+        )
+        for interaction in cassette.interactions:
+            self.interactions[interaction.method, interaction.target].append(
+                interaction
+            )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        """Serves the recorded response to a request.
+
+        Args:
+            request (httpx.Request): The request.
+
+        Returns:
+            httpx.Response: The recorded response.
+
+        Raises:
+            httpx.ConnectError: If no response to the request was recorded, an
+            httpx.ConnectError is raised, as if the GitHub API were unreachable.
+        """
+        target = request.url.raw_path.decode("ascii")
+        interactions = self.interactions.get((request.method, target))
+        if not interactions:
+            raise httpx.ConnectError(
+                f"No recorded response to {request.method} {target}", request=request
+            )
+        interaction = (
+            interactions.popleft() if len(interactions) > 1 else interactions[0]
+        )
+        await anyio.sleep(interaction.latency * self.time_scale)
+        return httpx.Response(
+            interaction.status,
+            headers=interaction.headers,
+            content=self.cassette.bodies[interaction.body],
+        )
+
+
+def get_transport() -> httpx.AsyncBaseTransport | None:
+    """Gets the transport of the GitHub API set by the `GITHUB_CASSETTE` variable.
+
+    Returns:
+        httpx.AsyncBaseTransport | None: The recording or replay transport, or None to
+        send the requests over the network.
+    """
+    if settings.GITHUB_CASSETTE == "record":
+        return RecordingTransport(settings.GITHUB_CASSETTE_FILE)
+    if settings.GITHUB_CASSETTE == "replay":
+        return ReplayTransport(
+            Cassette.load(settings.GITHUB_CASSETTE_FILE),
+            settings.GITHUB_CASSETTE_TIME_SCALE,
+        )
+    return None
@@ -6,9 +6,9 @@ This module contains exceptions for the GitHub app.
 from typing import Any
 
 from fastapi import FastAPI, status
-from fastapi.responses import JSONResponse
 from starlette.requests import Request
 
+from apps.shared.responses import MsgspecJSONResponse
 from apps.shared.utils import get_formatted_content
 
 
@@ -22,7 +22,7 @@ class GitHubException(Exception):
         self.detail = detail
 
 
-async def github_exception_handler(_: Request, exc: Any) -> JSONResponse:
+async def github_exception_handler(_: Request, exc: Any) -> MsgspecJSONResponse:
     """Handles GitHubException and returns a formatted response.
 
     For any GitHubException, the app returns a JSON response with a formatted
@@ -33,9 +33,9 @@ async def github_exception_handler(_: Request, exc: Any) -> JSONResponse:
         exc (Any): The exception instance.
 
     Returns:
-        JSONResponse: A JSON response with a formatted content.
+        MsgspecJSONResponse: A JSON response with a formatted content.
     """
-    return JSONResponse(
+    return MsgspecJSONResponse(
         status_code=status.HTTP_502_BAD_GATEWAY,
         content=get_formatted_content(
             "Bad Gateway for GitHub API",
@@ -0,0 +1,100 @@
+"""Index for the GitHub app.
+
+This module contains an in-memory index of the repositories starred by the GitHub users
+fetched, along with its reverse, from the repositories to their known stargazers.
+"""
+
+from collections import defaultdict
+
+from apps.shared.cache import TTLCache
+
+
+class StarIndex:
+    """Index of the repositories starred by GitHub users, and of their known stargazers.
+
+    The lists of starred repositories are kept in a bounded cache whose entries expire
+    after a time to live. Each list also tells which users starred each of its
+    repositories, which is kept in a reverse index from the repositories to their
+    known stargazers, updated as the lists enter and leave the cache.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.starred: TTLCache[str, list[str]] = TTLCache(
+            max_size, ttl, on_evict=self._unlink
+        )
+        self._stargazers: defaultdict[str, dict[str, None]] = defaultdict(dict)
+
+    def add(self, stargazer: str, repos: list[str], ttl: float | None = None) -> None:
+        """Adds the repositories starred by a user to the index.
+
+        Args:
+            stargazer (str): The user who starred the repositories.
+            repos (list[str]): The names of the starred repositories, in the format
+            "user/repo".
+            ttl (float | None): The number of seconds the repositories remain indexed
+            (defaults to the time to live of the index).
+        """
+        self.starred.set(stargazer, repos, ttl)
+        for repo in repos:
+            self._stargazers[repo][stargazer] = None
+
+    def clear(self) -> None:
+        """Removes all the entries of the index."""
+        self.starred.clear()
+        self._stargazers.clear()
+
+    def get(self, stargazer: str) -> list[str] | None:
+        """Gets the repositories starred by a user.
+
+        Args:
+            stargazer (str): The user to look up.
+
+        Returns:
+            list[str] | None: The names of the repositories starred by the user if
+            indexed and not expired, otherwise None.
+        """
+        return self.starred.get(stargazer)
+
+    def has(self, stargazer: str) -> bool:
+        """Checks whether the repositories starred by a user are indexed.
+
+        Unlike `get`, the check does not count as a hit or a miss of the cache.
+
+        Args:
+            stargazer (str): The user to look up.
+
+        Returns:
+            bool: Whether the repositories starred by the user are indexed and not
+            expired.
+        """
+        return self.starred.time_to_live(stargazer) > 0
+
+    def stargazers(self, repo: str) -> list[str]:
+        """Gets the known stargazers of a repository.
+
+        Args:
+            repo (str): The name of the repository, in the format "user/repo".
+
+        Returns:
+            list[str]: The users whose indexed starred repositories include the
+            repository, in order of indexing.
+        """
+        return [
+            stargazer
+            for stargazer in self._stargazers.get(repo, ())
+            if self.has(stargazer)
+        ]
+
+    def _unlink(self, stargazer: str, repos: list[str]) -> None:
+        """Removes the repositories starred by a user leaving the index from the reverse.
+
+        Args:
+            stargazer (str): The user who starred the repositories.
+            repos (list[str]): The names of the starred repositories.
+        """
+        for repo in repos:
+            stargazers = self._stargazers.get(repo)
+            if stargazers is not None:
+                stargazers.pop(stargazer, None)
+                if not stargazers:
+                    del self._stargazers[repo]
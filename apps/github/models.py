@@ -0,0 +1,36 @@
+"""Models for the GitHub app.
+
+This module contains the models used to decode GitHub API payloads. Only the fields
+used by the app are declared, so that every other field of a payload is skipped by
+the decoder instead of being materialized as Python objects.
+"""
+
+import msgspec
+
+
+class GitHubUser(msgspec.Struct, frozen=True, gc=False):  # pylint: disable=too-few-public-methods
+    """GitHub user model.
+
+    Represents a user as returned by the GitHub API (e.g. a stargazer or the owner
+    of a repository). `starred_at` is only sent when the star media type is requested.
+    """
+
+    login: str
+    starred_at: str | None = None
+
+
+class GitHubRepo(msgspec.Struct, frozen=True, gc=False):  # pylint: disable=too-few-public-methods
+    """GitHub repository model.
+
+    Represents a repository as returned by the GitHub API. `starred_at` is only sent
+    when the star media type is requested.
+    """
+
+    name: str
+    owner: GitHubUser
+    starred_at: str | None = None
+
+    @property
+    def full_name(self) -> str:
+        """Gets the full name of the repository, in the format "user/repo"."""
+        return f"{self.owner.login}/{self.name}"
@@ -3,81 +3,186 @@
 This module provides a FastAPI router for GitHub-API-related endpoints.
 """
 
-from collections import defaultdict
 from typing import Annotated, Any
 
-import httpx
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 
-from apps.auth.models import User
-from apps.auth.utils import get_current_active_user
-from apps.github.utils import fetch_stargazers, fetch_starred_repos
+from apps.github.utils import (
+    CallCounter,
+    NeighboursView,
+    cache_neighbours,
+    compute_starneighbours,
+    create_github_client,
+    explore_starneighbours,
+    get_cached_neighbours,
+    get_rate_limit,
+    neighbours_cache,
+    neighbours_gate,
+    neighbours_peak_memory,
+    neighbours_query_pages,
+    rate_limiter,
+)
+from apps.shared.admission import PRIORITY_BACKGROUND
+from apps.shared.compression import PrecompressedBody
+from apps.shared.memory import peak_memory_tracker
+from apps.shared.ratelimit import RateLimit
+from apps.shared.responses import MsgspecJSONResponse, json_encoder
+from apps.shared.tracing import tracer
+from apps.shared.utils import is_not_modified
 from stargazer import settings
 
 router = APIRouter()
 
 
-@router.get("/repos/{user}/{repo}/starneighbours")
+@router.get(
+    "/repos/{user}/{repo}/starneighbours",
+    response_class=MsgspecJSONResponse,
+    response_model=list[dict[str, Any]],
+)
 async def get_starneighbours(
     user: str,
     repo: str,
-    _: Annotated[User, Depends(get_current_active_user)],
-) -> list[dict[str, Any]]:
+    request: Request,
+    rate_limit: Annotated[RateLimit, Depends(get_rate_limit)],
+    view: Annotated[NeighboursView, Query()] = "full",
+) -> Response:
     """Gets star neighbours for a given GitHub repository.
 
     Retrieves a list of repositories that are starred by at least one stargazer of the
     requested repository, along with a list of stargazers of those repositories that also
-    starred the requested repository.
+    starred the requested repository. With `view=counts`, only the number of those
+    stargazers is sent, which makes the response much smaller.
+
+    The encoded result is cached for the time set by the `NEIGHBOURS_CACHE_TTL`
+    environment variable, along with its compressed variants, so that repeat hits are
+    sent as is. The cache is shared by all the users, as the result does not depend on
+    the user making the request, and by all the worker processes if a shared cache is
+    set (see `SHARED_CACHE_FILE`).
+
+    Each user has a bucket of requests and a budget of GitHub API calls, charged by the
+    calls actually made (i.e. none for a cached result). Once either is exhausted, the
+    user gets a 429 Too Many Requests response with a `Retry-After` header. The quotas
+    left are reported in the `X-RateLimit-*` headers.
+
+    At most `ADMISSION_MAX_CONCURRENCY` results are computed at once, the others
+    waiting in a short queue. Once the queue is full, or after waiting for
+    `ADMISSION_QUEUE_TIMEOUT` seconds, the request gets a 503 Service Unavailable
+    response with a `Retry-After` header.
+
+    The stargazers of the repository known from the repositories they starred, as
+    fetched by previous computations, are taken into account too, and only the lists
+    missing locally are fetched. The `X-Index-Coverage` header reports the share of
+    the stargazers whose starred repositories were known locally (1 if cached).
+
+    If the memory allocations are traced (see `MEMORY_ACCOUNTING`), the peak memory
+    allocated by the computation is observed.
+
+    The response carries a strong `ETag` and a `Cache-Control` matching the remaining time
+    in cache. Once the user is authenticated, a request whose `If-None-Match` header
+    matches the `ETag` gets a 304 Not Modified response, without body.
+
+    Args:
+        user (str): The user who owns the repository.
+        repo (str): The name of the repository.
+        request (Request): The request, whose `Accept-Encoding` and `If-None-Match`
+        headers are taken into account.
+        rate_limit (RateLimit): The quotas left to the user making the request.
+        view (NeighboursView): The view of the result, "full" (default) or "counts".
+
+    Returns:
+        A JSON response containing a list of dictionaries, where each dictionary contains
+        the name of a repository starred by at least one stargazer of the requested
+        repository, along with a list of stargazers of that repository that also starred
+        the requested repository (`{"repo": <str>, "stargazers": [<str>, ...]}`) or their
+        number (`{"repo": <str>, "count": <int>}`). The list is sorted by the number of
+        stargazers in descending order. If not modified, an empty 304 Not Modified response.
+    """
+    key = (user, repo, view)
+    result = get_cached_neighbours(key)
+    coverage = 1.0
+    if result is None:
+        # Use Httpx to make asynchronous requests, counted to charge the user
+        counter = CallCounter()
+        with peak_memory_tracker.track(neighbours_peak_memory):
+            async with (
+                neighbours_gate.admit(),
+                create_github_client(counter) as client,
+            ):
+                try:
+                    neighbours, coverage = await compute_starneighbours(
+                        client, user, repo, view
+                    )
+                finally:
+                    neighbours_query_pages.observe(counter.calls, "neighbours")
+                    await rate_limiter.charge(rate_limit, counter.calls)
+            with tracer.span("serialize"):
+                result = PrecompressedBody(json_encoder.encode(neighbours))
+        cache_neighbours(key, result)
+    encoding = result.negotiate(request.headers.get("accept-encoding"))
+    max_age = int(neighbours_cache.time_to_live(key))
+    headers = {
+        "Cache-Control": f"max-age={max_age}, must-revalidate",
+        "ETag": result.etag(encoding),
+        "Vary": "Accept-Encoding",
+        "X-Index-Coverage": f"{coverage:.2f}",
+        **rate_limit.headers,
+    }
+    if is_not_modified(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return MsgspecJSONResponse(await result.variant(encoding), headers=headers)
+
+
+@router.get(
+    "/repos/{user}/{repo}/starneighbours/graph",
+    response_class=MsgspecJSONResponse,
+    response_model=dict[str, Any],
+)
+async def get_starneighbours_graph(
+    user: str,
+    repo: str,
+    rate_limit: Annotated[RateLimit, Depends(get_rate_limit)],
+    depth: Annotated[int, Query(ge=1, le=settings.GRAPH_MAX_DEPTH)] = 2,
+) -> Response:
+    """Gets the star neighbourhood of a given GitHub repository, up to a number of hops.
+
+    Explores the co-star graph from the requested repository, best-first: the
+    repositories sharing the most stargazers with it are expanded first, keeping at
+    most `GRAPH_FANOUT` neighbours each. The score of a repository is the product of
+    the overlaps along the best path from the requested repository, an overlap being
+    the share of the sampled stargazers of a repository who starred its neighbour.
+
+    The lists of stargazers and of starred repositories fetched are cached and reused
+    by the next explorations. The exploration stops expanding before it could make
+    more than `GRAPH_MAX_CALLS` GitHub API calls, or the calls left to the user, in
+    which case the result is marked as truncated. The calls made are charged to the
+    user, and the computation goes through the same admission control as the star
+    neighbours, whose computations are admitted first when waiting, as they are far
+    cheaper.
 
     Args:
         user (str): The user who owns the repository.
         repo (str): The name of the repository.
-        _ (User): The user making the request.
+        rate_limit (RateLimit): The quotas left to the user making the request.
+        depth (int): The maximum number of hops from the requested repository (defaults
+        to 2, at most `GRAPH_MAX_DEPTH`).
 
     Returns:
-        A list of dictionaries, where each dictionary contains the name of a repository
-        starred by at least one stargazer of the requested repository, along with a list of
-        stargazers of that repository that also starred the requested repository. The returned
-        list is sorted by the number of stargazers in descending order.
+        A JSON response containing the `nodes` (`{"repo": <str>, "depth": <int>,
+        "score": <float>}`, the requested repository first), the `edges`
+        (`[<source>, <target>, <overlap>]`, by index in the nodes) and whether the
+        exploration was `truncated` by the budget of calls.
     """
-    # Use Httpx to make asynchronous requests
-    async with httpx.AsyncClient() as client:
-        # Fecth stargazers
-        stargazers = []
-        page = 1
-        while page <= settings.GITHUB_MAX_PAGE_REPO:
-            stargazers_chunk, has_next = await fetch_stargazers(
-                client, user, repo, page
-            )
-            stargazers.extend(stargazers_chunk)
-            # Stop if no more pages to fetch
-            if not has_next:
-                break
-            page += 1
-
-        # Build neighbor relationships
-        neighbors = defaultdict(list)
-        for stargazer in stargazers:
-            stargazer_stars = []
-            page = 1
-            while page <= settings.GITHUB_MAX_PAGE_STARGAZER:
-                stars_chunk, has_next = await fetch_starred_repos(
-                    client, stargazer, page
-                )
-                stargazer_stars.extend(stars_chunk)
-                # Stop if no more pages to fetch
-                if not has_next:
-                    break
-                page += 1
-
-            for starred_repo in stargazer_stars:
-                neighbors[starred_repo].append(stargazer)
-
-    return sorted(
-        [
-            {"repo": repo_name, "stargazers": stargazers_list}
-            for repo_name, stargazers_list in neighbors.items()
-        ],
-        key=lambda x: len(x["stargazers"]),
-        reverse=True,
-    )
+    # Use Httpx to make asynchronous requests, counted to enforce the budget
+    counter = CallCounter(min(settings.GRAPH_MAX_CALLS, rate_limit.calls))
+    async with (
+        neighbours_gate.admit(PRIORITY_BACKGROUND),
+        create_github_client(counter) as client,
+    ):
+        try:
+            graph = await explore_starneighbours(client, counter, user, repo, depth)
+        finally:
+            neighbours_query_pages.observe(counter.calls, "graph")
+            await rate_limiter.charge(rate_limit, counter.calls)
+    return MsgspecJSONResponse(graph, headers=rate_limit.headers)
@@ -0,0 +1,152 @@
+"""Snapshot of the caches of the GitHub app.
+
+This module contains the dump of the in-memory caches of the GitHub app (the encoded
+star neighbour results, with their compressed variants, and the lists of stargazers and
+of starred repositories) to a file on shutdown, and their load from it on startup, so
+that a restarted app serves warm results at once. The snapshot is a MessagePack file,
+decoded straight from a memory map of it. Expiration times are stored as wall-clock
+times, so that the entries expire as if the app had not been restarted.
+"""
+
+import logging
+import mmap
+import os
+from pathlib import Path
+from time import time
+
+import msgspec
+
+from apps.github.utils import (
+    NeighboursView,
+    neighbours_cache,
+    star_index,
+    stargazers_cache,
+)
+from apps.shared.compression import PrecompressedBody
+
+logger = logging.getLogger(__name__)
+
+# Version of the layout of the snapshots, those of another version being ignored
+SNAPSHOT_VERSION = 1
+
+
+class NeighboursEntry(msgspec.Struct, array_like=True, gc=False):  # pylint: disable=too-few-public-methods
+    """Encoded star neighbours of a repository, with their compressed variants."""
+
+    user: str
+    repo: str
+    view: NeighboursView
+    body: bytes
+    variants: dict[str, bytes]
+    expires: float
+
+
+class StargazersEntry(msgspec.Struct, array_like=True, gc=False):  # pylint: disable=too-few-public-methods
+    """Stargazers of a repository."""
+
+    user: str
+    repo: str
+    stargazers: list[str]
+    expires: float
+
+
+class StarredEntry(msgspec.Struct, array_like=True, gc=False):  # pylint: disable=too-few-public-methods
+    """Repositories starred by a user."""
+
+    stargazer: str
+    repos: list[str]
+    expires: float
+
+
+class Snapshot(msgspec.Struct):  # pylint: disable=too-few-public-methods
+    """Entries of the caches of the GitHub app, from the least recently used."""
+
+    version: int = SNAPSHOT_VERSION
+    neighbours: list[NeighboursEntry] = msgspec.field(default_factory=list)
+    stargazers: list[StargazersEntry] = msgspec.field(default_factory=list)
+    starred: list[StarredEntry] = msgspec.field(default_factory=list)
+
+
+def save_snapshot(path: str | Path) -> int:
+    """Dumps the entries of the caches not expired to a file, replacing it at once.
+
+    Args:
+        path (str | Path): The path of the snapshot.
+
+    Returns:
+        int: The number of entries dumped.
+    """
+    now = time()
+    snapshot = Snapshot(
+        neighbours=[
+            NeighboursEntry(user, repo, view, result.body, result.variants, now + ttl)
+            for (user, repo, view), result, ttl in neighbours_cache.items()
+        ],
+        stargazers=[
+            StargazersEntry(user, repo, stargazers, now + ttl)
+            for (user, repo), stargazers, ttl in stargazers_cache.items()
+        ],
+        starred=[
+            StarredEntry(stargazer, repos, now + ttl)
+            for stargazer, repos, ttl in star_index.starred.items()
+        ],
+    )
+    path = Path(path)
+    # Unique to the process, as each worker process dumps its own caches
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    temporary.write_bytes(msgspec.msgpack.encode(snapshot))
+    temporary.replace(path)
+    entries = (
+        len(snapshot.neighbours) + len(snapshot.stargazers) + len(snapshot.starred)
+    )
+    logger.info("Dumped %d cache entries to %s", entries, path)
+    return entries
+
+
+def load_snapshot(path: str | Path) -> int:
+    """Loads the entries of the caches not expired from a file, if any.
+
+    A snapshot that cannot be decoded (e.g. of another version) is ignored, the caches
+    starting empty.
+
+    Args:
+        path (str | Path): The path of the snapshot.
+
+    Returns:
+        int: The number of entries loaded.
+    """
+    try:
+        with (
+            open(path, "rb") as file,
+            mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer,
+        ):
+            snapshot = msgspec.msgpack.decode(buffer, type=Snapshot)
+    except FileNotFoundError:
+        return 0
+    except (ValueError, msgspec.DecodeError) as exc:
+        logger.warning("Ignoring the cache snapshot %s: %s", path, exc)
+        return 0
+    if snapshot.version != SNAPSHOT_VERSION:
+        logger.warning("Ignoring the cache snapshot %s: version mismatch", path)
+        return 0
+
+    now = time()
+    entries = 0
+    for neighbours in snapshot.neighbours:
+        if (ttl := neighbours.expires - now) > 0:
+            result = PrecompressedBody(neighbours.body)
+            result.variants.update(neighbours.variants)
+            key = (neighbours.user, neighbours.repo, neighbours.view)
+            neighbours_cache.set(key, result, ttl)
+            entries += 1
+    for stargazers in snapshot.stargazers:
+        if (ttl := stargazers.expires - now) > 0:
+            key_repo = (stargazers.user, stargazers.repo)
+            stargazers_cache.set(key_repo, stargazers.stargazers, ttl)
+            entries += 1
+    for starred in snapshot.starred:
+        if (ttl := starred.expires - now) > 0:
+            star_index.add(starred.stargazer, starred.repos, ttl)
+            entries += 1
+    logger.info("Loaded %d cache entries from %s", entries, path)
+    return entries
@@ -0,0 +1,92 @@
+"""Tests for the cassettes of the GitHub app.
+
+This module contains tests for the recording and replay of the responses of the GitHub
+API.
+"""
+
+import gzip
+from pathlib import Path
+from time import perf_counter
+
+import httpx
+import msgspec
+import pytest
+
+from apps.github.cassette import (
+    Cassette,
+    Interaction,
+    RecordingTransport,
+    ReplayTransport,
+)
+
+
+@pytest.mark.anyio
+async def test_recording_transport(tmp_path: Path) -> None:
+    """Tests the RecordingTransport and ReplayTransport classes.
+
+    Tests that the responses are recorded decoded, with their headers but without the
+    ones of the request, that identical bodies are stored once, and that the saved
+    cassette is replayed in order of recording, without network.
+    """
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        page = request.url.params["page"]
+        return httpx.Response(
+            200,
+            headers={"Content-Encoding": "gzip", "X-RateLimit-Remaining": page},
+            content=gzip.compress(b'[{"login": "pabroux"}]'),
+        )
+
+    path = tmp_path / "github.cassette"
+    transport = RecordingTransport(path, httpx.MockTransport(handler))
+    async with httpx.AsyncClient(transport=transport) as client:
+        urls = [
+            f"https://api.github.com/repos/pabroux/unvx/stargazers?page={page}"
+            for page in (1, 2, 1)
+        ]
+        for url in urls:
+            resp = await client.get(url, headers={"Authorization": "Bearer secret"})
+            assert resp.json() == [{"login": "pabroux"}]
+    transport.save()
+    assert [item.name for item in tmp_path.iterdir()] == ["github.cassette"]
+
+    cassette = Cassette.load(path)
+    assert len(cassette.interactions) == 3
+    assert len(cassette.bodies) == 1
+    interaction = cassette.interactions[0]
+    assert interaction.target == "/repos/pabroux/unvx/stargazers?page=1"
+    assert ("x-ratelimit-remaining", "1") in interaction.headers
+    assert "content-encoding" not in dict(interaction.headers)
+    assert b"secret" not in msgspec.msgpack.encode(cassette)
+
+    replay = ReplayTransport(cassette, time_scale=0)
+    async with httpx.AsyncClient(transport=replay) as client:
+        for url in urls:
+            resp = await client.get(url)
+            assert resp.json() == [{"login": "pabroux"}]
+            assert resp.headers["X-RateLimit-Remaining"] == url[-1]
+        # The last response recorded is served again
+        resp = await client.get(urls[0])
+        assert resp.headers["X-RateLimit-Remaining"] == "1"
+        with pytest.raises(httpx.ConnectError, match="No recorded response"):
+            await client.get("https://api.github.com/users/pabroux/starred")
+
+
+@pytest.mark.anyio
+async def test_replay_transport_time_scale() -> None:
+    """Tests the ReplayTransport class with a time scale.
+
+    Tests that each response is delayed by its recorded latency, scaled.
+    """
+    cassette = Cassette(
+        [Interaction("GET", "/users/pabroux/starred", 200, [], "empty", 0.1)],
+        {"empty": b"[]"},
+    )
+    async with httpx.AsyncClient(
+        transport=ReplayTransport(cassette, time_scale=0.5)
+    ) as client:
+        start = perf_counter()
+        resp = await client.get("https://api.github.com/users/pabroux/starred")
+        elapsed = perf_counter() - start
+    assert resp.json() == []
+    assert 0.05 <= elapsed < 0.1
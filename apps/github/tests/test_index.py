@@ -0,0 +1,51 @@
+"""Tests for the index of the GitHub app.
+
+This module contains tests for the index of the repositories starred by GitHub users.
+"""
+
+from pytest_mock import MockerFixture
+
+from apps.github.index import StarIndex
+
+
+def test_star_index() -> None:
+    """Tests the StarIndex class.
+
+    Tests that the repositories starred by a user can be added and got, and that the
+    users are known as stargazers of each of them, in order of indexing.
+    """
+    index = StarIndex(max_size=10, ttl=60)
+    assert index.get("pabroux") is None
+    assert not index.has("pabroux")
+    index.add("pabroux", ["pabroux/unvx", "pabroux/ai-forge"])
+    index.add("Sulfyderz", ["pabroux/unvx"])
+    assert index.get("pabroux") == ["pabroux/unvx", "pabroux/ai-forge"]
+    assert index.has("Sulfyderz")
+    assert index.stargazers("pabroux/unvx") == ["pabroux", "Sulfyderz"]
+    assert index.stargazers("pabroux/ai-forge") == ["pabroux"]
+    assert not index.stargazers("unknown/repo")
+    index.clear()
+    assert index.get("pabroux") is None
+    assert not index.stargazers("pabroux/unvx")
+
+
+def test_star_index_eviction(mocker: MockerFixture) -> None:
+    """Tests the eviction of the StarIndex class.
+
+    Tests that a user is no longer known as a stargazer once the repositories it
+    starred are replaced, evicted or expired.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+    """
+    mock_monotonic = mocker.patch("apps.shared.cache.monotonic", return_value=0.0)
+    index = StarIndex(max_size=2, ttl=60)
+    index.add("pabroux", ["pabroux/unvx", "pabroux/ai-forge"])
+    index.add("pabroux", ["pabroux/unvx"])
+    assert not index.stargazers("pabroux/ai-forge")
+    index.add("Sulfyderz", ["pabroux/unvx"])
+    index.add("octocat", ["octocat/hello-world"])
+    assert index.stargazers("pabroux/unvx") == ["Sulfyderz"]
+    mock_monotonic.return_value = 60.0
+    assert not index.stargazers("octocat/hello-world")
+    assert index.get("octocat") is None
@@ -0,0 +1,41 @@
+"""Tests for the GitHub app models.
+
+This module contains tests for the models used to decode GitHub API payloads.
+"""
+
+import msgspec
+
+from apps.github.models import GitHubRepo, GitHubUser
+
+
+def test_github_user() -> None:
+    """Tests the GitHubUser model.
+
+    Tests that the GitHubUser model only keeps the declared fields of a payload,
+    `starred_at` included when present.
+    """
+    user = msgspec.json.decode(
+        b'{"login": "user", "id": 1, "site_admin": false}', type=GitHubUser
+    )
+    assert user.login == "user"
+    assert user.starred_at is None
+    user = msgspec.json.decode(
+        b'{"login": "user", "starred_at": "2025-03-23T00:00:00Z"}', type=GitHubUser
+    )
+    assert user.starred_at == "2025-03-23T00:00:00Z"
+
+
+def test_github_repo() -> None:
+    """Tests the GitHubRepo model.
+
+    Tests that the GitHubRepo model only keeps the declared fields of a payload and
+    that `full_name` is in the format "user/repo".
+    """
+    repo = msgspec.json.decode(
+        b'{"id": 1, "name": "repo", "owner": {"login": "user", "id": 2}, "topics": []}',
+        type=GitHubRepo,
+    )
+    assert repo.name == "repo"
+    assert repo.owner == GitHubUser(login="user")
+    assert repo.starred_at is None
+    assert repo.full_name == "user/repo"
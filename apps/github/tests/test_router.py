@@ -3,16 +3,25 @@
 This module contains tests for GitHub-related endpoints.
 """
 
+from collections.abc import Callable
+
+import anyio
+import httpx
 import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 from pytest_mock import MockerFixture
 
+from apps.auth.utils import get_current_active_user
 from apps.github.tests.utils import (
+    clear_caches,
     client_get_without_oauth,
     mock_get_starneighbours_fetch_stargazers,
     mock_get_starneighbours_fetch_starred_repos,
+    override_get_current_active_user,
 )
+from apps.github.utils import neighbours_gate, rate_limiter
+from apps.shared.ratelimit import MemoryRateLimitBackend, Quota
 from apps.shared.utils import get_formatted_content
 from main import app
 
@@ -26,6 +35,7 @@ def test_get_starneighbours(mocker: MockerFixture) -> None:
     Tests the response is a 200 OK with a JSON body similar to
     `[{"repo": <str>, "stargazers": [ <str>, ...]}, ...]`.
     """
+    clear_caches()
 
     mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux", "Sulfyderz"])
     mock_get_starneighbours_fetch_starred_repos(
@@ -38,6 +48,237 @@ def test_get_starneighbours(mocker: MockerFixture) -> None:
     ]
     assert resp.status_code == status.HTTP_200_OK
     assert resp.json() == output_expected
+    assert resp.headers["X-Index-Coverage"] == "0.00"
+
+
+def test_get_starneighbours_counts(mocker: MockerFixture) -> None:
+    """Tests the /repos/<user>/<repo>/starneighbours endpoint with `view=counts`.
+
+    Tests the response is a 200 OK with a JSON body similar to
+    `[{"repo": <str>, "count": <int>}, ...]`, and that an unknown view gets a 422
+    Unprocessable Entity.
+    """
+    clear_caches()
+
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux", "Sulfyderz"])
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    url = "/repos/pabroux/unvx/starneighbours"
+    resp = client_get_without_oauth(client, f"{url}?view=counts")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json() == [{"repo": "pabroux/unvx", "count": 2}]
+    resp_full = client_get_without_oauth(client, url)
+    assert resp_full.json() == [
+        {"repo": "pabroux/unvx", "stargazers": ["pabroux", "Sulfyderz"]}
+    ]
+    resp_invalid = client_get_without_oauth(client, f"{url}?view=invalid")
+    assert resp_invalid.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_starneighbours_cached(mocker: MockerFixture) -> None:
+    """Tests the /repos/<user>/<repo>/starneighbours endpoint on a repeat hit.
+
+    Tests that a repeat hit is served from the cache, without querying the GitHub API
+    again, with the same JSON body as the first hit and a full local coverage.
+    """
+    clear_caches()
+
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux"])
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    resp = client_get_without_oauth(client, "/repos/pabroux/unvx/starneighbours")
+    mock_fetch_stargazers = mocker.patch("apps.github.utils.fetch_stargazers")
+    resp_cached = client_get_without_oauth(client, "/repos/pabroux/unvx/starneighbours")
+    assert resp_cached.status_code == status.HTTP_200_OK
+    assert resp_cached.content == resp.content
+    assert resp_cached.json() == [{"repo": "pabroux/unvx", "stargazers": ["pabroux"]}]
+    assert resp_cached.headers["X-Index-Coverage"] == "1.00"
+    mock_fetch_stargazers.assert_not_called()
+
+
+def test_get_starneighbours_compressed(mocker: MockerFixture) -> None:
+    """Tests the /repos/<user>/<repo>/starneighbours endpoint with compression.
+
+    Tests that a large response is compressed with the negotiated encoding, and that
+    a repeat hit reuses the compressed variant of the cached result.
+    """
+    clear_caches()
+
+    stargazers = [f"stargazer-{i}" for i in range(100)]
+    mock_get_starneighbours_fetch_stargazers(mocker, content=stargazers)
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    resp = client.get(
+        "/repos/pabroux/unvx/starneighbours",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED
+    headers = {"Accept-Encoding": "gzip"}
+    resp = client_get_without_oauth(
+        client, "/repos/pabroux/unvx/starneighbours", headers
+    )
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert resp.json() == [{"repo": "pabroux/unvx", "stargazers": stargazers}]
+    mock_compress = mocker.patch("apps.shared.compression.compress")
+    resp_cached = client_get_without_oauth(
+        client, "/repos/pabroux/unvx/starneighbours", headers
+    )
+    assert resp_cached.headers["content-encoding"] == "gzip"
+    assert resp_cached.json() == resp.json()
+    mock_compress.assert_not_called()
+
+
+def test_get_starneighbours_not_modified(mocker: MockerFixture) -> None:
+    """Tests the /repos/<user>/<repo>/starneighbours endpoint with `If-None-Match`.
+
+    Tests that the response carries an `ETag` and a `Cache-Control`, and that a repeat
+    hit whose `If-None-Match` matches the `ETag` gets a 304 Not Modified without body,
+    whereas an unauthenticated one still gets a 401 Unauthorized.
+    """
+    clear_caches()
+
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux"])
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    url = "/repos/pabroux/unvx/starneighbours"
+    resp = client_get_without_oauth(client, url)
+    etag = resp.headers["etag"]
+    assert resp.headers["cache-control"].startswith("max-age=")
+    resp_not_modified = client_get_without_oauth(client, url, {"If-None-Match": etag})
+    assert resp_not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert resp_not_modified.headers["etag"] == etag
+    assert not resp_not_modified.content
+    resp_modified = client_get_without_oauth(client, url, {"If-None-Match": '"other"'})
+    assert resp_modified.status_code == status.HTTP_200_OK
+    assert resp_modified.content == resp.content
+    resp_unauthorized = client.get(url, headers={"If-None-Match": etag})
+    assert resp_unauthorized.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_get_starneighbours_rate_limited(mocker: MockerFixture) -> None:
+    """Tests the /repos/<user>/<repo>/starneighbours endpoint under rate limiting.
+
+    Tests that the quotas left are reported in the `X-RateLimit-*` headers, and that a
+    user who made too many requests gets a 429 Too Many Requests with a `Retry-After`
+    header.
+    """
+    clear_caches()
+    mocker.patch.object(rate_limiter, "backend", MemoryRateLimitBackend())
+    mocker.patch.object(rate_limiter, "requests", Quota(capacity=1, rate=0.1))
+
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux"])
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    resp = client_get_without_oauth(client, "/repos/pabroux/unvx/starneighbours")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.headers["X-RateLimit-Limit"] == "1"
+    assert resp.headers["X-RateLimit-Remaining"] == "0"
+    assert "X-RateLimit-Calls-Remaining" in resp.headers
+    resp_limited = client_get_without_oauth(
+        client, "/repos/pabroux/unvx/starneighbours"
+    )
+    assert resp_limited.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert resp_limited.headers["Retry-After"] == "10"
+    assert resp_limited.json() == get_formatted_content(
+        "Rate limit exceeded", status.HTTP_429_TOO_MANY_REQUESTS
+    )
+
+
+def test_get_starneighbours_overloaded(mocker: MockerFixture) -> None:
+    """Tests the /repos/<user>/<repo>/starneighbours endpoint under overload.
+
+    Tests that a request whose result is not cached gets a 503 Service Unavailable
+    with a `Retry-After` header once the computations are all busy and the queue is
+    full, while a cached result is still sent.
+    """
+    clear_caches()
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux"])
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    resp_cached = client_get_without_oauth(client, "/repos/pabroux/unvx/starneighbours")
+    mocker.patch.object(neighbours_gate, "running", neighbours_gate.max_concurrency)
+    mocker.patch.object(neighbours_gate, "queue_size", 0)
+    resp = client_get_without_oauth(client, "/repos/pabroux/ai-forge/starneighbours")
+    assert resp.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert "Retry-After" in resp.headers
+    resp = client_get_without_oauth(client, "/repos/pabroux/unvx/starneighbours")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.content == resp_cached.content
+
+
+@pytest.mark.anyio
+async def test_get_starneighbours_priority(mocker: MockerFixture) -> None:
+    """Tests the admission of the star neighbours and graph endpoints under load.
+
+    Tests that a star neighbours computation waiting for a slot is admitted before a
+    graph exploration that was waiting before it.
+    """
+    clear_caches()
+    admitted = []
+
+    async def compute(*_: object) -> tuple[list[object], float]:
+        admitted.append("neighbours")
+        return [], 1.0
+
+    async def explore(*_: object) -> dict[str, object]:
+        admitted.append("graph")
+        return {}
+
+    mocker.patch("apps.github.router.compute_starneighbours", compute)
+    mocker.patch("apps.github.router.explore_starneighbours", explore)
+    mocker.patch.object(neighbours_gate, "max_concurrency", 1)
+    app.dependency_overrides[get_current_active_user] = override_get_current_active_user
+    release = anyio.Event()
+
+    async def hold() -> None:
+        async with neighbours_gate.admit():
+            await release.wait()
+
+    async def wait_until(predicate: Callable[[], bool]) -> None:
+        while not predicate():
+            await anyio.sleep(0)
+
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with (
+            httpx.AsyncClient(transport=transport, base_url="http://test") as http,
+            anyio.create_task_group() as task_group,
+        ):
+            task_group.start_soon(hold)
+            await wait_until(lambda: neighbours_gate.running == 1)
+            url = "/repos/pabroux/unvx/starneighbours"
+            task_group.start_soon(http.get, f"{url}/graph")
+            await wait_until(lambda: neighbours_gate.queued == 1)
+            task_group.start_soon(http.get, url)
+            await wait_until(lambda: neighbours_gate.queued == 2)
+            release.set()
+    finally:
+        app.dependency_overrides.clear()
+    assert admitted == ["neighbours", "graph"]
+
+
+def test_get_starneighbours_graph(mocker: MockerFixture) -> None:
+    """Tests the /repos/<user>/<repo>/starneighbours/graph endpoint.
+
+    Tests the response is a 200 OK with a JSON body similar to
+    `{"nodes": [{"repo": <str>, "depth": <int>, "score": <float>}, ...], "edges":
+    [[<int>, <int>, <float>], ...], "truncated": <bool>}`, and that a depth beyond
+    `GRAPH_MAX_DEPTH` gets a 422 Unprocessable Entity.
+    """
+    clear_caches()
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux"])
+    mock_get_starneighbours_fetch_starred_repos(
+        mocker, content=["pabroux/unvx", "pabroux/ai-forge"]
+    )
+    url = "/repos/pabroux/unvx/starneighbours/graph"
+    resp = client_get_without_oauth(client, f"{url}?depth=1")
+    assert resp.status_code == status.HTTP_200_OK
+    assert resp.json() == {
+        "nodes": [
+            {"repo": "pabroux/unvx", "depth": 0, "score": 1.0},
+            {"repo": "pabroux/ai-forge", "depth": 1, "score": 1.0},
+        ],
+        "edges": [[0, 1, 1.0]],
+        "truncated": False,
+    }
+    assert "X-RateLimit-Calls-Remaining" in resp.headers
+    resp_invalid = client_get_without_oauth(client, f"{url}?depth=99")
+    assert resp_invalid.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
 
 
 def test_get_starneighbours_invalid_token() -> None:
@@ -0,0 +1,68 @@
+"""Tests for the snapshot of the GitHub app.
+
+This module contains tests for the dump of the caches of the GitHub app to a file and
+their load from it.
+"""
+
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from apps.github.snapshot import load_snapshot, save_snapshot
+from apps.github.tests.utils import clear_caches
+from apps.github.utils import neighbours_cache, star_index, stargazers_cache
+from apps.shared.compression import PrecompressedBody
+
+
+def test_snapshot(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the save_snapshot and load_snapshot functions.
+
+    Tests that the entries of the caches are restored with their compressed variants
+    and the rest of their time to live, and that the expired ones are skipped.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+        tmp_path (Path): A temporary directory.
+    """
+    mock_time = mocker.patch("apps.github.snapshot.time", return_value=1000.0)
+    clear_caches()
+    result = PrecompressedBody(b'[{"repo": "pabroux/unvx"}]')
+    result.variants["gzip"] = b"compressed"
+    neighbours_cache.set(("pabroux", "unvx", "full"), result, ttl=60)
+    neighbours_cache.set(("pabroux", "unvx", "counts"), result, ttl=10)
+    stargazers_cache.set(("pabroux", "unvx"), ["pabroux", "octocat"], ttl=60)
+    star_index.add("octocat", ["pabroux/unvx"], ttl=60)
+    path = tmp_path / "cache.snapshot"
+    assert save_snapshot(path) == 4
+    assert [item.name for item in tmp_path.iterdir()] == ["cache.snapshot"]
+
+    clear_caches()
+    mock_time.return_value = 1030.0
+    assert load_snapshot(path) == 3
+    restored = neighbours_cache.get(("pabroux", "unvx", "full"))
+    assert restored is not None
+    assert restored.body == result.body
+    assert restored.variants == {"gzip": b"compressed"}
+    assert 29 < neighbours_cache.time_to_live(("pabroux", "unvx", "full")) <= 30
+    assert neighbours_cache.get(("pabroux", "unvx", "counts")) is None
+    assert stargazers_cache.get(("pabroux", "unvx")) == ["pabroux", "octocat"]
+    assert star_index.get("octocat") == ["pabroux/unvx"]
+    clear_caches()
+
+
+def test_snapshot_invalid(tmp_path: Path) -> None:
+    """Tests the load_snapshot function with a missing or corrupt file.
+
+    Tests that the caches start empty rather than the app failing to start.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    clear_caches()
+    path = tmp_path / "cache.snapshot"
+    assert load_snapshot(path) == 0
+    path.write_bytes(b"\x93not a snapshot")
+    assert load_snapshot(path) == 0
+    path.write_bytes(b"")
+    assert load_snapshot(path) == 0
+    assert not list(neighbours_cache.items())
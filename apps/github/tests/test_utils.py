@@ -3,16 +3,86 @@
 This module contains tests for utility functions dedicated to query GitHub API.
 """
 
+from pathlib import Path
+from unittest.mock import AsyncMock
+
 import pytest
-from httpx import AsyncClient
+from httpx import AsyncClient, MockTransport, Request, Response
 from pytest_mock import MockerFixture
 
 from apps.github.exceptions import GitHubException
-from apps.github.tests.utils import mock_async_client_get
-from apps.github.utils import fetch_stargazers, fetch_starred_repos, get_github_headers
+from apps.github.tests.utils import (
+    clear_caches,
+    mock_async_client_get,
+    mock_get_starneighbours_fetch_stargazers,
+    mock_get_starneighbours_fetch_starred_repos,
+)
+from apps.github.utils import (
+    CallCounter,
+    NeighboursView,
+    aggregate_starneighbours,
+    cache_neighbours,
+    compute_starneighbours,
+    decode_payload,
+    explore_starneighbours,
+    fetch_all_stargazers,
+    fetch_all_starred_repos,
+    fetch_stargazers,
+    fetch_starred_repos,
+    get_cached_neighbours,
+    get_github,
+    get_github_headers,
+    get_starred_repos,
+    github_rate_limit_remaining,
+    github_request_duration,
+    neighbours_cache,
+    star_index,
+    stargazers_cache,
+    stargazers_decoder,
+)
+from apps.shared.compression import PrecompressedBody
+from apps.shared.sharedcache import SharedCache
 from stargazer import settings
 
 
+@pytest.mark.anyio
+async def test_call_counter() -> None:
+    """Tests the `CallCounter` class.
+
+    Tests that the requests made by a client, failed ones included, are counted, and
+    that the budget only allows the requests left.
+    """
+
+    def handler(request: Request) -> Response:
+        return Response(status_code=200 if request.url.path == "/" else 404)
+
+    counter = CallCounter()
+    async with AsyncClient(
+        transport=MockTransport(handler), event_hooks={"request": [counter]}
+    ) as client:
+        await client.get("https://api.github.com/")
+        await client.get("https://api.github.com/unknown")
+    assert counter.calls == 2
+    assert counter.allows(1) is True
+    counter.budget = 3
+    assert counter.allows(1) is True
+    assert counter.allows(2) is False
+
+
+def test_decode_payload() -> None:
+    """Tests the `decode_payload` function.
+
+    Tests that `decode_payload` decodes only the declared fields of a payload and
+    that a `GitHubException` is raised when the payload does not match the schema.
+    """
+    resp = Response(status_code=200, content=b'[{"login": "user", "id": 1}]')
+    assert [user.login for user in decode_payload(resp, stargazers_decoder)] == ["user"]
+    with pytest.raises(GitHubException):
+        decode_payload(
+            Response(status_code=200, content=b'["test"]'), stargazers_decoder
+        )
+
+
 def test_get_github_headers() -> None:
     """Tests the `get_github_headers` function.
 
@@ -33,6 +103,26 @@ def test_get_github_headers() -> None:
         )
 
 
+@pytest.mark.anyio
+async def test_get_github(mocker: MockerFixture) -> None:
+    """Tests the `get_github` function.
+
+    Tests that the duration of a request is observed by endpoint and status, and that
+    the calls left reported by GitHub are kept.
+    """
+
+    def handler(request: Request) -> Response:
+        assert request.headers["X-GitHub-Api-Version"] == "2022-11-28"
+        return Response(status_code=200, headers={"X-RateLimit-Remaining": "4999"})
+
+    mock_observe = mocker.patch.object(github_request_duration, "observe")
+    async with AsyncClient(transport=MockTransport(handler)) as client:
+        resp = await get_github(client, "starred", "https://api.github.com/users/a")
+    assert resp.status_code == 200
+    assert mock_observe.call_args.args[1:] == ("starred", "200")
+    assert github_rate_limit_remaining.value == 4999
+
+
 @pytest.mark.anyio
 async def test_fetch_stargazers(mocker: MockerFixture) -> None:
     """Tests the `fetch_stargazers` function.
@@ -92,3 +182,282 @@ async def test_fetch_starred_repos(mocker: MockerFixture) -> None:
     assert output_expected == await fetch_starred_repos(
         client=client, stargazer="stargazer", page=1
     )
+
+
+@pytest.mark.anyio
+async def test_compute_starneighbours(mocker: MockerFixture) -> None:
+    """Tests the `compute_starneighbours` function.
+
+    Tests that `compute_starneighbours` associates each starred repository with the
+    stargazers who starred it, sorted by the number of stargazers in descending order.
+    """
+    clear_caches()
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux", "Sulfyderz"])
+    mocker.patch(
+        "apps.github.utils.fetch_starred_repos",
+        AsyncMock(
+            side_effect=[
+                (["pabroux/ai-forge"], False),
+                (["pabroux/unvx", "pabroux/ai-forge"], False),
+            ]
+        ),
+    )
+    assert await compute_starneighbours(AsyncClient(), "pabroux", "unvx") == (
+        [
+            {"repo": "pabroux/ai-forge", "stargazers": ["pabroux", "Sulfyderz"]},
+            {"repo": "pabroux/unvx", "stargazers": ["Sulfyderz"]},
+        ],
+        0.0,
+    )
+    clear_caches()
+    mock_get_starneighbours_fetch_starred_repos(mocker)
+    mock_get_starneighbours_fetch_stargazers(mocker)
+    assert await compute_starneighbours(AsyncClient(), "pabroux", "unvx") == ([], 1.0)
+
+
+@pytest.mark.anyio
+async def test_compute_starneighbours_indexed(mocker: MockerFixture) -> None:
+    """Tests the `compute_starneighbours` function with the star index.
+
+    Tests that the stargazers of a repository known from the repositories they starred
+    are taken into account, that only the missing lists are fetched, and that the
+    local coverage is reported.
+    """
+    clear_caches()
+    star_index.add("pabroux", ["pabroux/unvx", "pabroux/ai-forge"])
+    star_index.add("Sulfyderz", ["pabroux/ai-forge"])
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["octocat"])
+    mock_fetch_starred_repos = mocker.patch(
+        "apps.github.utils.fetch_starred_repos",
+        AsyncMock(return_value=(["pabroux/ai-forge"], False)),
+    )
+    client = AsyncClient()
+    expected = [
+        {"repo": "pabroux/ai-forge", "count": 3},
+        {"repo": "pabroux/unvx", "count": 1},
+    ]
+    assert await compute_starneighbours(client, "pabroux", "ai-forge", "counts") == (
+        expected,
+        2 / 3,
+    )
+    mock_fetch_starred_repos.assert_awaited_once()
+    assert star_index.stargazers("pabroux/ai-forge") == [
+        "pabroux",
+        "Sulfyderz",
+        "octocat",
+    ]
+    # Served from the cached list of stargazers and the star index only
+    mock_fetch_stargazers = mocker.patch("apps.github.utils.fetch_stargazers")
+    assert await compute_starneighbours(client, "pabroux", "ai-forge", "counts") == (
+        expected,
+        1.0,
+    )
+    mock_fetch_stargazers.assert_not_called()
+    mock_fetch_starred_repos.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_compute_starneighbours_counts(mocker: MockerFixture) -> None:
+    """Tests the `compute_starneighbours` function with the "counts" view.
+
+    Tests that `compute_starneighbours` associates each starred repository with the
+    number of stargazers who starred it, sorted in descending order, and reports its
+    progress after each stargazer.
+    """
+    clear_caches()
+    progress = AsyncMock()
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux", "Sulfyderz"])
+    mocker.patch(
+        "apps.github.utils.fetch_starred_repos",
+        AsyncMock(
+            side_effect=[
+                (["pabroux/ai-forge"], False),
+                (["pabroux/unvx", "pabroux/ai-forge"], False),
+            ]
+        ),
+    )
+    assert await compute_starneighbours(
+        AsyncClient(), "pabroux", "unvx", "counts", progress
+    ) == (
+        [
+            {"repo": "pabroux/ai-forge", "count": 2},
+            {"repo": "pabroux/unvx", "count": 1},
+        ],
+        0.0,
+    )
+    assert [call.args for call in progress.await_args_list] == [(0, 2), (1, 2), (2, 2)]
+
+
+def test_aggregate_starneighbours() -> None:
+    """Tests the `aggregate_starneighbours` function.
+
+    Tests that the repositories starred are associated with their stargazers, or their
+    number, sorted in descending order, stable for the repositories tied.
+    """
+    starred = [
+        ("pabroux", ["pabroux/unvx", "pabroux/ai-forge"]),
+        ("Sulfyderz", ["pabroux/ai-forge", "octocat/hello"]),
+    ]
+    assert aggregate_starneighbours(starred) == [
+        {"repo": "pabroux/ai-forge", "stargazers": ["pabroux", "Sulfyderz"]},
+        {"repo": "pabroux/unvx", "stargazers": ["pabroux"]},
+        {"repo": "octocat/hello", "stargazers": ["Sulfyderz"]},
+    ]
+    assert aggregate_starneighbours(starred, "counts") == [
+        {"repo": "pabroux/ai-forge", "count": 2},
+        {"repo": "pabroux/unvx", "count": 1},
+        {"repo": "octocat/hello", "count": 1},
+    ]
+    assert not aggregate_starneighbours([])
+
+
+@pytest.mark.anyio
+async def test_fetch_all_stargazers(mocker: MockerFixture) -> None:
+    """Tests the `fetch_all_stargazers` function.
+
+    Tests that pages are fetched until there is no next page, within the limit set by
+    the `GITHUB_MAX_PAGE_REPO` setting.
+    """
+    mocker.patch("stargazer.settings.GITHUB_MAX_PAGE_REPO", 2)
+    mock_fetch = mocker.patch(
+        "apps.github.utils.fetch_stargazers",
+        AsyncMock(return_value=(["pabroux"], True)),
+    )
+    client = AsyncClient()
+    assert await fetch_all_stargazers(client, "pabroux", "unvx") == ["pabroux"] * 2
+    assert mock_fetch.await_count == 2
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux"])
+    assert await fetch_all_stargazers(client, "pabroux", "unvx") == ["pabroux"]
+
+
+@pytest.mark.anyio
+async def test_fetch_all_starred_repos(mocker: MockerFixture) -> None:
+    """Tests the `fetch_all_starred_repos` function.
+
+    Tests that pages are fetched until there is no next page, within the limit set by
+    the `GITHUB_MAX_PAGE_STARGAZER` setting, and that the list is added to the star
+    index.
+    """
+    mocker.patch("stargazer.settings.GITHUB_MAX_PAGE_STARGAZER", 3)
+    mock_fetch = mocker.patch(
+        "apps.github.utils.fetch_starred_repos",
+        AsyncMock(side_effect=[(["a/b"], True), (["c/d"], False)]),
+    )
+    assert await fetch_all_starred_repos(AsyncClient(), "pabroux") == ["a/b", "c/d"]
+    assert mock_fetch.await_count == 2
+    assert star_index.get("pabroux") == ["a/b", "c/d"]
+    assert "pabroux" in star_index.stargazers("c/d")
+
+
+@pytest.mark.anyio
+async def test_shared_cache(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the caching of the results and of the starred repositories across processes.
+
+    Tests that the star neighbours and the starred repositories cached by a process are
+    found in the shared cache by another one, whose caches are empty, then kept in its
+    caches.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+        tmp_path (Path): A temporary directory.
+    """
+    shared_cache = SharedCache(tmp_path / "stargazer.cache", 2**20)
+    mocker.patch("apps.github.utils.shared_cache", shared_cache)
+    mocker.patch(
+        "apps.github.utils.fetch_starred_repos",
+        AsyncMock(return_value=(["a/b"], False)),
+    )
+    key: tuple[str, str, NeighboursView] = ("pabroux", "unvx", "full")
+    cache_neighbours(key, PrecompressedBody(b"[]"))
+    await fetch_all_starred_repos(AsyncClient(), "pabroux")
+    # Another process, whose caches are empty
+    clear_caches()
+    mock_fetch = mocker.patch("apps.github.utils.fetch_starred_repos", AsyncMock())
+    result = get_cached_neighbours(key)
+    assert result is not None
+    assert result.body == b"[]"
+    assert neighbours_cache.time_to_live(key) > 0
+    assert await get_starred_repos(AsyncClient(), "pabroux") == ["a/b"]
+    assert star_index.has("pabroux")
+    mock_fetch.assert_not_awaited()
+    assert get_cached_neighbours(("pabroux", "unvx", "counts")) is None
+    shared_cache.close()
+    clear_caches()
+
+
+@pytest.mark.anyio
+async def test_explore_starneighbours(mocker: MockerFixture) -> None:
+    """Tests the `explore_starneighbours` function.
+
+    Tests that the repositories are expanded best-first within the given depth, each
+    scored by the product of the overlaps along its best path, that the lists already
+    fetched or known from the star index are reused, and that the exploration stops
+    before a list whose pages could overrun the budget is fetched.
+    """
+    clear_caches()
+    stargazers = {"a/r": ["u1", "u2"], "b/x": ["u1", "u3"], "c/y": ["u4"]}
+    starred_repos = {
+        "u1": ["a/r", "b/x", "c/y"],
+        "u2": ["a/r", "b/x"],
+        "u3": ["b/x", "d/z"],
+        "u4": ["c/y", "b/x"],
+    }
+    mock_fetch_stargazers = mocker.patch(
+        "apps.github.utils.fetch_stargazers",
+        AsyncMock(
+            side_effect=lambda _, user, repo, __: (stargazers[f"{user}/{repo}"], False)
+        ),
+    )
+    mock_fetch_starred_repos = mocker.patch(
+        "apps.github.utils.fetch_starred_repos",
+        AsyncMock(
+            side_effect=lambda _, stargazer, __: (starred_repos[stargazer], False)
+        ),
+    )
+    graph_expected = {
+        "nodes": [
+            {"repo": "a/r", "depth": 0, "score": 1.0},
+            {"repo": "b/x", "depth": 1, "score": 1.0},
+            {"repo": "c/y", "depth": 1, "score": 0.5},
+            {"repo": "d/z", "depth": 2, "score": 0.3333},
+        ],
+        "edges": [
+            [0, 1, 1.0],
+            [0, 2, 0.5],
+            [1, 0, 0.6667],
+            [1, 2, 0.3333],
+            [1, 3, 0.3333],
+            [2, 1, 1.0],
+            [2, 0, 0.5],
+        ],
+        "truncated": False,
+    }
+    client = AsyncClient()
+    assert await explore_starneighbours(client, CallCounter(), "a", "r", 2) == (
+        graph_expected
+    )
+    assert mock_fetch_stargazers.await_count == 3
+    assert mock_fetch_starred_repos.await_count == 4
+    # Served from the cached lists without spending any call, u4 being now known as a
+    # stargazer of b/x from the repositories it starred
+    graph = await explore_starneighbours(client, CallCounter(budget=0), "a", "r", 2)
+    assert graph["nodes"][3] == {"repo": "d/z", "depth": 2, "score": 0.25}
+    assert graph["edges"][2:5] == [[1, 0, 0.5], [1, 2, 0.5], [1, 3, 0.25]]
+    assert not graph["truncated"]
+    assert mock_fetch_stargazers.await_count == 3
+    assert mock_fetch_starred_repos.await_count == 4
+    stargazers_cache.clear()
+    graph = await explore_starneighbours(client, CallCounter(budget=0), "a", "r", 2)
+    assert graph == {
+        "nodes": [{"repo": "a/r", "depth": 0, "score": 1.0}],
+        "edges": [],
+        "truncated": True,
+    }
+    # The stargazers fit in the budget, but not the pages of a list of starred
+    # repositories on top of them
+    clear_caches()
+    mocker.patch("stargazer.settings.GITHUB_MAX_PAGE_STARGAZER", 2)
+    graph = await explore_starneighbours(client, CallCounter(budget=1), "a", "r", 2)
+    assert graph["truncated"]
+    assert mock_fetch_stargazers.await_count == 4
+    assert mock_fetch_starred_repos.await_count == 4
@@ -15,9 +15,21 @@ from pytest_mock import MockerFixture
 
 from apps.auth.models import User
 from apps.auth.utils import get_current_active_user
+from apps.github.utils import neighbours_cache, star_index, stargazers_cache
 from main import app
 
 
+def clear_caches() -> None:
+    """Clears the caches of the GitHub app.
+
+    Clears the star neighbour results, the lists of stargazers and the star index, so
+    that a test does not reuse the data fetched by the previous ones.
+    """
+    neighbours_cache.clear()
+    stargazers_cache.clear()
+    star_index.clear()
+
+
 def disable_oauth(
     func: Callable[..., Any],
 ) -> Callable[..., Any]:
@@ -44,7 +56,9 @@ def disable_oauth(
 
 
 @disable_oauth
-def client_get_without_oauth(client: TestClient, url: str) -> Response:
+def client_get_without_oauth(
+    client: TestClient, url: str, headers: dict[str, str] | None = None
+) -> Response:
     """Queries a GET request to the given URL while disabling OAuth authentication.
 
     This function is useful for testing endpoints that are protected by OAuth
@@ -52,11 +66,12 @@ def client_get_without_oauth(client: TestClient, url: str) -> Response:
 
     Args:
         url (str): The URL to GET.
+        headers (dict[str, str], optional): The headers to send with the request.
 
     Returns:
         Response: The response from the server.
     """
-    return client.get(url)
+    return client.get(url, headers=headers)
 
 
 def mock_async_client_get(
@@ -66,9 +81,8 @@ def mock_async_client_get(
 ) -> Response:
     """Mocks the `get` method of the `httpx.AsyncClient` object.
 
-    Mocks the `get` method of the `httpx.AsyncClient` object in the
-    `apps.auth.utils` context. This mock is used in tests to avoid
-    having to make real HTTP requests to the GitHub API.
+    Mocks the `get` method of every `httpx.AsyncClient` object. This mock is used in
+    tests to avoid having to make real HTTP requests to the GitHub API.
 
     Args:
         mocker (MockerFixture): The pytest-mock fixture to use for mocking.
@@ -82,16 +96,16 @@ def mock_async_client_get(
     status_code = status.HTTP_200_OK if simulate_success else status.HTTP_404_NOT_FOUND
     content_json = json.dumps(content if content else ["test"]).encode("utf-8")
     resp = Response(status_code=status_code, content=content_json)
-    mocker.patch("apps.github.utils.AsyncClient.get", AsyncMock(return_value=resp))
+    mocker.patch("httpx.AsyncClient.get", AsyncMock(return_value=resp))
     return resp
 
 
 def mock_get_starneighbours_fetch_stargazers(
     mocker: MockerFixture, content: list[Any] | None = None
 ) -> None:
-    """Mocks the `fetch_stargazers` function used in `get_starneighbours`.
+    """Mocks the `fetch_stargazers` function used in `compute_starneighbours`.
 
-    Mocks the `fetch_stargazers` function used in `get_starneighbours` in the
+    Mocks the `fetch_stargazers` function used in `compute_starneighbours` in the
     `apps.auth.utils` context. This mock is used in tests to avoid
     making real HTTP requests to the GitHub API.
 
@@ -100,7 +114,7 @@ def mock_get_starneighbours_fetch_stargazers(
         content (list[Any], optional): The content of the response.
     """
     mocker.patch(
-        "apps.github.router.fetch_stargazers",
+        "apps.github.utils.fetch_stargazers",
         AsyncMock(return_value=((content if content else [], False))),
     )
 
@@ -108,9 +122,9 @@ def mock_get_starneighbours_fetch_stargazers(
 def mock_get_starneighbours_fetch_starred_repos(
     mocker: MockerFixture, content: list[Any] | None = None
 ) -> None:
-    """Mocks the `fetch_starred_repos` function used in `get_starneighbours`.
+    """Mocks the `fetch_starred_repos` function used in `compute_starneighbours`.
 
-    Mocks the `fetch_starred_repos` function used in `get_starneighbours` in the
+    Mocks the `fetch_starred_repos` function used in `compute_starneighbours` in the
     `apps.auth.utils` context. This mock is used in tests to avoid
     making real HTTP requests to the GitHub API.
 
@@ -119,7 +133,7 @@ def mock_get_starneighbours_fetch_starred_repos(
         content (list[Any], optional): The content of the response.
     """
     mocker.patch(
-        "apps.github.router.fetch_starred_repos",
+        "apps.github.utils.fetch_starred_repos",
         AsyncMock(return_value=((content if content else [], False))),
     )
 
@@ -3,12 +3,228 @@
 This module provides utility functions for querying GitHub API.
 """
 
-from fastapi import status
-from httpx import AsyncClient
+import heapq
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable, Iterable
+from functools import cache, partial
+from math import inf
+from time import perf_counter
+from typing import TYPE_CHECKING, Annotated, Any, Literal, TypeVar
 
+import msgspec
+from fastapi import Depends, status
+
+from apps.auth.models import User
+from apps.auth.utils import get_current_active_user, get_engine
 from apps.github.exceptions import GitHubException
+from apps.github.index import StarIndex
+from apps.github.models import GitHubRepo, GitHubUser
+from apps.shared.admission import AdmissionGate
+from apps.shared.cache import TTLCache
+from apps.shared.compression import PrecompressedBody
+from apps.shared.memory import MEMORY_BUCKETS
+from apps.shared.metrics import LATENCY_BUCKETS, Gauge, Histogram, collectors
+from apps.shared.ratelimit import (
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    Quota,
+    RateLimit,
+    RateLimitBackend,
+    RateLimiter,
+)
+from apps.shared.sharedcache import SharedCache
+from apps.shared.tracing import traced, tracer
 from stargazer import settings
 
+if TYPE_CHECKING:
+    # Imported on first use at runtime, as HTTPX (and the CLI it brings along) is one of
+    # the heaviest imports of the app
+    from httpx import AsyncBaseTransport, AsyncClient, Request, Response
+
+T = TypeVar("T")
+
+NeighboursView = Literal["full", "counts"]
+
+# Schema-specific decoders: only the declared fields are decoded, the rest of each
+# payload is skipped without allocating Python objects
+stargazers_decoder = msgspec.json.Decoder(list[GitHubUser])
+starred_repos_decoder = msgspec.json.Decoder(list[GitHubRepo])
+
+# Encoded star neighbours, keyed by (user, repo, view), shared by all the users of the app
+neighbours_cache: TTLCache[tuple[str, str, NeighboursView], PrecompressedBody] = (
+    TTLCache(settings.NEIGHBOURS_CACHE_SIZE, settings.NEIGHBOURS_CACHE_TTL)
+)
+
+# Lists of stargazers, keyed by (user, repo), and index of the starred repositories
+# fetched, with their known stargazers, reused by the next computations
+stargazers_cache: TTLCache[tuple[str, str], list[str]] = TTLCache(
+    settings.GITHUB_CACHE_SIZE, settings.GITHUB_CACHE_TTL
+)
+star_index = StarIndex(settings.GITHUB_CACHE_SIZE, settings.GITHUB_CACHE_TTL)
+collectors.append(partial(neighbours_cache.collect, "neighbours"))
+collectors.append(partial(stargazers_cache.collect, "stargazers"))
+collectors.append(partial(star_index.starred.collect, "starred_repos"))
+
+# Encoded star neighbours and lists of starred repositories, shared by the worker
+# processes (see `SHARED_CACHE_FILE`) behind the caches above, else None
+shared_cache = (
+    SharedCache(settings.SHARED_CACHE_FILE, settings.SHARED_CACHE_SIZE * 2**20)
+    if settings.SHARED_CACHE_FILE
+    else None
+)
+starred_list_decoder = msgspec.msgpack.Decoder(list[str])
+if shared_cache is not None:
+    collectors.append(partial(shared_cache.collect, "shared"))
+
+# Durations of the GitHub API requests by endpoint ("stargazers" or "starred") and
+# status, the calls left to the app as last reported by GitHub, and the number of pages
+# fetched by each star neighbour query ("neighbours", "graph" or "job")
+github_request_duration = Histogram(
+    "github_request_duration_seconds",
+    "Duration of the GitHub API requests",
+    LATENCY_BUCKETS,
+    ("endpoint", "status"),
+)
+github_rate_limit_remaining = Gauge(
+    "github_rate_limit_remaining", "GitHub API calls left, as last reported by GitHub"
+)
+neighbours_query_pages = Histogram(
+    "neighbours_query_pages",
+    "GitHub API pages fetched per star neighbour query",
+    (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+    ("query",),
+)
+# Peak memory allocated by each star neighbour computation, once traced
+neighbours_peak_memory = Histogram(
+    "neighbours_peak_memory_bytes",
+    "Peak memory allocated per star neighbour computation (traced by tracemalloc)",
+    MEMORY_BUCKETS,
+)
+collectors.append(github_request_duration.collect)
+collectors.append(github_rate_limit_remaining.collect)
+collectors.append(neighbours_query_pages.collect)
+collectors.append(neighbours_peak_memory.collect)
+
+# Bound on the star neighbour computations running at once, exported as metrics
+neighbours_gate = AdmissionGate(
+    "neighbours",
+    settings.ADMISSION_MAX_CONCURRENCY,
+    settings.ADMISSION_QUEUE_SIZE,
+    settings.ADMISSION_QUEUE_TIMEOUT,
+)
+collectors.append(neighbours_gate.collect)
+
+# Per-user quotas of star neighbour requests and of GitHub API calls
+rate_limit_backend: RateLimitBackend = (
+    DatabaseRateLimitBackend(get_engine)
+    if settings.RATE_LIMIT_BACKEND == "database"
+    else MemoryRateLimitBackend()
+)
+rate_limiter = RateLimiter(
+    rate_limit_backend,
+    requests=Quota(
+        settings.RATE_LIMIT_BURST, settings.RATE_LIMIT_REQUESTS_PER_MINUTE / 60
+    ),
+    calls=Quota(
+        settings.RATE_LIMIT_GITHUB_CALLS_PER_HOUR,
+        settings.RATE_LIMIT_GITHUB_CALLS_PER_HOUR / 3600,
+    ),
+)
+
+
+class CallCounter:  # pylint: disable=too-few-public-methods
+    """HTTPX event hook counting the requests made by a client, within a budget."""
+
+    def __init__(self, budget: float = inf) -> None:
+        self.budget = budget
+        self.calls = 0
+
+    def allows(self, calls: int) -> bool:
+        """Checks whether the budget left allows a number of requests.
+
+        Args:
+            calls (int): The number of requests to make.
+
+        Returns:
+            bool: True if the requests can be made within the budget, otherwise False.
+        """
+        return self.calls + calls <= self.budget
+
+    async def __call__(self, _: "Request") -> None:
+        self.calls += 1
+
+
+def create_github_client(counter: CallCounter) -> "AsyncClient":
+    """Creates an HTTPX client for the GitHub API, counting its requests.
+
+    The requests go through the transport set by the `GITHUB_CASSETTE` environment
+    variable, recording or replaying the responses of the GitHub API if set.
+
+    Args:
+        counter (CallCounter): The counter of the requests made by the client.
+
+    Returns:
+        AsyncClient: The client, to be closed once done.
+    """
+    import httpx  # pylint: disable=import-outside-toplevel
+
+    return httpx.AsyncClient(
+        transport=get_github_transport(), event_hooks={"request": [counter]}
+    )
+
+
+@cache
+def get_github_transport() -> "AsyncBaseTransport | None":
+    """Gets the transport shared by the clients of the GitHub API, created on first use.
+
+    Returns:
+        AsyncBaseTransport | None: The transport recording or replaying the responses
+        of the GitHub API if set by `GITHUB_CASSETTE`, otherwise None to send the
+        requests over the network.
+    """
+    if settings.GITHUB_CASSETTE == "none":
+        return None
+    from apps.github.cassette import (  # pylint: disable=import-outside-toplevel
+        get_transport,
+    )
+
+    return get_transport()
+
+
+def save_github_cassette() -> None:
+    """Saves the responses of the GitHub API recorded so far, if recording them."""
+    if settings.GITHUB_CASSETTE == "record":
+        from apps.github.cassette import (  # pylint: disable=import-outside-toplevel
+            RecordingTransport,
+        )
+
+        transport = get_github_transport()
+        if isinstance(transport, RecordingTransport):
+            transport.save()
+
+
+def decode_payload(resp: "Response", decoder: msgspec.json.Decoder[T]) -> T:
+    """Decodes the payload of a GitHub API response.
+
+    Decodes the raw bytes of the response with the given schema-specific decoder,
+    without building the intermediate dictionaries of `Response.json`.
+
+    Args:
+        resp (Response): The response of the GitHub API.
+        decoder (msgspec.json.Decoder[T]): The decoder of the expected payload.
+
+    Returns:
+        T: The decoded payload.
+
+    Raises:
+        GitHubException: If the payload does not match the expected schema, a
+        GitHubException is raised.
+    """
+    try:
+        return decoder.decode(resp.content)
+    except msgspec.DecodeError as exc:
+        raise GitHubException(detail=f"Unexpected payload: {exc}") from exc
+
 
 def get_github_headers() -> dict[str, str]:
     """Gets the headers to be sent with each GitHub API request.
@@ -29,8 +245,52 @@ def get_github_headers() -> dict[str, str]:
     return headers
 
 
+async def get_github(client: "AsyncClient", endpoint: str, url: str) -> "Response":
+    """Sends a GET request to the GitHub API, measuring it.
+
+    The duration of the request is observed by endpoint and status, and the
+    `X-RateLimit-Remaining` header of the response, if any, is kept as the number of
+    calls left to the app.
+
+    Args:
+        client (AsyncClient): The HTTPX client to use for the request.
+        endpoint (str): The type of endpoint requested, "stargazers" or "starred".
+        url (str): The URL to GET.
+
+    Returns:
+        Response: The response of the GitHub API.
+    """
+    start = perf_counter()
+    resp = await client.get(url, headers=get_github_headers())
+    github_request_duration.observe(
+        perf_counter() - start, endpoint, str(resp.status_code)
+    )
+    remaining = resp.headers.get("x-ratelimit-remaining")
+    if remaining is not None and remaining.isdigit():
+        github_rate_limit_remaining.value = int(remaining)
+    return resp
+
+
+async def get_rate_limit(
+    user: Annotated[User, Depends(get_current_active_user)],
+) -> RateLimit:
+    """Acquires a star neighbour request for the current active user.
+
+    Args:
+        user (User): The user making the request.
+
+    Returns:
+        RateLimit: The quotas left to the user, to be charged the GitHub API calls made.
+
+    Raises:
+        HTTPException: If the user made too many requests or GitHub API calls, a 429
+        Too Many Requests exception is raised, with a `Retry-After` header.
+    """
+    return await rate_limiter.acquire(user.username)
+
+
 async def fetch_stargazers(
-    client: AsyncClient, user: str, repo: str, page: int
+    client: "AsyncClient", user: str, repo: str, page: int
 ) -> tuple[list[str], bool]:
     """Fetches the stargazers for a given GitHub repository.
 
@@ -51,16 +311,20 @@ async def fetch_stargazers(
     Raises:
         GitHubException: If the request to the GitHub API fails, a GitHubException is raised.
     """
-    url = f"https://api.github.com/repos/{user}/{repo}/stargazers?per_page=100&page={page}"
-    headers = get_github_headers()
-    resp = await client.get(url, headers=headers)
-    if resp.status_code != status.HTTP_200_OK:
-        raise GitHubException(detail=resp.json())
-    return [resp_user["login"] for resp_user in resp.json()], "next" in resp.links
+    url = (
+        f"{settings.GITHUB_API_URL}/repos/{user}/{repo}/stargazers"
+        f"?per_page=100&page={page}"
+    )
+    with tracer.span("github.stargazers", repo=f"{user}/{repo}", page=page):
+        resp = await get_github(client, "stargazers", url)
+        if resp.status_code != status.HTTP_200_OK:
+            raise GitHubException(detail=resp.json())
+        resp_users = decode_payload(resp, stargazers_decoder)
+    return [resp_user.login for resp_user in resp_users], "next" in resp.links
 
 
 async def fetch_starred_repos(
-    client: AsyncClient, stargazer: str, page: int
+    client: "AsyncClient", stargazer: str, page: int
 ) -> tuple[list[str], bool]:
     """Fetches the repositories starred by a given GitHub user.
 
@@ -81,12 +345,369 @@ async def fetch_starred_repos(
     Raises:
         GitHubException: If the request to the GitHub API fails, a GitHubException is raised.
     """
-    url = f"https://api.github.com/users/{stargazer}/starred?per_page=100&page={page}"
-    headers = get_github_headers()
-    resp = await client.get(url, headers=headers)
-    if resp.status_code != status.HTTP_200_OK:
-        raise GitHubException(detail=resp.json())
-    return [
-        f"{resp_repo['owner']['login']}/{resp_repo['name']}"
-        for resp_repo in resp.json()
-    ], "next" in resp.links
+    url = (
+        f"{settings.GITHUB_API_URL}/users/{stargazer}/starred?per_page=100&page={page}"
+    )
+    with tracer.span("github.starred", stargazer=stargazer, page=page):
+        resp = await get_github(client, "starred", url)
+        if resp.status_code != status.HTTP_200_OK:
+            raise GitHubException(detail=resp.json())
+        resp_repos = decode_payload(resp, starred_repos_decoder)
+    return [resp_repo.full_name for resp_repo in resp_repos], "next" in resp.links
+
+
+async def fetch_all_stargazers(
+    client: "AsyncClient", user: str, repo: str
+) -> list[str]:
+    """Fetches the stargazers for a given GitHub repository, page after page.
+
+    Fetches the pages of stargazers of the repository until there is no next page or
+    the limit set by the `GITHUB_MAX_PAGE_REPO` environment variable is reached.
+
+    Args:
+        client (AsyncClient): The HTTPX client to use for the requests.
+        user (str): The user who owns the repository.
+        repo (str): The name of the repository.
+
+    Returns:
+        list[str]: The names of the stargazers.
+
+    Raises:
+        GitHubException: If a request to the GitHub API fails, a GitHubException is raised.
+    """
+    stargazers = []
+    page = 1
+    while page <= settings.GITHUB_MAX_PAGE_REPO:
+        stargazers_chunk, has_next = await fetch_stargazers(client, user, repo, page)
+        stargazers.extend(stargazers_chunk)
+        # Stop if no more pages to fetch
+        if not has_next:
+            break
+        page += 1
+    return stargazers
+
+
+async def fetch_all_starred_repos(client: "AsyncClient", stargazer: str) -> list[str]:
+    """Fetches the repositories starred by a given GitHub user, page after page.
+
+    Fetches the pages of repositories starred by the user until there is no next page
+    or the limit set by the `GITHUB_MAX_PAGE_STARGAZER` environment variable is reached.
+    The repositories are added to the star index, which records the user as a known
+    stargazer of each of them.
+
+    Args:
+        client (AsyncClient): The HTTPX client to use for the requests.
+        stargazer (str): The GitHub user whose starred repositories are to be fetched.
+
+    Returns:
+        list[str]: The names of the starred repositories, in the format "user/repo".
+
+    Raises:
+        GitHubException: If a request to the GitHub API fails, a GitHubException is raised.
+    """
+    stargazer_stars = []
+    page = 1
+    while page <= settings.GITHUB_MAX_PAGE_STARGAZER:
+        stars_chunk, has_next = await fetch_starred_repos(client, stargazer, page)
+        stargazer_stars.extend(stars_chunk)
+        # Stop if no more pages to fetch
+        if not has_next:
+            break
+        page += 1
+    star_index.add(stargazer, stargazer_stars)
+    if shared_cache is not None:
+        shared_cache.set(
+            f"starred:{stargazer}",
+            msgspec.msgpack.encode(stargazer_stars),
+            settings.GITHUB_CACHE_TTL,
+        )
+    return stargazer_stars
+
+
+async def get_stargazers(client: "AsyncClient", user: str, repo: str) -> list[str]:
+    """Gets the stargazers for a given GitHub repository, fetching them unless cached.
+
+    Args:
+        client (AsyncClient): The HTTPX client to use for the requests.
+        user (str): The user who owns the repository.
+        repo (str): The name of the repository.
+
+    Returns:
+        list[str]: The names of the stargazers.
+
+    Raises:
+        GitHubException: If a request to the GitHub API fails, a GitHubException is raised.
+    """
+    stargazers = stargazers_cache.get((user, repo))
+    if stargazers is None:
+        stargazers = await fetch_all_stargazers(client, user, repo)
+        stargazers_cache.set((user, repo), stargazers)
+    return stargazers
+
+
+async def get_starred_repos(client: "AsyncClient", stargazer: str) -> list[str]:
+    """Gets the repositories starred by a given GitHub user, fetching them unless indexed.
+
+    The repositories missing from the star index are looked up in the shared cache, if
+    any, before being fetched, then indexed.
+
+    Args:
+        client (AsyncClient): The HTTPX client to use for the requests.
+        stargazer (str): The GitHub user whose starred repositories are to be fetched.
+
+    Returns:
+        list[str]: The names of the starred repositories, in the format "user/repo".
+
+    Raises:
+        GitHubException: If a request to the GitHub API fails, a GitHubException is raised.
+    """
+    starred_repos = star_index.get(stargazer)
+    if starred_repos is None and shared_cache is not None:
+        if (cached := shared_cache.get(f"starred:{stargazer}")) is not None:
+            starred_repos = starred_list_decoder.decode(cached[0])
+            star_index.add(stargazer, starred_repos)
+    if starred_repos is None:
+        starred_repos = await fetch_all_starred_repos(client, stargazer)
+    return starred_repos
+
+
+def get_cached_neighbours(
+    key: tuple[str, str, NeighboursView],
+) -> PrecompressedBody | None:
+    """Gets the encoded star neighbours of a repository, unless cached nowhere.
+
+    The result missing from the cache of the process is looked up in the shared cache,
+    if any, then kept in the cache of the process until it expires from the shared one.
+
+    Args:
+        key (tuple[str, str, NeighboursView]): The user who owns the repository, the name
+        of the repository and the view of the result.
+
+    Returns:
+        PrecompressedBody | None: The encoded star neighbours if cached, otherwise None.
+    """
+    result = neighbours_cache.get(key)
+    if result is None and shared_cache is not None:
+        user, repo, view = key
+        if (cached := shared_cache.get(f"neighbours:{user}/{repo}:{view}")) is not None:
+            result = PrecompressedBody(cached[0])
+            neighbours_cache.set(key, result, cached[1])
+    return result
+
+
+def cache_neighbours(
+    key: tuple[str, str, NeighboursView], result: PrecompressedBody
+) -> None:
+    """Caches the encoded star neighbours of a repository, in the shared cache too if any.
+
+    Args:
+        key (tuple[str, str, NeighboursView]): The user who owns the repository, the name
+        of the repository and the view of the result.
+        result (PrecompressedBody): The encoded star neighbours.
+    """
+    neighbours_cache.set(key, result)
+    if shared_cache is not None:
+        user, repo, view = key
+        shared_cache.set(
+            f"neighbours:{user}/{repo}:{view}",
+            result.body,
+            settings.NEIGHBOURS_CACHE_TTL,
+        )
+
+
+@traced("compute")
+async def compute_starneighbours(
+    client: "AsyncClient",
+    user: str,
+    repo: str,
+    view: NeighboursView = "full",
+    progress: Callable[[int, int], Awaitable[None]] | None = None,
+) -> tuple[list[dict[str, Any]], float]:
+    """Computes the star neighbours of a given GitHub repository.
+
+    Gets the stargazers of the requested repository, along with its other known
+    stargazers in the star index, then the repositories starred by each of them. Only
+    the lists missing from the caches are fetched. With the "counts" view, only the
+    number of stargazers in common is kept for each repository, so that no list of
+    stargazers is built.
+
+    Args:
+        client (AsyncClient): The HTTPX client to use for the requests.
+        user (str): The user who owns the repository.
+        repo (str): The name of the repository.
+        view (NeighboursView): The view of the result, "full" (default) or "counts".
+        progress (Callable[[int, int], Awaitable[None]] | None): A callback awaited with
+        the number of stargazers processed and their total number, once the stargazers
+        are fetched then after each of them (defaults to None).
+
+    Returns:
+        A tuple containing:
+            1. A list of dictionaries, where each dictionary contains the name of a
+            repository starred by at least one stargazer of the requested repository,
+            along with a list of stargazers of that repository that also starred the
+            requested repository ("full" view) or their number ("counts" view). The list
+            is sorted by the number of stargazers in descending order.
+            2. The local coverage, i.e. the share of the stargazers whose starred
+            repositories were already indexed (1 if there are no stargazers).
+
+    Raises:
+        GitHubException: If a request to the GitHub API fails, a GitHubException is raised.
+    """
+    stargazers = await get_stargazers(client, user, repo)
+    # Start from the stargazers known locally too, whose lists need no fetching
+    stargazers = list(
+        dict.fromkeys([*stargazers, *star_index.stargazers(f"{user}/{repo}")])
+    )
+    indexed = sum(map(star_index.has, stargazers))
+    coverage = indexed / len(stargazers) if stargazers else 1.0
+    if progress is not None:
+        await progress(0, len(stargazers))
+
+    starred = []
+    for index, stargazer in enumerate(stargazers, 1):
+        starred.append((stargazer, await get_starred_repos(client, stargazer)))
+        if progress is not None:
+            await progress(index, len(stargazers))
+
+    with tracer.span("aggregate", stargazers=len(starred)):
+        return aggregate_starneighbours(starred, view), coverage
+
+
+def aggregate_starneighbours(
+    starred: Iterable[tuple[str, list[str]]], view: NeighboursView = "full"
+) -> list[dict[str, Any]]:
+    """Aggregates the repositories starred by stargazers into star neighbours.
+
+    Args:
+        starred (Iterable[tuple[str, list[str]]]): The stargazers, each with the names
+        of the repositories they starred.
+        view (NeighboursView): The view of the result, "full" (default) or "counts".
+
+    Returns:
+        list[dict[str, Any]]: A list of dictionaries, where each dictionary contains the
+        name of a repository starred by at least one of the stargazers, along with the
+        list of those stargazers ("full" view) or their number ("counts" view). The list
+        is sorted by the number of stargazers in descending order.
+    """
+    # Count neighbor relationships only
+    if view == "counts":
+        counts: Counter[str] = Counter()
+        for _, starred_repos in starred:
+            counts.update(starred_repos)
+        return [
+            {"repo": repo_name, "count": count}
+            for repo_name, count in counts.most_common()
+        ]
+
+    # Build neighbor relationships
+    neighbors = defaultdict(list)
+    for stargazer, starred_repos in starred:
+        for starred_repo in starred_repos:
+            neighbors[starred_repo].append(stargazer)
+
+    return sorted(
+        [
+            {"repo": repo_name, "stargazers": stargazers_list}
+            for repo_name, stargazers_list in neighbors.items()
+        ],
+        key=lambda x: len(x["stargazers"]),
+        reverse=True,
+    )
+
+
+@traced("explore")
+async def explore_starneighbours(  # pylint: disable=too-many-locals
+    client: "AsyncClient", counter: CallCounter, user: str, repo: str, depth: int
+) -> dict[str, Any]:
+    """Explores the star neighbourhood of a given GitHub repository, hop after hop.
+
+    Runs a best-first expansion of the co-star graph from the requested repository,
+    the repository with the highest score being expanded first. Expanding a repository
+    gets a sample of its stargazers (at most `GRAPH_SAMPLE_SIZE`, those known from the
+    star index first, the others being fetched only if too few are known) and the
+    repositories they starred. The
+    overlap of a neighbour is the share of the sampled stargazers who starred it, and
+    only the `GRAPH_FANOUT` neighbours with the highest overlap are kept. The score of
+    a repository is the highest product of the overlaps along a path from the
+    requested repository.
+
+    The lists of stargazers and the star index are kept for the time set by the
+    `GITHUB_CACHE_TTL` environment variable, so that they are reused across hops and
+    computations. The exploration stops expanding before a list is fetched whose pages
+    (at most `GITHUB_MAX_PAGE_REPO` or `GITHUB_MAX_PAGE_STARGAZER`) could overrun the
+    budget of the call counter, so that the budget is never exceeded.
+
+    Args:
+        client (AsyncClient): The HTTPX client to use for the requests.
+        counter (CallCounter): The hook counting the requests made by the client,
+        whose budget bounds the GitHub API calls of the exploration.
+        user (str): The user who owns the repository.
+        repo (str): The name of the repository.
+        depth (int): The maximum number of hops from the requested repository.
+
+    Returns:
+        A dictionary containing:
+            1. "nodes": the repositories found, the requested one first, each with its
+            name, its number of hops from the requested repository and its score.
+            2. "edges": the `[source, target, overlap]` lists linking the expanded
+            repositories to their neighbours, by index in the nodes.
+            3. "truncated": whether the exploration stopped on the budget of calls.
+
+    Raises:
+        GitHubException: If a request to the GitHub API fails, a GitHubException is raised.
+    """
+    nodes: list[dict[str, Any]] = [{"repo": f"{user}/{repo}", "depth": 0, "score": 1.0}]
+    indices = {nodes[0]["repo"]: 0}
+    edges: list[list[Any]] = []
+    frontier = [(-1.0, 0)]
+    truncated = False
+
+    while frontier and not truncated:
+        score, source = heapq.heappop(frontier)
+        node = nodes[source]
+        # Skip the repositories already expanded through a better path, or too far
+        if -score < node["score"] or node["depth"] >= depth:
+            continue
+        owner, name = node["repo"].split("/", 1)
+        # Start from the stargazers known locally, fetching the others if too few
+        stargazers = star_index.stargazers(node["repo"])
+        if len(stargazers) < settings.GRAPH_SAMPLE_SIZE:
+            cached = stargazers_cache.time_to_live((owner, name)) > 0
+            if not cached and not counter.allows(settings.GITHUB_MAX_PAGE_REPO):
+                truncated = True
+                break
+            stargazers = list(
+                dict.fromkeys([*stargazers, *await get_stargazers(client, owner, name)])
+            )
+
+        # Sample the stargazers whose starred repositories are indexed first, as free
+        sample = sorted(
+            stargazers, key=lambda stargazer: not star_index.has(stargazer)
+        )[: settings.GRAPH_SAMPLE_SIZE]
+        counts: Counter[str] = Counter()
+        sampled = 0
+        for stargazer in sample:
+            if not star_index.has(stargazer) and not counter.allows(
+                settings.GITHUB_MAX_PAGE_STARGAZER
+            ):
+                truncated = True
+                break
+            counts.update(await get_starred_repos(client, stargazer))
+            sampled += 1
+        counts.pop(node["repo"], None)
+
+        for neighbour, count in counts.most_common(settings.GRAPH_FANOUT):
+            overlap = count / sampled
+            target = indices.get(neighbour)
+            if target is None:
+                target = indices[neighbour] = len(nodes)
+                nodes.append({"repo": neighbour, "depth": 0, "score": 0.0})
+            edges.append([source, target, round(overlap, 4)])
+            if -score * overlap > nodes[target]["score"]:
+                nodes[target]["depth"] = node["depth"] + 1
+                nodes[target]["score"] = -score * overlap
+                heapq.heappush(frontier, (score * overlap, target))
+
+    for node in nodes:
+        node["score"] = round(node["score"], 4)
+    return {"nodes": nodes, "edges": edges, "truncated": truncated}
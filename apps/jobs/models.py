@@ -0,0 +1,62 @@
+"""Models for the Jobs app.
+
+This module contains the models used by the Jobs app.
+"""
+
+from typing import Literal
+
+from pydantic import BaseModel
+from sqlalchemy import Index, text
+from sqlmodel import AutoString, Field, SQLModel
+
+from apps.github.utils import NeighboursView
+
+JobStatus = Literal["pending", "running", "done", "failed"]
+
+# Condition on the status of the unfinished jobs, in SQL
+UNFINISHED_STATUS = "status IN ('pending', 'running')"
+
+
+class Job(SQLModel, table=True):
+    """Job model in the database (ORM).
+
+    Represents a star neighbour computation run in the background, along with its
+    progress and, once done, its encoded result. Jobs with the same `key` (i.e. the
+    same repository and view) compute the same result, so at most one of them can be
+    unfinished at a time.
+    """
+
+    __table_args__ = (
+        Index(
+            "ix_job_key_unfinished",
+            "key",
+            unique=True,
+            sqlite_where=text(UNFINISHED_STATUS),
+            postgresql_where=text(UNFINISHED_STATUS),
+        ),
+    )
+
+    id: str = Field(primary_key=True)
+    key: str = Field(index=True)
+    user: str
+    repo: str
+    view: str
+    status: JobStatus = Field(default="pending", sa_type=AutoString)
+    done: int = 0
+    total: int = 0
+    result: bytes | None = None
+    error: str | None = None
+    created_by: str
+    created_at: float
+    updated_at: float
+
+
+class StarNeighboursJobRequest(BaseModel):
+    """Star neighbours job request model for the Jobs app.
+
+    Represents the repository whose star neighbours are to be computed in a job.
+    """
+
+    user: str
+    repo: str
+    view: NeighboursView = "full"
@@ -0,0 +1,88 @@
+"""Router for the Jobs app.
+
+This module provides a FastAPI router for job-related endpoints.
+"""
+
+from typing import Annotated, Any
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from apps.auth.models import User
+from apps.auth.utils import get_current_active_user
+from apps.github.utils import get_rate_limit
+from apps.jobs.models import StarNeighboursJobRequest
+from apps.jobs.utils import create_job, format_job, get_job, job_runner
+from apps.shared.ratelimit import RateLimit
+from apps.shared.responses import MsgspecJSONResponse
+
+router = APIRouter()
+
+
+@router.post(
+    "/jobs/starneighbours",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_class=MsgspecJSONResponse,
+    response_model=dict[str, Any],
+)
+async def create_starneighbours_job(
+    job_request: StarNeighboursJobRequest,
+    rate_limit: Annotated[RateLimit, Depends(get_rate_limit)],
+) -> Response:
+    """Creates a job computing the star neighbours of a GitHub repository.
+
+    The star neighbours are computed in the background, so that long computations (e.g.
+    with many pages of stargazers) do not time out. An identical job pending, running
+    or recently done is reused instead of creating a new one. The job is subject to the
+    rate limits of the star neighbours endpoint, its GitHub API calls being charged to
+    the user once done.
+
+    Args:
+        job_request (StarNeighboursJobRequest): The repository and view of the job.
+        rate_limit (RateLimit): The quotas left to the user making the request.
+
+    Returns:
+        A JSON response describing the job (see `GET /jobs/{job_id}`), with a 202
+        Accepted code if created or a 200 OK code if reused, and a `Location` header
+        pointing to the job.
+    """
+    job, created = await create_job(job_request, rate_limit.key)
+    if created:
+        job_runner.submit(job.id)
+    return MsgspecJSONResponse(
+        format_job(job),
+        status_code=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        headers={"Location": f"/jobs/{job.id}", **rate_limit.headers},
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_class=MsgspecJSONResponse,
+    response_model=dict[str, Any],
+)
+async def get_job_status(
+    job_id: str,
+    _: Annotated[User, Depends(get_current_active_user)],
+) -> Response:
+    """Gets the status of a job, along with its result once done.
+
+    Args:
+        job_id (str): The ID of the job.
+        _ (User): The user making the request.
+
+    Returns:
+        A JSON response containing the ID, the status ("pending", "running", "done" or
+        "failed"), the repository, the view and the progress (`{"done": <int>, "total":
+        <int>}` stargazers) of the job, along with its result once done (as sent by
+        `/repos/{user}/{repo}/starneighbours`) or its error once failed.
+
+    Raises:
+        HTTPException: If the job does not exist, a 404 Not Found exception is raised.
+    """
+    job = await get_job(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found",
+        )
+    return MsgspecJSONResponse(format_job(job))
@@ -0,0 +1,45 @@
+"""Tests for the Jobs app models.
+
+This module contains tests for the job-related models.
+"""
+
+from typing import Any
+
+import pytest
+from pydantic import ValidationError
+
+from apps.jobs.models import Job, StarNeighboursJobRequest
+
+
+def test_job() -> None:
+    """Tests the Job model.
+
+    Tests that the Job model is correctly initialized, as a pending job without
+    progress nor result.
+    """
+    job = Job(
+        id="id",
+        key="pabroux/unvx:full",
+        user="pabroux",
+        repo="unvx",
+        view="full",
+        created_by="username",
+        created_at=0,
+        updated_at=0,
+    )
+    assert job.status == "pending"
+    assert (job.done, job.total) == (0, 0)
+    assert job.result is None
+    assert job.error is None
+
+
+def test_star_neighbours_job_request() -> None:
+    """Tests the StarNeighboursJobRequest model.
+
+    Tests that the view defaults to "full" and that an unknown view is rejected.
+    """
+    job_request = StarNeighboursJobRequest(user="pabroux", repo="unvx")
+    assert job_request.view == "full"
+    view: Any = "invalid"
+    with pytest.raises(ValidationError):
+        StarNeighboursJobRequest(user="pabroux", repo="unvx", view=view)
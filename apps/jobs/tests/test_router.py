@@ -0,0 +1,75 @@
+"""Tests for the router of the Jobs app.
+
+This module contains tests for job-related endpoints.
+"""
+
+import time
+from pathlib import Path
+
+from fastapi import status
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from apps.auth.models import User
+from apps.auth.utils import get_current_active_user
+from apps.github.tests.utils import (
+    clear_caches,
+    mock_get_starneighbours_fetch_stargazers,
+    mock_get_starneighbours_fetch_starred_repos,
+)
+from apps.jobs.tests.utils import mock_engine
+from apps.shared.utils import get_formatted_content
+from main import app
+
+
+def test_starneighbours_job(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the /jobs/starneighbours and /jobs/<job_id> endpoints.
+
+    Tests that a created job gets a 202 Accepted with a `Location` header, that it is
+    run in the background until done with its result, that an identical job is reused
+    with a 200 OK, and that an unknown job gets a 404 Not Found.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the engine.
+        tmp_path (Path): A temporary directory for the database.
+    """
+    mock_engine(mocker, tmp_path)
+    clear_caches()
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux"])
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    app.dependency_overrides[get_current_active_user] = lambda: User(username="pabroux")
+    try:
+        with TestClient(app) as client:
+            body = {"user": "pabroux", "repo": "unvx", "view": "counts"}
+            resp = client.post("/jobs/starneighbours", json=body)
+            assert resp.status_code == status.HTTP_202_ACCEPTED
+            assert "X-RateLimit-Remaining" in resp.headers
+            job_url = resp.headers["Location"]
+            assert job_url == f"/jobs/{resp.json()['id']}"
+            deadline = time.monotonic() + 5
+            while (job := client.get(job_url).json())["status"] != "done":
+                assert time.monotonic() < deadline
+                time.sleep(0.01)
+            assert job["progress"] == {"done": 1, "total": 1}
+            assert job["result"] == [{"repo": "pabroux/unvx", "count": 1}]
+            resp_reused = client.post("/jobs/starneighbours", json=body)
+            assert resp_reused.status_code == status.HTTP_200_OK
+            assert resp_reused.json() == job
+            resp_unknown = client.get("/jobs/unknown")
+            assert resp_unknown.status_code == status.HTTP_404_NOT_FOUND
+            assert resp_unknown.json() == get_formatted_content(
+                "Job not found", status.HTTP_404_NOT_FOUND
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_get_job_unauthorized() -> None:
+    """Tests the /jobs/<job_id> endpoint without a valid token.
+
+    Tests the response is a 401 Unauthorized.
+    """
+    resp = TestClient(app).get(
+        "/jobs/unknown", headers={"Authorization": "Bearer invalid_token"}
+    )
+    assert resp.status_code == status.HTTP_401_UNAUTHORIZED
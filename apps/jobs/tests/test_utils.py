@@ -0,0 +1,187 @@
+"""Tests for the utilities of the Jobs app.
+
+This module contains tests for utility functions dedicated to run jobs in the
+background.
+"""
+
+from pathlib import Path
+from time import time
+from unittest.mock import AsyncMock
+
+import anyio
+import msgspec
+import pytest
+from pytest_mock import MockerFixture
+
+from apps.github.exceptions import GitHubException
+from apps.github.tests.utils import (
+    clear_caches,
+    mock_get_starneighbours_fetch_stargazers,
+    mock_get_starneighbours_fetch_starred_repos,
+)
+from apps.github.utils import neighbours_cache
+from apps.jobs.models import StarNeighboursJobRequest
+from apps.jobs.tests.utils import mock_engine
+from apps.jobs.utils import JobRunner, create_job, format_job, get_job, run_job
+
+# aiosqlite requires asyncio
+pytestmark = [pytest.mark.anyio, pytest.mark.parametrize("anyio_backend", ["asyncio"])]
+
+
+async def test_create_job(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the `create_job` function.
+
+    Tests that an identical job pending or recently done is reused, and that a job
+    with another view, or identical to a job done for too long, is created.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the engine.
+        tmp_path (Path): A temporary directory for the database.
+    """
+    mock_engine(mocker, tmp_path)
+    async with JobRunner(workers=1).run():
+        job_request = StarNeighboursJobRequest(user="pabroux", repo="unvx")
+        job, created = await create_job(job_request, "username")
+        assert created and job.status == "pending" and job.created_by == "username"
+        assert await create_job(job_request, "other") == (job, False)
+        job_request_counts = StarNeighboursJobRequest(
+            user="pabroux", repo="unvx", view="counts"
+        )
+        assert (await create_job(job_request_counts, "username"))[1]
+        mocker.patch("apps.jobs.utils.compute_starneighbours", return_value=([], 1.0))
+        await run_job(job.id)
+        assert (await create_job(job_request, "username"))[0].id == job.id
+        mocker.patch("apps.jobs.utils.settings.JOB_RESULT_TTL", -1)
+        assert (await create_job(job_request, "username"))[0].id != job.id
+
+
+async def test_create_job_concurrent(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the `create_job` function with identical jobs created at once.
+
+    Tests that a single job is created, the others reusing it.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the engine.
+        tmp_path (Path): A temporary directory for the database.
+    """
+    mock_engine(mocker, tmp_path)
+    async with JobRunner(workers=0).run():
+        job_request = StarNeighboursJobRequest(user="pabroux", repo="unvx")
+        results = []
+
+        async def create() -> None:
+            results.append(await create_job(job_request, "username"))
+
+        async with anyio.create_task_group() as task_group:
+            for _ in range(8):
+                task_group.start_soon(create)
+        assert sum(created for _, created in results) == 1
+        assert len({job.id for job, _ in results}) == 1
+
+
+async def test_run_job(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the `run_job` function.
+
+    Tests that a job is run once, with its progress and result saved, its result put
+    in the star neighbours cache, and that a job whose computation fails is saved
+    with its error.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the engine.
+        tmp_path (Path): A temporary directory for the database.
+    """
+    mock_engine(mocker, tmp_path)
+    mocker.patch("apps.jobs.utils.PROGRESS_SAVE_INTERVAL", 0)
+    clear_caches()
+    mock_get_starneighbours_fetch_stargazers(mocker, content=["pabroux", "Sulfyderz"])
+    mock_get_starneighbours_fetch_starred_repos(mocker, content=["pabroux/unvx"])
+    async with JobRunner(workers=1).run():
+        job_request = StarNeighboursJobRequest(user="pabroux", repo="unvx")
+        job, _ = await create_job(job_request, "username")
+        await run_job(job.id)
+        job_done = await get_job(job.id)
+        assert job_done is not None
+        expected = [{"repo": "pabroux/unvx", "stargazers": ["pabroux", "Sulfyderz"]}]
+        assert job_done.status == "done"
+        assert (job_done.done, job_done.total) == (2, 2)
+        assert job_done.result is not None
+        assert msgspec.json.decode(job_done.result) == expected
+        cached = neighbours_cache.get(("pabroux", "unvx", "full"))
+        assert cached is not None and cached.body == job_done.result
+        mock_compute = mocker.patch("apps.jobs.utils.compute_starneighbours")
+        await run_job(job.id)
+        mock_compute.assert_not_called()
+
+        mock_compute.side_effect = GitHubException(detail="Not Found")
+        job, _ = await create_job(
+            StarNeighboursJobRequest(user="pabroux", repo="unknown"), "username"
+        )
+        await run_job(job.id)
+        job_failed = await get_job(job.id)
+        assert job_failed is not None
+        assert (job_failed.status, job_failed.error) == ("failed", "Not Found")
+        mock_compute.side_effect = ValueError
+        job, _ = await create_job(
+            StarNeighboursJobRequest(user="pabroux", repo="broken"), "username"
+        )
+        await run_job(job.id)
+        job_failed = await get_job(job.id)
+        assert job_failed is not None
+        assert (job_failed.status, job_failed.error) == ("failed", "Internal error")
+        assert await get_job("unknown") is None
+
+
+async def test_job_runner(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the `JobRunner` class.
+
+    Tests that the jobs submitted are run by the workers, that a job running since the
+    server started is not run again, and that the jobs left unfinished by a shutdown are
+    run once the server is started again.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the engine.
+        tmp_path (Path): A temporary directory for the database.
+    """
+    mock_engine(mocker, tmp_path)
+    computed = anyio.Event()
+    release = anyio.Event()
+
+    async def compute(*_: object) -> tuple[list[object], float]:
+        computed.set()
+        await release.wait()
+        return [], 1.0
+
+    mocker.patch("apps.jobs.utils.compute_starneighbours", compute)
+    job_runner = JobRunner(workers=1)
+    async with job_runner.run():
+        job, _ = await create_job(
+            StarNeighboursJobRequest(user="pabroux", repo="unvx"), "username"
+        )
+        job_runner.submit(job.id)
+        await computed.wait()
+    job_interrupted = await get_job(job.id)
+    assert job_interrupted is not None and job_interrupted.status == "running"
+
+    job_runner.submit(job.id)  # Ignored while the workers are stopped
+    mock_compute = mocker.patch(
+        "apps.jobs.utils.compute_starneighbours", AsyncMock(return_value=([], 1.0))
+    )
+    # Running since this server started, e.g. in another worker process
+    await run_job(job.id)
+    mock_compute.assert_not_awaited()
+    # As if the server were restarted
+    mocker.patch("stargazer.settings.SERVER_STARTED_AT", time())
+    async with job_runner.run():
+        with anyio.fail_after(5):
+            while (job_done := await get_job(job.id)) and job_done.status != "done":
+                await anyio.sleep(0.01)
+    assert job_done is not None
+    assert format_job(job_done) == {
+        "id": job.id,
+        "status": "done",
+        "repo": "pabroux/unvx",
+        "view": "full",
+        "progress": {"done": 0, "total": 0},
+        "result": msgspec.Raw(b"[]"),
+        "error": None,
+    }
@@ -0,0 +1,30 @@
+"""Test utilities for the Jobs app.
+
+This module provides test utility functions for the Jobs app.
+"""
+
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+
+
+def mock_engine(mocker: MockerFixture, tmp_path: Path) -> AsyncEngine:
+    """Mocks the engine used by the Jobs app with one of a temporary SQLite database.
+
+    Connections are not pooled, so that the engine can be used from several event
+    loops (e.g. the one of a `TestClient`). The tables are created by `JobRunner.run`.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the engine.
+        tmp_path (Path): A temporary directory for the database.
+
+    Returns:
+        AsyncEngine: The engine of the temporary database.
+    """
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path}/jobs.db", poolclass=NullPool
+    )
+    mocker.patch("apps.jobs.utils.get_engine", return_value=engine)
+    return engine
@@ -0,0 +1,330 @@
+"""Utilities for the Jobs app.
+
+This module provides utility functions for running star neighbour computations in the
+background.
+"""
+
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from math import inf
+from time import monotonic, time
+from typing import Any, cast
+from uuid import uuid4
+
+import anyio
+import msgspec
+from anyio.streams.memory import MemoryObjectReceiveStream, MemoryObjectSendStream
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import col, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from apps.auth.utils import get_engine
+from apps.github.exceptions import GitHubException
+from apps.github.utils import (
+    CallCounter,
+    NeighboursView,
+    cache_neighbours,
+    compute_starneighbours,
+    create_github_client,
+    neighbours_query_pages,
+    rate_limiter,
+)
+from apps.jobs.models import Job, StarNeighboursJobRequest
+from apps.shared.compression import PrecompressedBody
+from apps.shared.metrics import Metric, collectors
+from apps.shared.ratelimit import RateLimit
+from apps.shared.responses import json_encoder
+from apps.shared.tracing import tracer
+from apps.shared.utils import handle_database_errors
+from stargazer import settings
+
+# Minimum number of seconds between two saves of the progress of a job
+PROGRESS_SAVE_INTERVAL = 1.0
+
+# Conditions on the status of the jobs
+UNFINISHED = or_(col(Job.status) == "pending", col(Job.status) == "running")
+FINISHED = or_(col(Job.status) == "done", col(Job.status) == "failed")
+
+
+class JobRunner:
+    """Pool of workers running the jobs in the background.
+
+    Jobs are persisted in the database, so that the pending jobs, and the running ones
+    interrupted by a shutdown, are run once the app starts again.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.running = 0
+        self._sender: MemoryObjectSendStream[str] | None = None
+
+    def collect(self) -> Iterator[Metric]:
+        """Collects the metrics of the workers.
+
+        Yields:
+            Metric: The number of jobs running, and of jobs submitted waiting for a
+            worker.
+        """
+        queued = (
+            0 if self._sender is None else self._sender.statistics().current_buffer_used
+        )
+        yield Metric("jobs_running", "gauge", "Jobs running", self.running)
+        yield Metric("jobs_queued", "gauge", "Jobs waiting for a worker", queued)
+
+    @asynccontextmanager
+    async def run(self) -> AsyncIterator[None]:
+        """Runs the workers until exited, resuming the jobs left unfinished.
+
+        Yields:
+            None: Once the workers are started, until they are to be stopped.
+        """
+        async with get_engine().begin() as connection:
+            await connection.run_sync(
+                Job.__table__.create,  # type: ignore[attr-defined]
+                checkfirst=True,
+            )
+        await prune_jobs()
+        sender, receiver = anyio.create_memory_object_stream[str](max_buffer_size=inf)
+        async with sender, receiver, anyio.create_task_group() as task_group:
+            for _ in range(self.workers):
+                task_group.start_soon(self._work, receiver.clone())
+            async with AsyncSession(get_engine()) as session:
+                statement = (
+                    select(Job.id).where(UNFINISHED).order_by(col(Job.created_at))
+                )
+                for job_id in await session.exec(statement):
+                    sender.send_nowait(job_id)
+            self._sender = sender
+            try:
+                yield
+            finally:
+                self._sender = None
+                task_group.cancel_scope.cancel()
+
+    def submit(self, job_id: str) -> None:
+        """Submits a job to the workers.
+
+        If the workers are not running, the job is left pending until they are started.
+
+        Args:
+            job_id (str): The ID of the job to run.
+        """
+        if self._sender is not None:
+            self._sender.send_nowait(job_id)
+
+    async def _work(self, receiver: MemoryObjectReceiveStream[str]) -> None:
+        """Runs the submitted jobs, one at a time, each in its own trace.
+
+        Args:
+            receiver (MemoryObjectReceiveStream[str]): The stream of the IDs of the jobs
+            submitted.
+        """
+        async with receiver:
+            async for job_id in receiver:
+                self.running += 1
+                try:
+                    with tracer.trace("job", job_id=job_id):
+                        await run_job(job_id)
+                finally:
+                    self.running -= 1
+
+
+async def create_job(
+    job_request: StarNeighboursJobRequest, created_by: str
+) -> tuple[Job, bool]:
+    """Creates a star neighbours job, unless an identical one can be reused.
+
+    A pending or running job for the same repository and view, or one done within the
+    time set by the `JOB_RESULT_TTL` environment variable, is reused instead, so that
+    identical jobs share their computation and result. Identical jobs created at once
+    are deduplicated by the database, which lets a single one of them in.
+
+    Args:
+        job_request (StarNeighboursJobRequest): The repository and view of the job.
+        created_by (str): The username of the user creating the job.
+
+    Returns:
+        tuple[Job, bool]: The job, and whether it was created (i.e. not reused).
+
+    Raises:
+        HTTPException: If unable to connect to the database, a 503 Service
+        Unavailable exception is raised.
+    """
+    key = f"{job_request.user}/{job_request.repo}:{job_request.view}"
+    now = time()
+    with handle_database_errors():
+        async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+            statement = (
+                select(Job)
+                .where(
+                    Job.key == key,
+                    or_(
+                        UNFINISHED,
+                        and_(
+                            col(Job.status) == "done",
+                            col(Job.updated_at) > now - settings.JOB_RESULT_TTL,
+                        ),
+                    ),
+                )
+                .order_by(col(Job.created_at).desc())
+            )
+            job = (await session.exec(statement)).first()
+            if job is not None:
+                return job, False
+            job = Job(
+                id=uuid4().hex,
+                key=key,
+                user=job_request.user,
+                repo=job_request.repo,
+                view=job_request.view,
+                created_by=created_by,
+                created_at=now,
+                updated_at=now,
+            )
+            session.add(job)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # An identical job was created meanwhile, the unique index on the key
+                # of the unfinished jobs only letting one of them in
+                await session.rollback()
+                job = (await session.exec(statement)).first()
+                if job is None:
+                    raise
+                return job, False
+            return job, True
+
+
+def format_job(job: Job) -> dict[str, Any]:
+    """Formats a job for a response.
+
+    Args:
+        job (Job): The job to format.
+
+    Returns:
+        dict[str, Any]: The ID, status, repository, view and progress of the job, along
+        with its result (as is, without being decoded) once done or its error once
+        failed.
+    """
+    return {
+        "id": job.id,
+        "status": job.status,
+        "repo": f"{job.user}/{job.repo}",
+        "view": job.view,
+        "progress": {"done": job.done, "total": job.total},
+        "result": None if job.result is None else msgspec.Raw(job.result),
+        "error": job.error,
+    }
+
+
+async def get_job(job_id: str) -> Job | None:
+    """Retrieves a job by its ID.
+
+    Args:
+        job_id (str): The ID of the job.
+
+    Returns:
+        Job | None: The job if found, otherwise None.
+
+    Raises:
+        HTTPException: If unable to connect to the database, a 503 Service
+        Unavailable exception is raised.
+    """
+    with handle_database_errors():
+        async with AsyncSession(get_engine()) as session:
+            return await session.get(Job, job_id)
+
+
+async def prune_jobs() -> None:
+    """Deletes the jobs finished for longer than the time set by `JOB_RESULT_TTL`."""
+    async with get_engine().begin() as connection:
+        await connection.execute(
+            delete(Job).where(
+                FINISHED,
+                col(Job.updated_at) < time() - settings.JOB_RESULT_TTL,
+            )
+        )
+
+
+async def run_job(job_id: str) -> None:
+    """Runs a star neighbours job.
+
+    The job is claimed atomically, so that it is only run once even if submitted
+    several times, or resumed by several worker processes: a running job is only
+    claimed again if left running before the server started (see `SERVER_STARTED_AT`).
+    Its progress is saved at most every `PROGRESS_SAVE_INTERVAL` seconds, and its
+    result is put in the star neighbours cache too. The GitHub API calls made are
+    charged to the user who created the job.
+
+    Args:
+        job_id (str): The ID of the job to run.
+    """
+    async with get_engine().begin() as connection:
+        claimed = await connection.execute(
+            update(Job)
+            .where(
+                col(Job.id) == job_id,
+                or_(
+                    col(Job.status) == "pending",
+                    # Left running by a shutdown, not by another worker process
+                    and_(
+                        col(Job.status) == "running",
+                        col(Job.updated_at) < settings.SERVER_STARTED_AT,
+                    ),
+                ),
+            )
+            .values(status="running", updated_at=time())
+        )
+    if not claimed.rowcount:
+        return
+
+    async with AsyncSession(get_engine(), expire_on_commit=False) as session:
+        job = await session.get(Job, job_id)
+        if job is None:
+            return
+        saved = monotonic()
+
+        async def save_progress(done: int, total: int) -> None:
+            nonlocal saved
+            job.done, job.total = done, total
+            if monotonic() - saved >= PROGRESS_SAVE_INTERVAL:
+                job.updated_at = time()
+                session.add(job)
+                await session.commit()
+                saved = monotonic()
+
+        # Imported on first use, as in the GitHub app
+        import httpx  # pylint: disable=import-outside-toplevel
+
+        view = cast(NeighboursView, job.view)
+        counter = CallCounter()
+        try:
+            async with create_github_client(counter) as client:
+                neighbours, _ = await compute_starneighbours(
+                    client, job.user, job.repo, view, save_progress
+                )
+        except (GitHubException, httpx.HTTPError) as exc:
+            job.status = "failed"
+            job.error = str(getattr(exc, "detail", exc))
+        except Exception:  # pylint: disable=broad-exception-caught
+            # Fail the job rather than the worker, which runs the next jobs
+            job.status = "failed"
+            job.error = "Internal error"
+        else:
+            job.result = json_encoder.encode(neighbours)
+            job.status = "done"
+            cache_neighbours((job.user, job.repo, view), PrecompressedBody(job.result))
+        finally:
+            # Charged even if cancelled by a shutdown, the calls having been made
+            neighbours_query_pages.observe(counter.calls, "job")
+            with anyio.CancelScope(shield=True):
+                await rate_limiter.charge(RateLimit(job.created_by, 0), counter.calls)
+        job.updated_at = time()
+        session.add(job)
+        await session.commit()
+    await prune_jobs()
+
+
+job_runner = JobRunner(settings.JOB_WORKERS)
+collectors.append(job_runner.collect)
@@ -0,0 +1,164 @@
+"""Admission control for the app.
+
+This module contains a concurrency gate shedding load once overloaded, that can be used
+by any app.
+"""
+
+import heapq
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from itertools import count
+
+import anyio
+from fastapi import HTTPException, status
+
+from apps.shared.metrics import Metric
+
+# Priorities of the admitted tasks, the lowest being admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+class Waiter:  # pylint: disable=too-few-public-methods
+    """Task waiting in the queue of an admission gate."""
+
+    __slots__ = ("admitted", "cancelled", "event")
+
+    def __init__(self) -> None:
+        self.admitted = False
+        self.cancelled = False
+        self.event = anyio.Event()
+
+
+class AdmissionGate:  # pylint: disable=too-many-instance-attributes
+    """Gate bounding the number of tasks running at once.
+
+    Tasks beyond the concurrency limit wait in a short queue, by priority then in order
+    of arrival, for at most a queue-time deadline. Tasks arriving while the queue is
+    full, or still waiting at the deadline, are shed with a 503 Service Unavailable, so
+    that the admitted tasks keep a stable latency under bursts.
+    """
+
+    def __init__(
+        self, name: str, max_concurrency: int, queue_size: int, timeout: float
+    ):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.running = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed: dict[str, int] = {"queue_full": 0, "deadline": 0}
+        self._queue: list[tuple[int, int, Waiter]] = []
+        self._arrivals = count()
+
+    @asynccontextmanager
+    async def admit(self, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[None]:
+        """Admits a task through the gate, waiting in queue if needed.
+
+        Args:
+            priority (int): The priority of the task, the lowest being admitted first
+            (defaults to `PRIORITY_INTERACTIVE`).
+
+        Yields:
+            None: Once admitted, until the task is done.
+
+        Raises:
+            HTTPException: If the queue is full or the task is still waiting at the
+            deadline, a 503 Service Unavailable exception is raised, with a
+            `Retry-After` header.
+        """
+        if self.running < self.max_concurrency and not self.queued:
+            self.running += 1
+        else:
+            await self._wait(priority)
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    def collect(self) -> Iterator[Metric]:
+        """Collects the metrics of the gate.
+
+        Yields:
+            Metric: The number of tasks running and queued, and the number of tasks
+            admitted and shed (by reason) since startup.
+        """
+        yield Metric(f"{self.name}_running", "gauge", "Tasks running", self.running)
+        yield Metric(f"{self.name}_queued", "gauge", "Tasks waiting", self.queued)
+        yield Metric(
+            f"{self.name}_admitted_total", "counter", "Tasks admitted", self.admitted
+        )
+        for reason, shed in self.shed.items():
+            yield Metric(
+                f"{self.name}_shed_total",
+                "counter",
+                "Tasks shed",
+                shed,
+                {"reason": reason},
+            )
+
+    async def _wait(self, priority: int) -> None:
+        """Waits in queue until admitted.
+
+        Args:
+            priority (int): The priority of the task, the lowest being admitted first.
+
+        Raises:
+            HTTPException: If the queue is full or the task is still waiting at the
+            deadline, a 503 Service Unavailable exception is raised.
+        """
+        if self.queued >= self.queue_size:
+            self._shed("queue_full")
+        if len(self._queue) > 2 * self.queue_size:
+            # Drop the cancelled waiters, so that the queue stays bounded
+            self._queue = [entry for entry in self._queue if not entry[2].cancelled]
+            heapq.heapify(self._queue)
+        waiter = Waiter()
+        heapq.heappush(self._queue, (priority, next(self._arrivals), waiter))
+        self.queued += 1
+        try:
+            with anyio.move_on_after(self.timeout):
+                await waiter.event.wait()
+        except BaseException:
+            # Cancelled once admitted, the slot goes to the next waiting task
+            if waiter.admitted:
+                self._release()
+            raise
+        finally:
+            if not waiter.admitted:
+                # Left in the queue, skipped once popped
+                waiter.cancelled = True
+                self.queued -= 1
+        if not waiter.admitted:
+            self._shed("deadline")
+
+    def _release(self) -> None:
+        """Hands the slot of a task done over to the next waiting task, if any."""
+        while self._queue:
+            _, _, waiter = heapq.heappop(self._queue)
+            if not waiter.cancelled:
+                waiter.admitted = True
+                self.queued -= 1
+                waiter.event.set()
+                return
+        self.running -= 1
+
+    def _shed(self, reason: str) -> None:
+        """Sheds a task.
+
+        Args:
+            reason (str): The reason for shedding the task, "queue_full" or "deadline".
+
+        Raises:
+            HTTPException: A 503 Service Unavailable exception, with a `Retry-After`
+            header.
+        """
+        self.shed[reason] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server overloaded",
+            headers={"Retry-After": str(max(1, round(self.timeout)))},
+        )
@@ -0,0 +1,168 @@
+"""Cache for the app.
+
+This module contains an in-memory cache that can be used by any app.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator
+from time import monotonic
+from typing import Generic, TypeVar
+
+from apps.shared.metrics import Metric
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+def collect_lookups(name: str, hits: int, misses: int) -> Iterator[Metric]:
+    """Collects the metrics of the lookups of a cache.
+
+    Args:
+        name (str): The name of the cache, labelling its metrics.
+        hits (int): The number of lookups that hit the cache.
+        misses (int): The number of lookups that missed the cache.
+
+    Yields:
+        Metric: The number of hits and misses, and the hit ratio of the cache.
+    """
+    labels = {"cache": name}
+    lookups = hits + misses
+    yield Metric("cache_hits_total", "counter", "Cache hits", hits, labels)
+    yield Metric("cache_misses_total", "counter", "Cache misses", misses, labels)
+    yield Metric(
+        "cache_hit_ratio",
+        "gauge",
+        "Ratio of the lookups hitting the cache",
+        hits / lookups if lookups else 0.0,
+        labels,
+    )
+
+
+class TTLCache(Generic[K, V]):
+    """Bounded in-memory cache whose entries expire after a time to live.
+
+    When full, the least recently used entry is evicted. The number of hits and
+    misses is tracked to compute the hit ratio of the cache. An optional callback is
+    called with each entry leaving the cache (evicted, expired, popped or replaced),
+    except when cleared, so that data derived from the entries can be kept in sync.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        on_evict: Callable[[K, V], None] | None = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        """Removes all the entries of the cache."""
+        self._entries.clear()
+
+    def collect(self, name: str) -> Iterator[Metric]:
+        """Collects the metrics of the cache.
+
+        Args:
+            name (str): The name of the cache, labelling its metrics.
+
+        Yields:
+            Metric: The number of entries, the number of hits and misses since startup,
+            and the hit ratio of the cache.
+        """
+        labels = {"cache": name}
+        yield Metric("cache_entries", "gauge", "Entries in cache", len(self), labels)
+        yield from collect_lookups(name, self.hits, self.misses)
+
+    def get(self, key: K) -> V | None:
+        """Gets the value associated with a key.
+
+        Args:
+            key (K): The key to look up.
+
+        Returns:
+            V | None: The value if the key is cached and not expired, otherwise None.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None:
+                del self._entries[key]
+                self._evicted(key, entry[1])
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def items(self) -> Iterator[tuple[K, V, float]]:
+        """Iterates over the entries not expired, from the least recently used.
+
+        Yields:
+            tuple[K, V, float]: The key, the value and the number of seconds before the
+            entry expires.
+        """
+        now = monotonic()
+        for key, (expires, value) in self._entries.items():
+            if expires > now:
+                yield key, value, expires - now
+
+    def pop(self, key: K) -> V | None:
+        """Removes a key from the cache.
+
+        Args:
+            key (K): The key to remove.
+
+        Returns:
+            V | None: The value associated with the key if cached, otherwise None.
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return None
+        self._evicted(key, entry[1])
+        return entry[1]
+
+    def time_to_live(self, key: K) -> float:
+        """Gets the number of seconds before a key expires.
+
+        Args:
+            key (K): The key to look up.
+
+        Returns:
+            float: The number of seconds before the key expires, 0 if not cached.
+        """
+        entry = self._entries.get(key)
+        return 0.0 if entry is None else max(0.0, entry[0] - monotonic())
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Associates a value with a key for a time to live.
+
+        Args:
+            key (K): The key to associate the value with.
+            value (V): The value to cache.
+            ttl (float | None): The number of seconds the value remains in cache
+            (defaults to the time to live of the cache).
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._evicted(key, entry[1])
+        self._entries[key] = (monotonic() + (self.ttl if ttl is None else ttl), value)
+        while len(self._entries) > self.max_size:
+            evicted_key, (_, evicted_value) = self._entries.popitem(last=False)
+            self._evicted(evicted_key, evicted_value)
+
+    def _evicted(self, key: K, value: V) -> None:
+        """Calls the eviction callback, if any, with an entry leaving the cache.
+
+        Args:
+            key (K): The key of the entry.
+            value (V): The value of the entry.
+        """
+        if self.on_evict is not None:
+            self.on_evict(key, value)
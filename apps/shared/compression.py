@@ -0,0 +1,223 @@
+"""Compression for the app.
+
+This module contains the negotiation of content encodings (gzip, Brotli and Zstandard)
+and a compression middleware that can be used by any app.
+"""
+
+import gzip
+import threading
+from collections.abc import Callable
+from hashlib import blake2b
+
+import anyio
+import brotli  # type: ignore[import-untyped]
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from stargazer import settings
+
+# Zstandard compressors, one per thread as they are not thread-safe (bodies being
+# compressed concurrently in worker threads)
+zstd_compressors = threading.local()
+
+
+def compress_zstd(body: bytes) -> bytes:
+    """Compresses a body with Zstandard, with the compressor of the current thread.
+
+    Args:
+        body (bytes): The body to compress.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    compressor = getattr(zstd_compressors, "compressor", None)
+    if compressor is None:
+        compressor = zstd_compressors.compressor = zstandard.ZstdCompressor(level=3)
+    return bytes(compressor.compress(body))
+
+
+# Compressors by content encoding, in order of preference when equally accepted
+COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    "zstd": compress_zstd,
+    "br": lambda body: bytes(brotli.compress(body, quality=5)),
+    "gzip": lambda body: gzip.compress(body, compresslevel=6),
+}
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Negotiates the content encoding of a response.
+
+    Picks the supported content encoding with the highest quality value in the given
+    `Accept-Encoding` header. Ties are broken by the order of `COMPRESSORS`.
+
+    Args:
+        accept_encoding (str | None): The `Accept-Encoding` header of the request.
+
+    Returns:
+        str | None: The negotiated content encoding, or None to send the response
+        uncompressed.
+    """
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for coding in accept_encoding.lower().split(","):
+        name, _, params = coding.partition(";")
+        quality = 1.0
+        param, _, value = params.partition("=")
+        if param.strip() == "q":
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[name.strip()] = quality
+    wildcard = qualities.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in COMPRESSORS:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+async def compress(body: bytes, encoding: str) -> bytes:
+    """Compresses a body with the given content encoding.
+
+    Bodies larger than the size set by the `COMPRESSION_OFFLOAD_SIZE` environment
+    variable are compressed in a worker thread, so that the event loop is not blocked.
+
+    Args:
+        body (bytes): The body to compress.
+        encoding (str): The content encoding, among the keys of `COMPRESSORS`.
+
+    Returns:
+        bytes: The compressed body.
+    """
+    compressor = COMPRESSORS[encoding]
+    if len(body) >= settings.COMPRESSION_OFFLOAD_SIZE:
+        return await anyio.to_thread.run_sync(compressor, body)
+    return compressor(body)
+
+
+class PrecompressedBody:
+    """Body kept along with its compressed variants and entity tag.
+
+    Each variant is compressed once, on first request, then reused as is. The strong
+    entity tag of a variant is derived from the one of the uncompressed body, as each
+    variant is a distinct representation.
+    """
+
+    __slots__ = ("body", "digest", "variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.digest = blake2b(body, digest_size=16).hexdigest()
+        self.variants: dict[str, bytes] = {}
+
+    def etag(self, encoding: str | None) -> str:
+        """Gets the strong entity tag of a variant of the body.
+
+        Args:
+            encoding (str | None): The content encoding of the variant, or None if
+            uncompressed.
+
+        Returns:
+            str: The quoted entity tag of the variant.
+        """
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def negotiate(self, accept_encoding: str | None) -> str | None:
+        """Negotiates the content encoding of the body with an `Accept-Encoding` header.
+
+        Args:
+            accept_encoding (str | None): The `Accept-Encoding` header of the request.
+
+        Returns:
+            str | None: The negotiated content encoding, or None if the body is to be
+            sent uncompressed (e.g. it is smaller than `COMPRESSION_MINIMUM_SIZE`).
+        """
+        if len(self.body) < settings.COMPRESSION_MINIMUM_SIZE:
+            return None
+        return negotiate_encoding(accept_encoding)
+
+    async def variant(self, encoding: str | None) -> bytes:
+        """Gets a variant of the body, compressing it on first request.
+
+        Args:
+            encoding (str | None): The content encoding of the variant, or None if
+            uncompressed.
+
+        Returns:
+            bytes: The body, compressed with the given content encoding if any.
+        """
+        if encoding is None:
+            return self.body
+        variant = self.variants.get(encoding)
+        if variant is None:
+            variant = self.variants[encoding] = await compress(self.body, encoding)
+        return variant
+
+
+class CompressionMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware compressing responses.
+
+    Compresses the responses whose body is at least `COMPRESSION_MINIMUM_SIZE` bytes
+    long with the content encoding negotiated from the `Accept-Encoding` header.
+    Responses already encoded (e.g. precompressed) and streamed responses are sent as is.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = message.get("body", b"")
+            if (
+                not message.get("more_body", False)
+                and len(body) >= settings.COMPRESSION_MINIMUM_SIZE
+                and "content-encoding" not in headers
+                and is_compressible(headers.get("content-type", ""))
+            ):
+                body = await compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+                headers.add_vary_header("Accept-Encoding")
+                message = {**message, "body": body}
+            await send(start_message)
+            start_message = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def is_compressible(content_type: str) -> bool:
+    """Checks whether a content type is worth compressing.
+
+    Args:
+        content_type (str): The `Content-Type` header of the response.
+
+    Returns:
+        bool: True if the content type is textual (e.g. JSON), otherwise False.
+    """
+    media_type = content_type.partition(";")[0].strip().lower()
+    return media_type.startswith("text/") or media_type.endswith(
+        ("json", "javascript", "xml")
+    )
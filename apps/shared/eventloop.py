@@ -0,0 +1,125 @@
+"""Event loop monitoring for the app.
+
+This module contains a monitor measuring the lag of the event loop continuously, and
+capturing in debug mode the stack of the code blocking it, that can be used by any app.
+"""
+
+import logging
+import sys
+import threading
+import traceback
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from time import perf_counter
+
+import anyio
+
+from apps.shared.metrics import Histogram, Metric, collectors
+from stargazer import settings
+
+logger = logging.getLogger(__name__)
+
+# Lags of the event loop, from well below a millisecond to a blocked loop
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class LoopMonitor:
+    """Monitor of the lag of the event loop.
+
+    A task sleeps for `interval` seconds again and again, the lag being the extra time
+    it takes to wake up, i.e. the time the event loop was busy running other code. The
+    lags are observed in a histogram.
+
+    In debug mode, a watchdog thread also checks that the task keeps waking up. Once the
+    event loop is blocked for more than `threshold` seconds, the stack of the code
+    blocking it is captured and logged as a warning, once per blocking.
+    """
+
+    def __init__(self, interval: float, threshold: float, debug: bool):
+        self.interval = interval
+        self.threshold = threshold
+        self.debug = debug
+        self.lag = Histogram(
+            "event_loop_lag_seconds", "Lag of the event loop", LAG_BUCKETS
+        )
+        self.blocked = 0
+        self.last_stack: list[str] = []
+        self._heartbeat = perf_counter()
+
+    def collect(self) -> Iterator[Metric]:
+        """Collects the metrics of the event loop.
+
+        Yields:
+            Metric: The histogram of the lags, and the number of blockings detected in
+            debug mode.
+        """
+        yield from self.lag.collect()
+        yield Metric(
+            "event_loop_blocked_total",
+            "counter",
+            "Blockings of the event loop beyond the threshold (debug mode only)",
+            self.blocked,
+        )
+
+    @asynccontextmanager
+    async def run(self) -> AsyncIterator[None]:
+        """Runs the monitor until exited.
+
+        Yields:
+            None: Once the monitor is started, until it is to be stopped.
+        """
+        stopped = threading.Event()
+        watchdog = threading.Thread(
+            target=self._watch, args=(threading.get_ident(), stopped), daemon=True
+        )
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(self._measure)
+            if self.debug:
+                watchdog.start()
+            try:
+                yield
+            finally:
+                task_group.cancel_scope.cancel()
+                stopped.set()
+        if watchdog.is_alive():
+            watchdog.join()
+
+    async def _measure(self) -> None:
+        """Measures the lag of the event loop, again and again."""
+        while True:
+            self._heartbeat = start = perf_counter()
+            await anyio.sleep(self.interval)
+            self.lag.observe(max(perf_counter() - start - self.interval, 0))
+
+    def _watch(self, thread_id: int, stopped: threading.Event) -> None:
+        """Captures the stack of the code blocking the event loop, until stopped.
+
+        Args:
+            thread_id (int): The ID of the thread running the event loop.
+            stopped (threading.Event): The event set once the monitor is stopped.
+        """
+        reported = None
+        while not stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked_for = perf_counter() - heartbeat - self.interval
+            if blocked_for <= self.threshold or heartbeat == reported:
+                continue
+            frame = sys._current_frames().get(thread_id)  # pylint: disable=protected-access
+            if frame is None:
+                continue
+            reported = heartbeat
+            self.blocked += 1
+            self.last_stack = traceback.format_stack(frame)
+            logger.warning(
+                "Event loop blocked for more than %.3f s, in:\n%s",
+                blocked_for,
+                "".join(self.last_stack),
+            )
+
+
+loop_monitor = LoopMonitor(
+    settings.LOOP_MONITOR_INTERVAL,
+    settings.LOOP_MONITOR_THRESHOLD,
+    settings.LOOP_MONITOR_DEBUG,
+)
+collectors.append(loop_monitor.collect)
@@ -7,35 +7,37 @@ from typing import Any
 
 from fastapi import FastAPI, status
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from starlette.requests import Request
 
+from apps.shared.responses import MsgspecJSONResponse
 from apps.shared.utils import get_formatted_content
 
 
-async def http_exception_handler(_: Request, exc: Any) -> JSONResponse:
+async def http_exception_handler(_: Request, exc: Any) -> MsgspecJSONResponse:
     """Handles HTTPExceptions and returns a formatted response.
 
-    For any HTTPException, the app returns a JSON response with a formatted content.
+    For any HTTPException, the app returns a JSON response with a formatted content,
+    along with the headers of the exception (e.g. `WWW-Authenticate` or `Retry-After`).
 
     Args:
         _ (Request): The request that triggered the exception.
         exc (Any): The exception instance.
 
     Returns:
-        JSONResponse: A JSON response with a formatted content.
+        MsgspecJSONResponse: A JSON response with a formatted content.
     """
-    return JSONResponse(
+    return MsgspecJSONResponse(
         status_code=exc.status_code,
         content=get_formatted_content(
             str(exc.detail),
             exc.status_code,
         ),
+        headers=getattr(exc, "headers", None),
     )
 
 
-async def validation_exception_handler(_: Request, exc: Any) -> JSONResponse:
+async def validation_exception_handler(_: Request, exc: Any) -> MsgspecJSONResponse:
     """Handles ValidationExceptions and returns a formatted response.
 
     For any ValidationException, the app returns a JSON response with a formatted
@@ -46,9 +48,9 @@ async def validation_exception_handler(_: Request, exc: Any) -> JSONResponse:
         exc (Any): The exception instance.
 
     Returns:
-        JSONResponse: A JSON response with a formatted content.
+        MsgspecJSONResponse: A JSON response with a formatted content.
     """
-    return JSONResponse(
+    return MsgspecJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content=get_formatted_content(
             "Invalid input",
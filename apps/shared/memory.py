@@ -0,0 +1,163 @@
+"""Memory instrumentation for the app.
+
+This module contains the tracemalloc snapshots of the memory allocated by the app, their
+statistics and differences, and the accounting of the peak memory allocated by regions
+of code (e.g. a star neighbour computation), that can be used by any app.
+"""
+
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from secrets import token_hex
+from typing import Any, Literal
+
+from apps.shared.cache import TTLCache
+from apps.shared.metrics import Histogram
+from stargazer import settings
+
+# Maximum number of snapshots kept, and number of seconds they are kept
+SNAPSHOTS_CACHE_SIZE = 8
+SNAPSHOTS_CACHE_TTL = 3600
+
+# Peak memory allocated by a region of code, from 64 KiB to 1 GiB
+MEMORY_BUCKETS = tuple(2.0**exponent for exponent in range(16, 31, 2))
+
+# Allocations left out of the snapshots, made by tracemalloc and the import system
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+StatisticsKey = Literal["filename", "lineno", "traceback"]
+
+# Snapshots taken, keyed by ID
+snapshots: TTLCache[str, tracemalloc.Snapshot] = TTLCache(
+    SNAPSHOTS_CACHE_SIZE, SNAPSHOTS_CACHE_TTL
+)
+
+
+def start_tracing() -> None:
+    """Starts tracing the memory allocations, unless already traced.
+
+    The allocations are traced with the number of frames set by the
+    `MEMORY_TRACEBACK_FRAMES` environment variable.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(settings.MEMORY_TRACEBACK_FRAMES)
+
+
+def stop_tracing() -> None:
+    """Stops tracing the memory allocations and drops the snapshots.
+
+    The allocations keep being traced if the `MEMORY_ACCOUNTING` environment variable
+    is set, only the snapshots being dropped.
+    """
+    snapshots.clear()
+    if not settings.MEMORY_ACCOUNTING:
+        tracemalloc.stop()
+
+
+def take_snapshot() -> tuple[str, tracemalloc.Snapshot]:
+    """Takes a snapshot of the memory allocated, starting the tracing if needed.
+
+    Only the memory allocated since the tracing started is traced, so that the first
+    snapshot is mostly a baseline for the next ones.
+
+    Returns:
+        tuple[str, tracemalloc.Snapshot]: The ID of the snapshot, and the snapshot.
+    """
+    start_tracing()
+    snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+    snapshot_id = token_hex(8)
+    snapshots.set(snapshot_id, snapshot)
+    return snapshot_id, snapshot
+
+
+def format_statistics(
+    snapshot: tracemalloc.Snapshot,
+    key_type: StatisticsKey = "lineno",
+    limit: int = 20,
+    compare_to: tracemalloc.Snapshot | None = None,
+) -> list[dict[str, Any]]:
+    """Formats the statistics of a snapshot, or its difference with an older one.
+
+    Args:
+        snapshot (tracemalloc.Snapshot): The snapshot.
+        key_type (StatisticsKey): How the allocations are grouped, by "filename",
+        "lineno" (default) or "traceback".
+        limit (int): The maximum number of groups (defaults to 20).
+        compare_to (tracemalloc.Snapshot | None): The older snapshot to compare with, if
+        any (defaults to None).
+
+    Returns:
+        list[dict[str, Any]]: The groups allocating the most memory (or whose allocated
+        memory changed the most), each with its traceback as "file:line" strings from
+        the most recent frame, its size in bytes and number of blocks, along with their
+        changes if compared.
+    """
+    if compare_to is None:
+        return [
+            {
+                "traceback": [str(frame) for frame in statistic.traceback],
+                "size": statistic.size,
+                "count": statistic.count,
+            }
+            for statistic in snapshot.statistics(key_type)[:limit]
+        ]
+    return [
+        {
+            "traceback": [str(frame) for frame in statistic.traceback],
+            "size": statistic.size,
+            "size_diff": statistic.size_diff,
+            "count": statistic.count,
+            "count_diff": statistic.count_diff,
+        }
+        for statistic in snapshot.compare_to(compare_to, key_type)[:limit]
+    ]
+
+
+class PeakMemoryTracker:  # pylint: disable=too-few-public-methods
+    """Accounting of the peak memory allocated by regions of code, with tracemalloc.
+
+    The peak of the memory traced is reset when a region starts while no other is
+    tracked, so that the peak allocated by a region alone is exact. The regions running
+    concurrently share the peak of the process, overestimating theirs.
+
+    Regions are only tracked while the memory allocations are traced (see the
+    `MEMORY_ACCOUNTING` environment variable), costing a single check otherwise.
+    """
+
+    def __init__(self) -> None:
+        self.active = 0
+
+    @contextmanager
+    def track(self, histogram: Histogram, *label_values: str) -> Iterator[None]:
+        """Tracks the peak memory allocated by a region of code.
+
+        Args:
+            histogram (Histogram): The histogram observing the peak, in bytes above the
+            memory traced at the start of the region.
+            *label_values (str): The values of the labels of the histogram.
+
+        Yields:
+            None: Until the region ends.
+        """
+        if not tracemalloc.is_tracing():
+            yield
+            return
+        if not self.active:
+            tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            if tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1]
+                histogram.observe(max(peak - start, 0), *label_values)
+
+
+peak_memory_tracker = PeakMemoryTracker()
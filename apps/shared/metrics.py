@@ -0,0 +1,212 @@
+"""Metrics for the app.
+
+This module contains the collection of metrics and their rendering in the Prometheus
+text format, along with the histograms, gauges and middleware measuring the app, that
+can be used by any app.
+
+The metrics are only updated from the event loop, so that they need no lock: updating a
+histogram is a bisection and two increments on preallocated buckets.
+"""
+
+import os
+import resource
+from bisect import bisect_left
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from math import inf
+from pathlib import Path
+from time import perf_counter
+from typing import NamedTuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Buckets of the histograms of durations, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metric(NamedTuple):
+    """Sample of a metric."""
+
+    name: str
+    kind: str  # "counter", "gauge" or "histogram"
+    help: str
+    value: float
+    labels: dict[str, str] | None = None
+    suffix: str = ""  # e.g. "_bucket", "_sum" or "_count" for a histogram
+
+
+# Collectors of the metrics, called on each scrape
+collectors: list[Callable[[], Iterable[Metric]]] = []
+
+
+class Gauge:  # pylint: disable=too-few-public-methods
+    """Gauge holding the last value set, exported once set."""
+
+    def __init__(self, name: str, help_: str):
+        self.name = name
+        self.help = help_
+        self.value: float | None = None
+
+    def collect(self) -> Iterator[Metric]:
+        """Collects the value of the gauge.
+
+        Yields:
+            Metric: The last value set, if any.
+        """
+        if self.value is not None:
+            yield Metric(self.name, "gauge", self.help, self.value)
+
+
+class Histogram:
+    """Histogram of observations, with one series of buckets per set of label values.
+
+    The buckets of a series are preallocated on its first observation, and each
+    observation only increments the count of its bucket and the sum of the series.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        help_: str,
+        buckets: Sequence[float],
+        label_names: Sequence[str] = (),
+    ):
+        self.name = name
+        self.help = help_
+        self.buckets = tuple(sorted(buckets))
+        self.label_names = tuple(label_names)
+        self._series: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Observes a value.
+
+        Args:
+            value (float): The value observed.
+            *label_values (str): The values of the labels, in the order of their names.
+        """
+        series = self._series.get(label_values)
+        if series is None:
+            # Counts of the buckets, then of +Inf, then the sum of the values
+            series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def collect(self) -> Iterator[Metric]:
+        """Collects the series of the histogram.
+
+        Yields:
+            Metric: The cumulative count of each bucket, then the sum and the count of
+            the values observed, for each series.
+        """
+        for label_values, series in self._series.items():
+            labels = dict(zip(self.label_names, label_values, strict=True))
+            count = 0
+            for bound, bucket in zip((*self.buckets, inf), series, strict=False):
+                count += int(bucket)
+                le = "+Inf" if bound == inf else str(bound)
+                yield Metric(
+                    self.name,
+                    "histogram",
+                    self.help,
+                    count,
+                    {**labels, "le": le},
+                    "_bucket",
+                )
+            yield Metric(self.name, "histogram", self.help, series[-1], labels, "_sum")
+            yield Metric(self.name, "histogram", self.help, count, labels, "_count")
+
+
+# Durations of the requests to the app, by route and status
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Duration of the requests",
+    LATENCY_BUCKETS,
+    ("method", "route", "status"),
+)
+collectors.append(http_request_duration.collect)
+
+
+def collect_process_memory() -> Iterator[Metric]:
+    """Collects the memory used by the process.
+
+    Yields:
+        Metric: The resident memory of the process in bytes, if known (i.e. on Linux),
+        and its peak.
+    """
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        pages = int(statm.read_text(encoding="ascii").split()[1])
+        yield Metric(
+            "process_resident_memory_bytes",
+            "gauge",
+            "Resident memory of the process",
+            pages * os.sysconf("SC_PAGE_SIZE"),
+        )
+    # The peak is in kilobytes on Linux
+    yield Metric(
+        "process_max_resident_memory_bytes",
+        "gauge",
+        "Peak resident memory of the process",
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    )
+
+
+collectors.append(collect_process_memory)
+
+
+class MetricsMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware measuring the duration of the requests by route and status.
+
+    Requests are labelled by the path template of their route (e.g.
+    "/repos/{user}/{repo}/starneighbours"), so that the number of series stays bounded,
+    the requests matching no route being labelled "unmatched".
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = perf_counter()
+        status_code = 500
+
+        async def send_measured(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            http_request_duration.observe(
+                perf_counter() - start, scope["method"], route, str(status_code)
+            )
+
+
+def render_metrics() -> str:
+    """Renders the metrics of the collectors in the Prometheus text format.
+
+    Returns:
+        str: The metrics, grouped by name, with one `HELP` and `TYPE` line per name.
+    """
+    families: dict[str, list[str]] = {}
+    for collector in collectors:
+        for metric in collector():
+            name = f"stargazer_{metric.name}"
+            lines = families.get(name)
+            if lines is None:
+                lines = families[name] = [
+                    f"# HELP {name} {metric.help}",
+                    f"# TYPE {name} {metric.kind}",
+                ]
+            labels = ""
+            if metric.labels:
+                labels = ",".join(
+                    f'{label}="{value}"' for label, value in metric.labels.items()
+                )
+                labels = f"{{{labels}}}"
+            lines.append(f"{name}{metric.suffix}{labels} {metric.value}")
+    return "".join(f"{line}\n" for lines in families.values() for line in lines)
@@ -0,0 +1,18 @@
+"""Models for the app.
+
+This module contains models that can be used by any app.
+"""
+
+from sqlmodel import Field, SQLModel
+
+
+class RateLimitBucket(SQLModel, table=True):
+    """Rate limit bucket model in the database (ORM).
+
+    Represents a token bucket of the shared rate limiter backend, with the number of
+    tokens it held at its last update (negative if in debt).
+    """
+
+    key: str = Field(primary_key=True)
+    tokens: float
+    updated: float
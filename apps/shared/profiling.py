@@ -0,0 +1,247 @@
+"""Profiling for the app.
+
+This module contains a wall-clock sampling profiler of a single request, aware of the
+coroutines it awaits, and a middleware running the requests asking for it under the
+profiler, that can be used by any app.
+"""
+
+import sys
+import threading
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from secrets import token_hex
+from time import perf_counter
+from types import CodeType, FrameType
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from apps.shared.cache import TTLCache
+from stargazer import settings
+
+# Maximum number of profiles kept for download, and number of seconds they are kept
+PROFILES_CACHE_SIZE = 32
+PROFILES_CACHE_TTL = 3600
+
+# Function of a frame: its qualified name, file and first line
+FrameKey = tuple[str, str, int]
+
+
+class Profile:
+    """Wall-clock sampling profile of a coroutine.
+
+    A thread samples the stack of the coroutine at a regular interval: the chain of the
+    coroutines it awaits, then the functions they call if running. The time awaited
+    (e.g. a GitHub API call or a database query) is thus attributed to the await point,
+    and the time spent by the other tasks of the event loop is left out. Each stack is
+    weighted by the time elapsed since the previous sample.
+    """
+
+    def __init__(self, name: str, interval: float):
+        self.name = name
+        self.interval = interval
+        self.duration = 0.0
+        self.stacks: defaultdict[tuple[FrameKey, ...], float] = defaultdict(float)
+        self._codes: dict[CodeType, FrameKey] = {}
+
+    async def run(self, coro: Awaitable[Any]) -> Any:
+        """Runs a coroutine under the profiler until it is done.
+
+        Args:
+            coro (Awaitable[Any]): The coroutine to profile.
+
+        Returns:
+            Any: The result of the coroutine.
+        """
+        done = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample,
+            args=(coro, threading.get_ident(), done),
+            daemon=True,
+        )
+        start = perf_counter()
+        sampler.start()
+        try:
+            return await coro
+        finally:
+            done.set()
+            sampler.join()
+            self.duration = perf_counter() - start
+
+    def to_collapsed(self) -> str:
+        """Formats the profile as collapsed stacks (e.g. for flame graph tools).
+
+        Returns:
+            str: One line per stack, its functions separated by ";" from the outermost,
+            followed by its weight in microseconds.
+        """
+        return "".join(
+            f"{';'.join(frame[0] for frame in stack)} {round(weight * 1e6)}\n"
+            for stack, weight in self.stacks.items()
+        )
+
+    def to_speedscope(self) -> dict[str, Any]:
+        """Formats the profile in the file format of speedscope (https://speedscope.app).
+
+        Returns:
+            dict[str, Any]: The sampled profile, with its frames and weights in seconds.
+        """
+        indices: dict[FrameKey, int] = {}
+        frames: list[dict[str, Any]] = []
+        samples = []
+        for stack in self.stacks:
+            for frame in stack:
+                if frame not in indices:
+                    indices[frame] = len(frames)
+                    frames.append(
+                        {"name": frame[0], "file": frame[1], "line": frame[2]}
+                    )
+            samples.append([indices[frame] for frame in stack])
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.name,
+            "exporter": "stargazer",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": samples,
+                    "weights": list(self.stacks.values()),
+                }
+            ],
+        }
+
+    def _key(self, frame: FrameType) -> FrameKey:
+        """Gets the function of a frame.
+
+        Args:
+            frame (FrameType): The frame.
+
+        Returns:
+            FrameKey: The qualified name, file and first line of the function.
+        """
+        code = frame.f_code
+        key = self._codes.get(code)
+        if key is None:
+            key = self._codes[code] = (
+                code.co_qualname,
+                code.co_filename,
+                code.co_firstlineno,
+            )
+        return key
+
+    def _sample(
+        self, coro: Awaitable[Any], thread_id: int, done: threading.Event
+    ) -> None:
+        """Samples the stack of a coroutine until done.
+
+        Args:
+            coro (Awaitable[Any]): The coroutine to sample.
+            thread_id (int): The ID of the thread running the coroutine.
+            done (threading.Event): The event set once the coroutine is done.
+        """
+        last = perf_counter()
+        while not done.wait(self.interval):
+            stack = await_stack(coro)
+            if not stack:
+                continue
+            # Add the functions called by the innermost coroutine, if running
+            leaf = sys._current_frames().get(thread_id)  # pylint: disable=protected-access
+            calls: list[FrameType] = []
+            while leaf is not None and leaf is not stack[-1]:
+                calls.append(leaf)
+                leaf = leaf.f_back
+            if leaf is not None:
+                stack.extend(reversed(calls))
+            now = perf_counter()
+            self.stacks[tuple(map(self._key, stack))] += now - last
+            last = now
+
+
+def await_stack(awaitable: object) -> list[FrameType]:
+    """Gets the frames of the chain of coroutines awaited by an awaitable.
+
+    Args:
+        awaitable (object): The awaitable, e.g. a coroutine.
+
+    Returns:
+        list[FrameType]: The frames of the coroutines (and generator-based coroutines)
+        awaited, from the outermost, until one awaiting a future or the like.
+    """
+    frames = []
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(
+            awaitable, "gi_frame", None
+        )
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(
+            awaitable, "gi_yieldfrom", None
+        )
+    return frames
+
+
+# Profiles of the requests, keyed by ID, kept for download
+profiles: TTLCache[str, Profile] = TTLCache(PROFILES_CACHE_SIZE, PROFILES_CACHE_TTL)
+
+
+class ProfilingMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware profiling the requests asking for it.
+
+    A request with an `X-Profile: 1` header or a `profile=1` query parameter is run
+    under the sampling profiler if it is authorized. Its profile is kept for download,
+    its ID being sent in the `X-Profile-Id` header of the response. The other requests
+    are only checked for the flag.
+    """
+
+    def __init__(
+        self, app: ASGIApp, authorize: Callable[[str], Awaitable[bool]]
+    ) -> None:
+        self.app = app
+        self.authorize = authorize
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not is_profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not await self.authorize(headers.get("authorization", "")):
+            await self.app(scope, receive, send)
+            return
+        profile_id = token_hex(16)
+        profile = Profile(
+            f"{scope['method']} {scope['path']}", settings.PROFILING_INTERVAL
+        )
+
+        async def send_profiled(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        try:
+            await profile.run(self.app(scope, receive, send_profiled))
+        finally:
+            profiles.set(profile_id, profile)
+
+
+def is_profiling_requested(scope: Scope) -> bool:
+    """Checks whether a request asks to be profiled.
+
+    Args:
+        scope (Scope): The scope of the request.
+
+    Returns:
+        bool: Whether the request has an `X-Profile: 1` header or a `profile=1` query
+        parameter.
+    """
+    if b"profile=1" in scope["query_string"].split(b"&"):
+        return True
+    return any(
+        name == b"x-profile" and value == b"1" for name, value in scope["headers"]
+    )
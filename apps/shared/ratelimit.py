@@ -0,0 +1,212 @@
+"""Rate limiting for the app.
+
+This module contains a token bucket rate limiter, with an in-memory backend (per
+process) and a database backend (shared by all the processes), that can be used by any
+app.
+"""
+
+from collections.abc import Callable
+from math import ceil, floor
+from time import monotonic, time
+from typing import NamedTuple, Protocol
+
+from fastapi import HTTPException, status
+from sqlalchemy import case
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from apps.shared.models import RateLimitBucket
+
+
+class Quota(NamedTuple):
+    """Capacity and refill rate of a token bucket."""
+
+    capacity: float
+    rate: float  # Tokens refilled per second
+
+
+class RateLimitBackend(Protocol):  # pylint: disable=too-few-public-methods
+    """Storage of the token buckets of a rate limiter."""
+
+    async def take(
+        self, key: str, cost: float, quota: Quota, force: bool = False
+    ) -> tuple[bool, float]:
+        """Takes tokens from a bucket, refilled first for the time elapsed.
+
+        Args:
+            key (str): The key of the bucket, full when first taken from.
+            cost (float): The number of tokens to take.
+            quota (Quota): The capacity and refill rate of the bucket.
+            force (bool): Whether to take the tokens even if the bucket does not hold
+            enough of them, leaving it in debt (defaults to False).
+
+        Returns:
+            tuple[bool, float]: Whether the tokens were taken, and the number of tokens
+            left in the bucket.
+        """
+
+
+class MemoryRateLimitBackend:
+    """Rate limiter backend keeping the token buckets in memory.
+
+    Buckets are not shared between processes, so each worker of the app enforces its
+    own quotas.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def clear(self) -> None:
+        """Removes all the buckets, i.e. refills them."""
+        self._buckets.clear()
+
+    async def take(
+        self, key: str, cost: float, quota: Quota, force: bool = False
+    ) -> tuple[bool, float]:
+        """Takes tokens from a bucket, refilled first for the time elapsed.
+
+        See `RateLimitBackend.take`.
+        """
+        now = monotonic()
+        tokens, updated = self._buckets.get(key, (quota.capacity, now))
+        tokens = min(quota.capacity, tokens + (now - updated) * quota.rate)
+        taken = force or tokens >= cost
+        if taken:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        return taken, tokens
+
+
+class DatabaseRateLimitBackend:  # pylint: disable=too-few-public-methods
+    """Rate limiter backend keeping the token buckets in the database.
+
+    Buckets are shared by all the processes using the database (SQLite or PostgreSQL),
+    each take being a single atomic upsert. The engine is got, and the table created,
+    on first use, so that the engine can be created lazily.
+    """
+
+    def __init__(self, get_engine: Callable[[], AsyncEngine]):
+        self.get_engine = get_engine
+        self._table_created = False
+
+    async def take(
+        self, key: str, cost: float, quota: Quota, force: bool = False
+    ) -> tuple[bool, float]:
+        """Takes tokens from a bucket, refilled first for the time elapsed.
+
+        See `RateLimitBackend.take`.
+        """
+        table = RateLimitBucket.__table__  # type: ignore[attr-defined]
+        engine = self.get_engine()
+        if not self._table_created:
+            async with engine.begin() as connection:
+                await connection.run_sync(table.create, checkfirst=True)
+            self._table_created = True
+
+        now = time()
+        refilled = table.c.tokens + (now - table.c.updated) * quota.rate
+        tokens = case((refilled > quota.capacity, quota.capacity), else_=refilled)
+        dialect = postgresql if engine.dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(table).values(
+            key=key, tokens=quota.capacity - cost, updated=now
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=["key"],
+            set_={"tokens": tokens - cost, "updated": now},
+            where=None if force else tokens >= cost,
+        )
+        async with engine.begin() as connection:
+            row = (
+                await connection.execute(statement.returning(table.c.tokens))
+            ).first()
+            if row is not None:
+                return True, float(row.tokens)
+            row = (
+                await connection.execute(
+                    table.select().with_only_columns(tokens).where(table.c.key == key)
+                )
+            ).one()
+            return False, float(row[0])
+
+
+class RateLimit:  # pylint: disable=too-few-public-methods
+    """Quotas left to a key of a rate limiter, along with the headers reporting them."""
+
+    __slots__ = ("calls", "headers", "key")
+
+    def __init__(self, key: str, calls: float):
+        self.key = key
+        self.calls = calls
+        self.headers: dict[str, str] = {}
+
+
+class RateLimiter:
+    """Rate limiter giving each key a bucket of requests and a budget of upstream calls.
+
+    Each request is only accepted if the call budget of its key is not exhausted, then
+    takes a token from the request bucket of its key. Once done, the request is charged
+    the number of upstream calls (e.g. to the GitHub API) it actually made, which may
+    leave the call budget in debt until refilled.
+    """
+
+    def __init__(self, backend: RateLimitBackend, requests: Quota, calls: Quota):
+        self.backend = backend
+        self.requests = requests
+        self.calls = calls
+
+    async def acquire(self, key: str) -> RateLimit:
+        """Acquires a request for a key.
+
+        Args:
+            key (str): The key making the request (e.g. a username).
+
+        Returns:
+            RateLimit: The quotas left to the key, with the headers reporting them.
+
+        Raises:
+            HTTPException: If the request bucket or the call budget of the key is
+            exhausted, a 429 Too Many Requests exception is raised, with a `Retry-After`
+            header.
+        """
+        _, calls = await self.backend.take(f"calls:{key}", 0, self.calls)
+        # The request token is only taken if the call budget allows the request, so that
+        # the requests rejected until the budget is refilled do not drain the bucket
+        allowed = calls >= 1
+        taken, requests = await self.backend.take(
+            f"requests:{key}", 1 if allowed else 0, self.requests
+        )
+        rate_limit = RateLimit(key, calls)
+        rate_limit.headers = {
+            "X-RateLimit-Limit": str(floor(self.requests.capacity)),
+            "X-RateLimit-Remaining": str(max(0, floor(requests))),
+            "X-RateLimit-Calls-Limit": str(floor(self.calls.capacity)),
+            "X-RateLimit-Calls-Remaining": str(max(0, floor(calls))),
+        }
+        retry_after = 0.0
+        if not taken or (not allowed and requests < 1):
+            retry_after = (1 - requests) / self.requests.rate
+        if not allowed:
+            retry_after = max(retry_after, (1 - calls) / self.calls.rate)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers={**rate_limit.headers, "Retry-After": str(ceil(retry_after))},
+            )
+        return rate_limit
+
+    async def charge(self, rate_limit: RateLimit, calls: int) -> None:
+        """Charges the upstream calls made by a request to the call budget of its key.
+
+        Args:
+            rate_limit (RateLimit): The quotas left to the key, whose headers are
+            updated.
+            calls (int): The number of upstream calls made.
+        """
+        if calls:
+            _, rate_limit.calls = await self.backend.take(
+                f"calls:{rate_limit.key}", calls, self.calls, force=True
+            )
+            rate_limit.headers["X-RateLimit-Calls-Remaining"] = str(
+                max(0, floor(rate_limit.calls))
+            )
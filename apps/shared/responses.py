@@ -0,0 +1,26 @@
+"""Responses for the app.
+
+This module contains response classes that can be used by any app.
+"""
+
+from typing import Any
+
+import msgspec
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# Types unknown to msgspec (e.g. Pydantic models) fall back to FastAPI's encoder
+json_encoder = msgspec.json.Encoder(enc_hook=jsonable_encoder)
+
+
+class MsgspecJSONResponse(JSONResponse):
+    """JSON response encoded with msgspec.
+
+    Encodes the content with msgspec instead of the standard `json` module. Content
+    that is already encoded (i.e. bytes) is sent as is, without any copy.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return json_encoder.encode(content)
@@ -0,0 +1,198 @@
+"""Shared cache for the app.
+
+This module contains a cache shared by the worker processes of the app through a
+memory-mapped file, that can be used by any app.
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+from collections.abc import Iterator
+from contextlib import contextmanager
+from hashlib import blake2b
+from pathlib import Path
+from time import time
+
+from apps.shared.cache import collect_lookups
+from apps.shared.metrics import Metric
+
+MAGIC = b"SGZCACHE"
+
+# Layout of the file: a header (magic, number of slots, size of the ring buffer and
+# position of its head), a table of slots then the ring buffer of the records
+HEADER = struct.Struct("<8sQQQ")
+HEAD = struct.Struct("<Q")
+HEAD_OFFSET = 24
+TABLE_OFFSET = 64
+# Slot: sequence number, digest of the key, position and length of the value, expiry
+SLOT = struct.Struct("<Q16sQI4xd")
+SEQUENCE = struct.Struct("<Q")
+# Record: digest of the key, then the value
+DIGEST_SIZE = 16
+
+# Average size of the values, from which the number of slots is derived
+AVERAGE_VALUE_SIZE = 8192
+
+
+class SharedCache:
+    """Cache of bytes shared by processes through a memory-mapped file.
+
+    The values are appended to a ring buffer, overwriting the oldest ones once full, and
+    indexed by the digest of their key in a table of slots, each key replacing the
+    previous one of its slot. The memory used is thus bounded by the size of the file,
+    whatever the number of processes.
+
+    Writes are serialized across processes by a lock on the file. Reads take no lock:
+    each slot has a sequence number, odd while the slot is written, and a read is
+    discarded if the sequence number changed meanwhile, or if the ring buffer moved on
+    far enough to overwrite its value. This relies on the stores of a process being seen
+    in order by the others, as on x86-64.
+
+    The file is created with the given size in bytes if missing or empty, preferably on
+    a tmpfs (e.g. /dev/shm) so that it is never written back to a disk.
+    """
+
+    def __init__(self, path: str | Path, size: int):
+        self.hits = 0
+        self.misses = 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with self._locked():
+            if os.fstat(self._fd).st_size == 0:
+                slots = max(1024, size // AVERAGE_VALUE_SIZE)
+                arena_offset = TABLE_OFFSET + slots * SLOT.size
+                os.ftruncate(self._fd, size)
+                with mmap.mmap(self._fd, size) as buffer:
+                    HEADER.pack_into(buffer, 0, MAGIC, slots, size - arena_offset, 0)
+        self._buffer = mmap.mmap(self._fd, os.fstat(self._fd).st_size)
+        header = HEADER.unpack_from(self._buffer, 0)
+        self.slots: int = header[1]
+        self.arena_size: int = header[2]
+        if header[0] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a shared cache: {path}")
+        self._arena_offset = TABLE_OFFSET + self.slots * SLOT.size
+
+    def clear(self) -> None:
+        """Removes all the entries of the cache.
+
+        The head of the ring buffer is moved a full turn forward, so that every value is
+        deemed overwritten.
+        """
+        with self._locked():
+            head = HEAD.unpack_from(self._buffer, HEAD_OFFSET)[0]
+            HEAD.pack_into(self._buffer, HEAD_OFFSET, head + self.arena_size + 1)
+
+    def close(self) -> None:
+        """Closes the cache, leaving its file for the other processes."""
+        if hasattr(self, "_buffer"):
+            self._buffer.close()
+        os.close(self._fd)
+
+    def collect(self, name: str) -> Iterator[Metric]:
+        """Collects the metrics of the cache, for the current process.
+
+        Args:
+            name (str): The name of the cache, labelling its metrics.
+
+        Yields:
+            Metric: The number of hits and misses since startup, and the hit ratio of
+            the cache.
+        """
+        yield from collect_lookups(name, self.hits, self.misses)
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        """Gets the value associated with a key, without lock.
+
+        Args:
+            key (str): The key to look up.
+
+        Returns:
+            tuple[bytes, float] | None: The value and the number of seconds before it
+            expires, if the key is cached and not expired, otherwise None.
+        """
+        digest = blake2b(key.encode(), digest_size=DIGEST_SIZE).digest()
+        offset = self._slot_offset(digest)
+        sequence, slot_digest, position, length, expires = SLOT.unpack_from(
+            self._buffer, offset
+        )
+        value = None
+        if not sequence & 1 and slot_digest == digest and expires > time():
+            start = self._arena_offset + position % self.arena_size
+            value = self._buffer[start : start + DIGEST_SIZE + length]
+            head = HEAD.unpack_from(self._buffer, HEAD_OFFSET)[0]
+            if (
+                head > position + self.arena_size
+                or SEQUENCE.unpack_from(self._buffer, offset)[0] != sequence
+                or not value.startswith(digest)
+            ):
+                value = None
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return value[DIGEST_SIZE:], expires - time()
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        """Associates a value with a key, unless larger than the ring buffer.
+
+        Args:
+            key (str): The key to associate the value with.
+            value (bytes): The value to cache.
+            ttl (float): The number of seconds the value remains in cache.
+        """
+        size = DIGEST_SIZE + len(value)
+        if size > self.arena_size:
+            return
+        digest = blake2b(key.encode(), digest_size=DIGEST_SIZE).digest()
+        offset = self._slot_offset(digest)
+        with self._locked():
+            position = HEAD.unpack_from(self._buffer, HEAD_OFFSET)[0]
+            # Records are not split, the end of the ring buffer being skipped if too short
+            if position % self.arena_size + size > self.arena_size:
+                position += self.arena_size - position % self.arena_size
+            # The head moves before the oldest values are overwritten, so that their
+            # readers discard them
+            HEAD.pack_into(self._buffer, HEAD_OFFSET, position + size)
+            start = self._arena_offset + position % self.arena_size
+            self._buffer[start : start + size] = digest + value
+            # Rounded up to even, in case a writer died while writing the slot
+            sequence = SEQUENCE.unpack_from(self._buffer, offset)[0]
+            sequence += sequence & 1
+            SEQUENCE.pack_into(self._buffer, offset, sequence + 1)
+            SLOT.pack_into(
+                self._buffer,
+                offset,
+                sequence + 1,
+                digest,
+                position,
+                len(value),
+                time() + ttl,
+            )
+            SEQUENCE.pack_into(self._buffer, offset, sequence + 2)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Locks the file of the cache against the writes of the other processes.
+
+        Yields:
+            None: Once locked, until unlocked.
+        """
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _slot_offset(self, digest: bytes) -> int:
+        """Gets the offset of the slot of a key in the file.
+
+        Args:
+            digest (bytes): The digest of the key.
+
+        Returns:
+            int: The offset of the slot.
+        """
+        return (
+            TABLE_OFFSET + int.from_bytes(digest[:8], "little") % self.slots * SLOT.size
+        )
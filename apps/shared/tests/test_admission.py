@@ -0,0 +1,120 @@
+"""Tests for the admission control of the app.
+
+This module contains tests for the concurrency gate that can be used by any app.
+"""
+
+import anyio
+import pytest
+from fastapi import HTTPException, status
+
+from apps.shared.admission import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    AdmissionGate,
+)
+
+
+@pytest.mark.anyio
+async def test_admission_gate() -> None:
+    """Tests the AdmissionGate class.
+
+    Tests that at most `max_concurrency` tasks run at once, and that the waiting tasks
+    are admitted by priority then in order of arrival.
+    """
+    gate = AdmissionGate("test", max_concurrency=1, queue_size=3, timeout=10)
+    order = []
+    release = anyio.Event()
+
+    async def task(name: str, priority: int) -> None:
+        async with gate.admit(priority):
+            order.append(name)
+            await release.wait()
+
+    async with anyio.create_task_group() as task_group:
+        task_group.start_soon(task, "first", PRIORITY_INTERACTIVE)
+        await anyio.wait_all_tasks_blocked()
+        task_group.start_soon(task, "background", PRIORITY_BACKGROUND)
+        await anyio.wait_all_tasks_blocked()
+        task_group.start_soon(task, "second", PRIORITY_INTERACTIVE)
+        await anyio.wait_all_tasks_blocked()
+        task_group.start_soon(task, "third", PRIORITY_INTERACTIVE)
+        await anyio.wait_all_tasks_blocked()
+        assert (gate.running, gate.queued) == (1, 3)
+        release.set()
+    assert order == ["first", "second", "third", "background"]
+    assert (gate.running, gate.queued, gate.admitted) == (0, 0, 4)
+
+
+@pytest.mark.anyio
+async def test_admission_gate_shed() -> None:
+    """Tests the shedding of the AdmissionGate class.
+
+    Tests that a task arriving while the queue is full, or still waiting at the
+    deadline, raises an `HTTPException` with a `Retry-After` header, and that the
+    shed tasks are counted and exported as metrics.
+    """
+    gate = AdmissionGate("test", max_concurrency=1, queue_size=1, timeout=0.05)
+
+    async def task() -> None:
+        async with gate.admit():
+            pass
+
+    async with gate.admit():
+        with pytest.raises(HTTPException) as exc_info:
+            await task()
+        assert exc_info.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert exc_info.value.headers == {"Retry-After": "1"}
+        assert gate.shed == {"queue_full": 0, "deadline": 1}
+        gate.timeout = 10
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(task)
+            await anyio.wait_all_tasks_blocked()
+            with pytest.raises(HTTPException):
+                await task()
+            task_group.cancel_scope.cancel()
+        assert gate.shed == {"queue_full": 1, "deadline": 1}
+    assert (gate.running, gate.queued) == (0, 0)
+    metrics = {
+        (metric.name, str(metric.labels)): metric.value for metric in gate.collect()
+    }
+    assert metrics == {
+        ("test_running", "None"): 0,
+        ("test_queued", "None"): 0,
+        ("test_admitted_total", "None"): 1,
+        ("test_shed_total", "{'reason': 'queue_full'}"): 1,
+        ("test_shed_total", "{'reason': 'deadline'}"): 1,
+    }
+
+
+@pytest.mark.anyio
+async def test_admission_gate_cancelled() -> None:
+    """Tests the AdmissionGate class with cancelled tasks.
+
+    Tests that a task cancelled while waiting leaves the queue, and that the next
+    waiting task is admitted whether the task cancelled was admitted first or not.
+    """
+    gate = AdmissionGate("test", max_concurrency=1, queue_size=2, timeout=10)
+    admitted = []
+
+    async def task(name: str, cancel_scope: anyio.CancelScope) -> None:
+        with cancel_scope:
+            async with gate.admit():
+                admitted.append(name)
+
+    async with anyio.create_task_group() as task_group:
+        async with gate.admit():
+            waiting_scope = anyio.CancelScope()
+            task_group.start_soon(task, "waiting", waiting_scope)
+            await anyio.wait_all_tasks_blocked()
+            waiting_scope.cancel()
+            await anyio.wait_all_tasks_blocked()
+            assert gate.queued == 0
+            admitted_scope = anyio.CancelScope()
+            task_group.start_soon(task, "admitted", admitted_scope)
+            await anyio.wait_all_tasks_blocked()
+            task_group.start_soon(task, "next", anyio.CancelScope())
+            await anyio.wait_all_tasks_blocked()
+            assert gate.queued == 2
+        admitted_scope.cancel()
+    assert "waiting" not in admitted and "next" in admitted
+    assert (gate.running, gate.queued) == (0, 0)
@@ -0,0 +1,115 @@
+"""Tests for the cache of the app.
+
+This module contains tests for the in-memory cache that can be used by any app.
+"""
+
+from pytest_mock import MockerFixture
+
+from apps.shared.cache import TTLCache
+
+
+def test_ttl_cache() -> None:
+    """Tests the TTLCache class.
+
+    Tests that values can be set, got, popped and cleared, and that hits and misses
+    are counted.
+    """
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+    assert cache.get("a") is None
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    assert len(cache) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.pop("a") == 1
+    assert cache.pop("a") is None
+    cache.set("a", 1)
+    cache.clear()
+    assert not cache
+
+
+def test_ttl_cache_eviction() -> None:
+    """Tests the eviction of the TTLCache class.
+
+    Tests that the least recently used entry is evicted when the cache is full.
+    """
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expiration(mocker: MockerFixture) -> None:
+    """Tests the expiration of the TTLCache class.
+
+    Tests that an entry is no longer returned, nor iterated over, once its time to live,
+    the one of the cache unless given, has elapsed.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+    """
+    mock_monotonic = mocker.patch("apps.shared.cache.monotonic", return_value=0.0)
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    assert cache.time_to_live("a") == 60.0
+    mock_monotonic.return_value = 59.0
+    assert cache.get("a") == 1
+    assert cache.time_to_live("a") == 1.0
+    assert cache.time_to_live("b") == 0.0
+    mock_monotonic.return_value = 60.0
+    assert cache.get("a") is None
+    assert not cache
+    cache.set("b", 2, ttl=10)
+    assert cache.time_to_live("b") == 10.0
+    cache.set("c", 3, ttl=0)
+    assert list(cache.items()) == [("b", 2, 10.0)]
+
+
+def test_ttl_cache_on_evict(mocker: MockerFixture) -> None:
+    """Tests the eviction callback of the TTLCache class.
+
+    Tests that the callback is called with each entry leaving the cache, whether
+    evicted, expired, popped or replaced, but not when the cache is cleared.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+    """
+    mock_monotonic = mocker.patch("apps.shared.cache.monotonic", return_value=0.0)
+    evicted: list[tuple[str, int]] = []
+    cache: TTLCache[str, int] = TTLCache(
+        max_size=2, ttl=60, on_evict=lambda key, value: evicted.append((key, value))
+    )
+    cache.set("a", 1)
+    cache.set("a", 2)
+    cache.set("b", 3)
+    cache.set("c", 4)
+    assert cache.pop("b") == 3
+    mock_monotonic.return_value = 60.0
+    assert cache.get("c") is None
+    assert evicted == [("a", 1), ("a", 2), ("b", 3), ("c", 4)]
+    cache.set("d", 5)
+    cache.clear()
+    assert len(evicted) == 4
+
+
+def test_ttl_cache_collect() -> None:
+    """Tests the metrics of the TTLCache class.
+
+    Tests that the number of entries, of hits and of misses, and the hit ratio of the
+    cache are collected with the name of the cache as label.
+    """
+    cache: TTLCache[str, int] = TTLCache(max_size=2, ttl=60)
+    assert [metric.value for metric in cache.collect("test")] == [0, 0, 0, 0.0]
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    metrics = {metric.name: metric for metric in cache.collect("test")}
+    assert metrics["cache_entries"].value == 1
+    assert metrics["cache_hits_total"].value == 2
+    assert metrics["cache_misses_total"].value == 1
+    assert metrics["cache_hit_ratio"].value == 2 / 3
+    assert metrics["cache_hit_ratio"].labels == {"cache": "test"}
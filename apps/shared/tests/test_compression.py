@@ -0,0 +1,169 @@
+"""Tests for the compression of the app.
+
+This module contains tests for the negotiation of content encodings and the
+compression middleware.
+"""
+
+import gzip
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import brotli  # type: ignore[import-untyped]
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from apps.shared.compression import (
+    COMPRESSORS,
+    CompressionMiddleware,
+    PrecompressedBody,
+    compress,
+    is_compressible,
+    negotiate_encoding,
+)
+
+DECOMPRESSORS = {
+    "gzip": gzip.decompress,
+    "br": brotli.decompress,
+    "zstd": zstandard.ZstdDecompressor().decompress,
+}
+
+
+def test_negotiate_encoding() -> None:
+    """Tests the `negotiate_encoding` function.
+
+    Tests that the supported encoding with the highest quality value is picked, ties
+    being broken by the server preference, and that None is returned when no supported
+    encoding is accepted.
+    """
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip") == "gzip"
+    assert negotiate_encoding("gzip, deflate, br") == "br"
+    assert negotiate_encoding("gzip, deflate, br, zstd") == "zstd"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert negotiate_encoding("*;q=0.1, zstd;q=0") == "br"
+    assert negotiate_encoding("gzip;q=invalid") is None
+
+
+@pytest.mark.anyio
+async def test_compress(mocker: MockerFixture) -> None:
+    """Tests the `compress` function.
+
+    Tests that bodies are compressed with the given encoding, whether they are
+    compressed on the event loop or in a worker thread.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock settings.
+    """
+    body = b'{"repo": "pabroux/unvx"}' * 100
+    for offload_size in (0, len(body) + 1):
+        mocker.patch("stargazer.settings.COMPRESSION_OFFLOAD_SIZE", offload_size)
+        for encoding, decompress in DECOMPRESSORS.items():
+            assert decompress(await compress(body, encoding)) == body
+
+
+def test_compress_threads() -> None:
+    """Tests the compressors from several threads at once.
+
+    Tests that bodies compressed concurrently in worker threads are not corrupted.
+    """
+    bodies = [random.Random(index).randbytes(1 << 16) * 4 for index in range(8)]
+    for encoding, decompress in DECOMPRESSORS.items():
+        with ThreadPoolExecutor(8) as executor:
+            compressed = list(executor.map(COMPRESSORS[encoding], bodies * 16))
+        assert [decompress(body) for body in compressed] == bodies * 16
+
+
+@pytest.mark.anyio
+async def test_precompressed_body(mocker: MockerFixture) -> None:
+    """Tests the PrecompressedBody class.
+
+    Tests that small bodies are not compressed, that each variant is compressed once
+    then reused, and that each variant has its own strong entity tag.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+    """
+    assert PrecompressedBody(b"[]").negotiate("gzip") is None
+    body = b'{"repo": "pabroux/unvx"}' * 100
+    precompressed_body = PrecompressedBody(body)
+    assert precompressed_body.negotiate(None) is None
+    assert await precompressed_body.variant(None) is body
+    assert precompressed_body.negotiate("gzip, br") == "br"
+    variant = await precompressed_body.variant("br")
+    assert brotli.decompress(variant) == body
+    mock_compress = mocker.patch("apps.shared.compression.compress")
+    assert await precompressed_body.variant("br") is variant
+    mock_compress.assert_not_called()
+    etag = precompressed_body.etag(None)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == PrecompressedBody(body).etag(None)
+    assert etag != PrecompressedBody(b"[]").etag(None)
+    assert (
+        len({etag, precompressed_body.etag("br"), precompressed_body.etag("gzip")}) == 3
+    )
+
+
+def test_is_compressible() -> None:
+    """Tests the `is_compressible` function.
+
+    Tests that textual content types are compressible, and binary ones are not.
+    """
+    assert is_compressible("application/json")
+    assert is_compressible("text/plain; charset=utf-8")
+    assert is_compressible("application/problem+json")
+    assert not is_compressible("image/png")
+    assert not is_compressible("")
+
+
+def test_compression_middleware() -> None:
+    """Tests the CompressionMiddleware class.
+
+    Tests that large textual responses are compressed with the negotiated encoding,
+    and that small, binary or already-encoded responses are sent as is.
+    """
+    body = "stargazer " * 200
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/text")
+    def get_text() -> PlainTextResponse:
+        return PlainTextResponse(body)
+
+    @app.get("/small")
+    def get_small() -> PlainTextResponse:
+        return PlainTextResponse("small")
+
+    @app.get("/binary")
+    def get_binary() -> Response:
+        return Response(body.encode(), media_type="image/png")
+
+    @app.get("/encoded")
+    def get_encoded() -> Response:
+        return Response(
+            gzip.compress(body.encode()),
+            media_type="text/plain",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    client = TestClient(app)
+    for encoding in DECOMPRESSORS:
+        response = client.get("/text", headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(body)
+        assert response.text == body
+    response = client.get("/text", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.text == body
+    for path in ("/small", "/binary"):
+        response = client.get(path, headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+    response = client.get("/encoded", headers={"Accept-Encoding": "zstd"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == body
@@ -0,0 +1,68 @@
+"""Tests for the event loop monitoring of the app.
+
+This module contains tests for the event loop monitor that can be used by any app.
+"""
+
+import logging
+import time
+
+import anyio
+import pytest
+
+from apps.shared.eventloop import LoopMonitor
+
+
+def block(seconds: float) -> None:
+    """Blocks the event loop.
+
+    Args:
+        seconds (float): The number of seconds to block the event loop for.
+    """
+    time.sleep(seconds)
+
+
+@pytest.mark.anyio
+async def test_loop_monitor() -> None:
+    """Tests the LoopMonitor class.
+
+    Tests that the lag of the event loop is observed continuously, a blocking call
+    showing up as a lag at least as long, and that no blocking is reported out of
+    debug mode.
+    """
+    monitor = LoopMonitor(interval=0.01, threshold=0.05, debug=False)
+    async with monitor.run():
+        await anyio.sleep(0.05)
+        block(0.1)
+        await anyio.sleep(0.02)
+    metrics = {
+        (metric.name + metric.suffix, (metric.labels or {}).get("le")): metric.value
+        for metric in monitor.collect()
+    }
+    count = metrics[("event_loop_lag_seconds_count", None)]
+    assert count >= 3
+    assert metrics[("event_loop_lag_seconds_sum", None)] >= 0.09
+    assert metrics[("event_loop_lag_seconds_bucket", "0.05")] < count
+    assert metrics[("event_loop_blocked_total", None)] == 0
+
+
+@pytest.mark.anyio
+async def test_loop_monitor_debug(caplog: pytest.LogCaptureFixture) -> None:
+    """Tests the LoopMonitor class in debug mode.
+
+    Tests that a blocking beyond the threshold is reported once, with the stack of the
+    code blocking the event loop, and that short blockings are not reported.
+    """
+    monitor = LoopMonitor(interval=0.01, threshold=0.05, debug=True)
+    with caplog.at_level(logging.WARNING, logger="apps.shared.eventloop"):
+        async with monitor.run():
+            await anyio.sleep(0.02)
+            block(0.01)
+            await anyio.sleep(0.02)
+            assert monitor.blocked == 0
+            block(0.2)
+            await anyio.sleep(0.02)
+    assert monitor.blocked == 1
+    assert "in block" in "".join(monitor.last_stack)
+    (record,) = caplog.records
+    assert record.getMessage().startswith("Event loop blocked for more than")
+    assert "time.sleep(seconds)" in record.getMessage()
@@ -18,7 +18,8 @@ from apps.shared.utils import get_formatted_content
 async def test_http_exception_handler() -> None:
     """Tests the `http_exception_handler` function.
 
-    Tests that the response object is an instance of `JSONResponse`.
+    Tests that the response object is an instance of `JSONResponse`, with the
+    headers of the exception.
     """
     exc = StarletteHTTPException(status_code=status.HTTP_200_OK, detail="detail")
     content = get_formatted_content(
@@ -29,6 +30,13 @@ async def test_http_exception_handler() -> None:
     assert isinstance(response, JSONResponse)
     assert response.status_code == status.HTTP_200_OK
     assert response.body == response.render(content)
+    exc = StarletteHTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="detail",
+        headers={"Retry-After": "1"},
+    )
+    response = await http_exception_handler(Request({"type": "http"}), exc)
+    assert response.headers["retry-after"] == "1"
 
 
 @pytest.mark.anyio
@@ -0,0 +1,82 @@
+"""Tests for the memory instrumentation of the app.
+
+This module contains tests for the tracemalloc snapshots and the accounting of the peak
+memory allocated that can be used by any app.
+"""
+
+import tracemalloc
+
+from pytest_mock import MockerFixture
+
+from apps.shared.memory import (
+    PeakMemoryTracker,
+    format_statistics,
+    snapshots,
+    stop_tracing,
+    take_snapshot,
+)
+from apps.shared.metrics import Histogram
+
+
+def allocate(size: int) -> bytearray:
+    """Allocates memory.
+
+    Args:
+        size (int): The number of bytes to allocate.
+
+    Returns:
+        bytearray: The memory allocated.
+    """
+    return bytearray(size)
+
+
+def test_take_snapshot() -> None:
+    """Tests the `take_snapshot`, `format_statistics` and `stop_tracing` functions.
+
+    Tests that the tracing is started by the first snapshot, that the allocations made
+    between two snapshots show up in their difference, and that stopping the tracing
+    drops the snapshots.
+    """
+    assert not tracemalloc.is_tracing()
+    try:
+        first_id, first = take_snapshot()
+        assert tracemalloc.is_tracing()
+        memory = allocate(1 << 20)
+        second_id, second = take_snapshot()
+        assert snapshots.get(first_id) is first and snapshots.get(second_id) is second
+        (statistic,) = format_statistics(second, "lineno", 1, first)
+        assert statistic["traceback"][0].startswith(f"{__file__}:")
+        assert statistic["size_diff"] >= len(memory)
+        assert statistic["count_diff"] >= 1
+        statistics = format_statistics(second, "filename", 100)
+        assert set(statistics[0]) == {"traceback", "size", "count"}
+        assert any(__file__ in item["traceback"][0] for item in statistics)
+    finally:
+        stop_tracing()
+    assert not tracemalloc.is_tracing() and not snapshots
+
+
+def test_peak_memory_tracker(mocker: MockerFixture) -> None:
+    """Tests the PeakMemoryTracker class.
+
+    Tests that the peak memory allocated by a region is observed, even if freed by the
+    end of the region, and that nothing is observed while the allocations are not
+    traced.
+    """
+    histogram = Histogram("peak", "Peak memory", [1 << 20, 1 << 30])
+    mock_observe = mocker.spy(histogram, "observe")
+    tracker = PeakMemoryTracker()
+    with tracker.track(histogram):
+        allocate(1 << 20)
+    mock_observe.assert_not_called()
+    tracemalloc.start()
+    try:
+        allocate(1 << 22)
+        with tracker.track(histogram):
+            allocate(1 << 21)
+    finally:
+        tracemalloc.stop()
+    mock_observe.assert_called_once()
+    peak = mock_observe.call_args.args[0]
+    assert 1 << 21 <= peak < 1 << 22
+    assert tracker.active == 0
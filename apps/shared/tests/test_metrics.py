@@ -0,0 +1,131 @@
+"""Tests for the metrics of the app.
+
+This module contains tests for the collection and rendering of metrics that can be used
+by any app.
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from apps.shared.metrics import (
+    Gauge,
+    Histogram,
+    Metric,
+    MetricsMiddleware,
+    collect_process_memory,
+    http_request_duration,
+    render_metrics,
+)
+
+
+def test_gauge() -> None:
+    """Tests the Gauge class.
+
+    Tests that a gauge is only exported once set, with its last value.
+    """
+    gauge = Gauge("remaining", "Calls left")
+    assert not list(gauge.collect())
+    gauge.value = 3
+    gauge.value = 2
+    assert list(gauge.collect()) == [Metric("remaining", "gauge", "Calls left", 2)]
+
+
+def test_histogram() -> None:
+    """Tests the Histogram class.
+
+    Tests that the observations are counted in the first bucket whose bound is greater
+    than or equal to them, and that the cumulative counts, the sum and the count of
+    each series of labels are exported.
+    """
+    histogram = Histogram("duration", "Durations", [1, 0.5], ["route"])
+    histogram.observe(0.5, "/a")
+    histogram.observe(0.7, "/a")
+    histogram.observe(3, "/a")
+    histogram.observe(0.1, "/b")
+    samples = [
+        (metric.suffix, metric.labels, metric.value) for metric in histogram.collect()
+    ]
+    assert samples[:5] == [
+        ("_bucket", {"route": "/a", "le": "0.5"}, 1),
+        ("_bucket", {"route": "/a", "le": "1"}, 2),
+        ("_bucket", {"route": "/a", "le": "+Inf"}, 3),
+        ("_sum", {"route": "/a"}, 4.2),
+        ("_count", {"route": "/a"}, 3),
+    ]
+    assert samples[5:] == [
+        ("_bucket", {"route": "/b", "le": "0.5"}, 1),
+        ("_bucket", {"route": "/b", "le": "1"}, 1),
+        ("_bucket", {"route": "/b", "le": "+Inf"}, 1),
+        ("_sum", {"route": "/b"}, 0.1),
+        ("_count", {"route": "/b"}, 1),
+    ]
+
+
+def test_collect_process_memory() -> None:
+    """Tests the `collect_process_memory` function.
+
+    Tests that the resident memory of the process and its peak are collected.
+    """
+    metrics = {metric.name: metric.value for metric in collect_process_memory()}
+    assert metrics["process_max_resident_memory_bytes"] > 0
+    assert metrics.get("process_resident_memory_bytes", 1) > 0
+
+
+def test_metrics_middleware(mocker: MockerFixture) -> None:
+    """Tests the MetricsMiddleware class.
+
+    Tests that the duration of each request is observed with its method, the path
+    template of its route and its status, the requests matching no route being
+    labelled "unmatched".
+    """
+    mock_observe = mocker.patch.object(http_request_duration, "observe")
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int) -> int:
+        return item_id
+
+    app.add_middleware(MetricsMiddleware)
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/invalid")
+    client.get("/unknown")
+    assert [call.args[1:] for call in mock_observe.call_args_list] == [
+        ("GET", "/items/{item_id}", "200"),
+        ("GET", "/items/{item_id}", "422"),
+        ("GET", "unmatched", "404"),
+    ]
+
+
+def test_render_metrics(mocker: MockerFixture) -> None:
+    """Tests the `render_metrics` function.
+
+    Tests that the metrics of the collectors are rendered in the Prometheus text
+    format, grouped by name with one `HELP` and `TYPE` line each, histograms included.
+    """
+    mocker.patch(
+        "apps.shared.metrics.collectors",
+        [
+            lambda: [Metric("running", "gauge", "Tasks running", 2)],
+            lambda: [
+                Metric("shed_total", "counter", "Tasks shed", 1, {"reason": "full"}),
+                Metric("running", "gauge", "Tasks running", 3),
+                Metric("shed_total", "counter", "Tasks shed", 0, {"reason": "late"}),
+            ],
+            lambda: [Metric("duration", "histogram", "Durations", 1.5, None, "_sum")],
+        ],
+    )
+    assert render_metrics() == (
+        "# HELP stargazer_running Tasks running\n"
+        "# TYPE stargazer_running gauge\n"
+        "stargazer_running 2\n"
+        "stargazer_running 3\n"
+        "# HELP stargazer_shed_total Tasks shed\n"
+        "# TYPE stargazer_shed_total counter\n"
+        'stargazer_shed_total{reason="full"} 1\n'
+        'stargazer_shed_total{reason="late"} 0\n'
+        "# HELP stargazer_duration Durations\n"
+        "# TYPE stargazer_duration histogram\n"
+        "stargazer_duration_sum 1.5\n"
+    )
@@ -0,0 +1,148 @@
+"""Tests for the profiling of the app.
+
+This module contains tests for the sampling profiler and the profiling middleware that
+can be used by any app.
+"""
+
+from time import perf_counter
+
+import anyio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from apps.shared.profiling import (
+    Profile,
+    ProfilingMiddleware,
+    await_stack,
+    is_profiling_requested,
+    profiles,
+)
+
+
+def busy(seconds: float) -> None:
+    """Keeps the CPU busy.
+
+    Args:
+        seconds (float): The number of seconds to keep the CPU busy.
+    """
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        pass
+
+
+async def wait(seconds: float) -> None:
+    """Waits without keeping the CPU busy.
+
+    Args:
+        seconds (float): The number of seconds to wait.
+    """
+    await anyio.sleep(seconds)
+
+
+async def handle() -> int:
+    """Simulates a request, waiting then keeping the CPU busy.
+
+    Returns:
+        int: 1.
+    """
+    await wait(0.05)
+    busy(0.05)
+    return 1
+
+
+@pytest.mark.anyio
+async def test_profile() -> None:
+    """Tests the Profile class.
+
+    Tests that both the time awaited and the time spent running are attributed to the
+    stacks of the coroutine, from its outermost function, and that the profile is
+    formatted as collapsed stacks and in the file format of speedscope.
+    """
+    profile = Profile("request", 0.001)
+    assert await profile.run(handle()) == 1
+    weights = {
+        name: sum(
+            weight
+            for stack, weight in profile.stacks.items()
+            if name in (frame[0] for frame in stack)
+        )
+        for name in ("wait", "busy")
+    }
+    assert weights["wait"] > 0.02 and weights["busy"] > 0.02
+    assert all(stack[0][0] == "handle" for stack in profile.stacks)
+    assert 0.1 <= profile.duration < 1
+    assert sum(profile.stacks.values()) <= profile.duration
+
+    collapsed = profile.to_collapsed().splitlines()
+    assert len(collapsed) == len(profile.stacks)
+    assert any(line.startswith("handle;busy ") for line in collapsed)
+    speedscope = profile.to_speedscope()
+    frames = speedscope["shared"]["frames"]
+    (sampled,) = speedscope["profiles"]
+    assert sampled["type"] == "sampled" and sampled["endValue"] == profile.duration
+    assert len(sampled["samples"]) == len(sampled["weights"]) == len(profile.stacks)
+    assert [frames[index]["name"] for index in sampled["samples"][0]][0] == "handle"
+
+
+@pytest.mark.anyio
+async def test_await_stack() -> None:
+    """Tests the `await_stack` function.
+
+    Tests that the frames of the coroutines awaited are listed from the outermost, and
+    that a coroutine done has no frames.
+    """
+    coro = handle()
+    assert [frame.f_code.co_name for frame in await_stack(coro)] == ["handle"]
+    async with anyio.create_task_group() as task_group:
+        task_group.start_soon(lambda: coro)
+        await anyio.wait_all_tasks_blocked()
+        names = [frame.f_code.co_name for frame in await_stack(coro)]
+        assert names[:2] == ["handle", "wait"]
+    assert not await_stack(coro)
+
+
+def test_is_profiling_requested() -> None:
+    """Tests the `is_profiling_requested` function.
+
+    Tests that a request asks to be profiled with an `X-Profile: 1` header or a
+    `profile=1` query parameter only.
+    """
+    assert is_profiling_requested({"query_string": b"a=1&profile=1", "headers": []})
+    assert is_profiling_requested(
+        {"query_string": b"", "headers": [(b"x-profile", b"1")]}
+    )
+    assert not is_profiling_requested(
+        {"query_string": b"profile=10", "headers": [(b"x-profile", b"0")]}
+    )
+
+
+def test_profiling_middleware(mocker: MockerFixture) -> None:
+    """Tests the ProfilingMiddleware class.
+
+    Tests that only the authorized requests asking for it are profiled, their profile
+    being kept under the ID sent in the `X-Profile-Id` header, and that the other
+    requests are not authorized.
+    """
+    authorize = mocker.AsyncMock(side_effect=lambda header: header == "Bearer admin")
+    app = FastAPI()
+
+    @app.get("/items")
+    async def get_items() -> int:
+        return await handle()
+
+    app.add_middleware(ProfilingMiddleware, authorize=authorize)
+    client = TestClient(app)
+    resp = client.get("/items")
+    assert resp.json() == 1 and "X-Profile-Id" not in resp.headers
+    authorize.assert_not_called()
+    resp = client.get("/items?profile=1", headers={"Authorization": "Bearer user"})
+    assert resp.json() == 1 and "X-Profile-Id" not in resp.headers
+    resp = client.get(
+        "/items", headers={"Authorization": "Bearer admin", "X-Profile": "1"}
+    )
+    assert resp.json() == 1
+    profile = profiles.get(resp.headers["X-Profile-Id"])
+    assert profile is not None and profile.name == "GET /items"
+    assert any(stack[-1][0] == "busy" for stack in profile.stacks)
@@ -0,0 +1,119 @@
+"""Tests for the rate limiting of the app.
+
+This module contains tests for the token bucket rate limiter that can be used by any
+app.
+"""
+
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, status
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from apps.shared.ratelimit import (
+    DatabaseRateLimitBackend,
+    MemoryRateLimitBackend,
+    Quota,
+    RateLimiter,
+)
+
+
+@pytest.mark.anyio
+async def test_memory_rate_limit_backend(mocker: MockerFixture) -> None:
+    """Tests the MemoryRateLimitBackend class.
+
+    Tests that tokens are taken while the bucket holds enough of them, that the bucket
+    is refilled over time up to its capacity, and that forced takes leave it in debt.
+    """
+    mock_monotonic = mocker.patch("apps.shared.ratelimit.monotonic", return_value=0)
+    backend = MemoryRateLimitBackend()
+    quota = Quota(capacity=2, rate=1)
+    assert await backend.take("key", 1, quota) == (True, 1)
+    assert await backend.take("key", 1, quota) == (True, 0)
+    assert await backend.take("key", 1, quota) == (False, 0)
+    assert await backend.take("other", 1, quota) == (True, 1)
+    mock_monotonic.return_value = 10
+    assert await backend.take("key", 0, quota) == (True, 2)
+    assert await backend.take("key", 5, quota, force=True) == (True, -3)
+    assert await backend.take("key", 0, quota) == (False, -3)
+    backend.clear()
+    assert await backend.take("key", 0, quota) == (True, 2)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("anyio_backend", ["asyncio"])  # aiosqlite requires asyncio
+async def test_database_rate_limit_backend(
+    mocker: MockerFixture, tmp_path: Path
+) -> None:
+    """Tests the DatabaseRateLimitBackend class.
+
+    Tests that the buckets behave as the in-memory ones, and that they are shared by
+    the backends using the same database.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock the time.
+        tmp_path (Path): A temporary directory for the database.
+    """
+    mock_time = mocker.patch("apps.shared.ratelimit.time", return_value=0)
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/rate_limit.db")
+    backend = DatabaseRateLimitBackend(lambda: engine)
+    other_backend = DatabaseRateLimitBackend(lambda: engine)
+    quota = Quota(capacity=2, rate=1)
+    assert await backend.take("key", 1, quota) == (True, 1)
+    assert await other_backend.take("key", 1, quota) == (True, 0)
+    assert await backend.take("key", 1, quota) == (False, 0)
+    mock_time.return_value = 10
+    assert await backend.take("key", 0, quota) == (True, 2)
+    assert await backend.take("key", 5, quota, force=True) == (True, -3)
+    assert await other_backend.take("key", 0, quota) == (False, -3)
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_rate_limiter(mocker: MockerFixture) -> None:
+    """Tests the RateLimiter class.
+
+    Tests that the quotas left are reported in headers, that an exhausted request
+    bucket or call budget raises an `HTTPException` with a `Retry-After` header, that
+    the calls charged are taken from the call budget, and that the requests rejected for
+    lack of calls take no request token.
+    """
+    mock_monotonic = mocker.patch("apps.shared.ratelimit.monotonic", return_value=0)
+    rate_limiter = RateLimiter(
+        MemoryRateLimitBackend(),
+        requests=Quota(capacity=2, rate=0.5),
+        calls=Quota(capacity=100, rate=0.25),
+    )
+    rate_limit = await rate_limiter.acquire("pabroux")
+    assert rate_limit.headers == {
+        "X-RateLimit-Limit": "2",
+        "X-RateLimit-Remaining": "1",
+        "X-RateLimit-Calls-Limit": "100",
+        "X-RateLimit-Calls-Remaining": "100",
+    }
+    await rate_limiter.charge(rate_limit, 101)
+    assert rate_limit.calls == -1
+    assert rate_limit.headers["X-RateLimit-Calls-Remaining"] == "0"
+    with pytest.raises(HTTPException) as exc_info:
+        await rate_limiter.acquire("pabroux")
+    assert exc_info.value.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert exc_info.value.headers is not None
+    assert exc_info.value.headers["Retry-After"] == "8"
+    with pytest.raises(HTTPException) as exc_info:
+        await rate_limiter.acquire("pabroux")
+    assert exc_info.value.headers is not None
+    assert exc_info.value.headers["X-RateLimit-Remaining"] == "1"
+    assert exc_info.value.headers["Retry-After"] == "8"
+    mock_monotonic.return_value = 8
+    rate_limit = await rate_limiter.acquire("pabroux")
+    assert rate_limit.headers["X-RateLimit-Calls-Remaining"] == "1"
+    rate_limit = await rate_limiter.acquire("jd")
+    await rate_limiter.charge(rate_limit, 0)
+    assert rate_limit.headers["X-RateLimit-Calls-Remaining"] == "100"
+    await rate_limiter.acquire("jd")
+    with pytest.raises(HTTPException) as exc_info:
+        await rate_limiter.acquire("jd")
+    assert exc_info.value.headers is not None
+    assert exc_info.value.headers["X-RateLimit-Remaining"] == "0"
+    assert exc_info.value.headers["Retry-After"] == "2"
@@ -0,0 +1,30 @@
+"""Tests for the responses of the app.
+
+This module contains tests for response classes that can be used by any app.
+"""
+
+import json
+
+from pydantic import BaseModel
+
+from apps.shared.responses import MsgspecJSONResponse
+
+
+def test_msgspec_json_response() -> None:
+    """Tests the MsgspecJSONResponse class.
+
+    Tests that the content is encoded as JSON, Pydantic models included, and that
+    already-encoded content is sent as is.
+    """
+
+    class Model(BaseModel):
+        """Model used to test the encoding of Pydantic models."""
+
+        field: str
+
+    content = {"message": "é", "detail": [Model(field="value")]}
+    response = MsgspecJSONResponse(content)
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == {"message": "é", "detail": [{"field": "value"}]}
+    body = b'[{"repo":"user/repo"}]'
+    assert MsgspecJSONResponse(body).body is body
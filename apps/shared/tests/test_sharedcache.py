@@ -0,0 +1,147 @@
+"""Tests for the shared cache of the app.
+
+This module contains tests for the cache shared by the worker processes of the app
+through a memory-mapped file.
+"""
+
+import multiprocessing
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from apps.shared.sharedcache import SharedCache
+
+# Large enough for the table of slots and a ring buffer of about 24 KiB
+SIZE = 65536
+
+
+def write_values(path: Path, rounds: int) -> None:
+    """Writes values derived from their keys to a shared cache, over and over.
+
+    Args:
+        path (Path): The path of the shared cache.
+        rounds (int): The number of times each value is written.
+    """
+    cache = SharedCache(path, SIZE)
+    for index in range(rounds * 16):
+        key = f"key{index % 16}"
+        cache.set(key, key.encode() * (index % 512 + 1), ttl=60)
+    cache.close()
+
+
+def test_shared_cache(tmp_path: Path) -> None:
+    """Tests the SharedCache class.
+
+    Tests that values set by a process are got by another one mapping the same file,
+    that hits and misses are counted, and that the cache can be cleared.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    path = tmp_path / "stargazer.cache"
+    cache = SharedCache(path, SIZE)
+    other = SharedCache(path, 2 * SIZE)
+    assert other.arena_size == cache.arena_size
+    assert other.get("a") is None
+    cache.set("a", b"1", ttl=60)
+    cache.set("b", b"", ttl=60)
+    cached = other.get("a")
+    assert cached is not None
+    assert cached[0] == b"1"
+    assert 59 < cached[1] <= 60
+    cached = other.get("b")
+    assert cached is not None
+    assert cached[0] == b""
+    assert (other.hits, other.misses) == (2, 1)
+    assert [metric.value for metric in other.collect("shared")] == [2, 1, 2 / 3]
+    other.clear()
+    assert cache.get("a") is None
+    cache.close()
+    other.close()
+
+
+def test_shared_cache_invalid(tmp_path: Path) -> None:
+    """Tests the SharedCache class with a file that is not a shared cache.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    path = tmp_path / "stargazer.cache"
+    path.write_bytes(b"\0" * SIZE)
+    with pytest.raises(ValueError, match="Not a shared cache"):
+        SharedCache(path, SIZE)
+
+
+def test_shared_cache_expiration(mocker: MockerFixture, tmp_path: Path) -> None:
+    """Tests the expiration of the SharedCache class.
+
+    Tests that a value is no longer got once its time to live has elapsed.
+
+    Args:
+        mocker (MockerFixture): The mocker fixture used to mock functions.
+        tmp_path (Path): A temporary directory.
+    """
+    mock_time = mocker.patch("apps.shared.sharedcache.time", return_value=0.0)
+    cache = SharedCache(tmp_path / "stargazer.cache", SIZE)
+    cache.set("a", b"1", ttl=60)
+    mock_time.return_value = 59.0
+    assert cache.get("a") == (b"1", 1.0)
+    mock_time.return_value = 60.0
+    assert cache.get("a") is None
+    cache.close()
+
+
+def test_shared_cache_overwrite(tmp_path: Path) -> None:
+    """Tests the overwriting of the values of the SharedCache class.
+
+    Tests that a value is replaced by the next one set for its key, that the oldest
+    values are overwritten once the ring buffer is full, and that a value larger than
+    the ring buffer is not cached.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    cache = SharedCache(tmp_path / "stargazer.cache", SIZE)
+    value = b"x" * (cache.arena_size // 3)
+    cache.set("a", b"1", ttl=60)
+    cache.set("a", value, ttl=60)
+    cached = cache.get("a")
+    assert cached is not None
+    assert cached[0] == value
+    cache.set("b", value, ttl=60)
+    cache.set("c", value, ttl=60)
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+    cache.set("d", b"x" * cache.arena_size, ttl=60)
+    assert cache.get("d") is None
+    cache.close()
+
+
+def test_shared_cache_concurrent_writes(tmp_path: Path) -> None:
+    """Tests the lock-free reads of the SharedCache class.
+
+    Tests that the values got while another process keeps overwriting them, wrapping
+    around the ring buffer, are never torn.
+
+    Args:
+        tmp_path (Path): A temporary directory.
+    """
+    path = tmp_path / "stargazer.cache"
+    cache = SharedCache(path, SIZE)
+    writer = multiprocessing.get_context("spawn").Process(
+        target=write_values, args=(path, 200)
+    )
+    writer.start()
+    hits = 0
+    while writer.is_alive() or not hits:
+        for index in range(16):
+            key = f"key{index}"
+            if (cached := cache.get(key)) is not None:
+                value = cached[0]
+                assert value == key.encode() * (len(value) // len(key))
+                hits += 1
+    writer.join()
+    assert writer.exitcode == 0
+    cache.close()
@@ -0,0 +1,204 @@
+"""Tests for the tracing of the app.
+
+This module contains tests for the spans, their exporters, the tracing middleware and
+the logging filter that can be used by any app.
+"""
+
+import json
+import logging
+import threading
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pytest_mock import MockerFixture
+
+from apps.shared.tracing import (
+    JsonlFileExporter,
+    Span,
+    TraceIdFilter,
+    Tracer,
+    TracingMiddleware,
+    traced,
+    tracer,
+)
+
+
+class ListExporter:  # pylint: disable=too-few-public-methods
+    """Exporter keeping the spans of each trace in a list."""
+
+    def __init__(self) -> None:
+        self.traces: list[list[Span]] = []
+
+    def export(self, spans: list[Span]) -> None:
+        """Keeps the spans of a trace.
+
+        Args:
+            spans (list[Span]): The spans of the trace.
+        """
+        self.traces.append(spans)
+
+    def close(self) -> None:
+        """Does nothing, the spans being kept in memory."""
+
+
+@pytest.mark.anyio
+async def test_tracer(mocker: MockerFixture) -> None:
+    """Tests the Tracer class.
+
+    Tests that the spans are nested in the span running in the current context, record
+    their attributes, duration and error, and are exported with their trace once its
+    root span ends.
+    """
+    exporter = ListExporter()
+    mocker.patch.object(tracer, "exporter", exporter)
+
+    @traced("step")
+    async def step() -> int:
+        with tracer.span("inner", page=1) as inner:
+            assert inner is not None
+        return 1
+
+    with tracer.span("orphan") as orphan:
+        assert orphan is None
+    with pytest.raises(ValueError):
+        with tracer.trace("request", method="GET") as root:
+            assert await step() == 1
+            raise ValueError("boom")
+    assert len(exporter.traces) == 1
+    spans = exporter.traces[0]
+    assert [span.name for span in spans] == ["inner", "step", "request"]
+    inner, step_span, root = spans
+    assert {span.trace_id for span in spans} == {root.trace_id}
+    assert (inner.parent_id, step_span.parent_id, root.parent_id) == (
+        step_span.span_id,
+        root.span_id,
+        None,
+    )
+    assert inner.attributes == {"page": 1}
+    assert root.duration >= step_span.duration >= inner.duration > 0
+    assert (step_span.error, root.error) == (None, "ValueError: boom")
+
+
+def test_tracer_traceparent() -> None:
+    """Tests the Tracer class with a `traceparent` header.
+
+    Tests that a valid W3C `traceparent` header continues the trace of the caller, and
+    that an invalid one starts a new trace.
+    """
+    untraced = Tracer(None)
+    trace_id, parent_id = "4bf92f3577b34da6a3ce929d0e0e4736", "00f067aa0ba902b7"
+    with untraced.trace("request", f"00-{trace_id}-{parent_id}-01") as root:
+        assert (root.trace_id, root.parent_id) == (trace_id, parent_id)
+        with untraced.span("step") as span:
+            assert span is None
+    with untraced.trace("request", "invalid") as root:
+        assert len(root.trace_id) == 32 and root.parent_id is None
+
+
+def test_jsonl_file_exporter(tmp_path: Path) -> None:
+    """Tests the JsonlFileExporter class.
+
+    Tests that the spans of each trace are appended to the file, one per line, by a
+    background writer, all written once the tracer is closed, and that the writer is
+    started again by an export after it.
+    """
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlFileExporter(path)
+    file_tracer = Tracer(exporter)
+    file_tracer.close()
+    assert not path.exists()
+    for _ in range(2):
+        with file_tracer.trace("request", path="/health"):
+            with file_tracer.span("step"):
+                pass
+    writer = getattr(exporter, "_writer")
+    assert writer is not None and writer is not threading.current_thread()
+    file_tracer.close()
+    assert not writer.is_alive()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["step", "request"] * 2
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
+    assert lines[1]["attributes"] == {"path": "/health"}
+    assert set(lines[0]) == {
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "start",
+        "duration",
+        "attributes",
+        "error",
+    }
+
+    with file_tracer.trace("request"):
+        pass
+    file_tracer.close()
+    assert len(path.read_text().splitlines()) == 5
+
+
+def test_jsonl_file_exporter_error(
+    tmp_path: Path, caplog: pytest.LogCaptureFixture
+) -> None:
+    """Tests the JsonlFileExporter class with a file that cannot be opened.
+
+    Tests that the error is logged and the spans dropped, rather than the requests
+    failing.
+    """
+    path = tmp_path / "missing" / "traces.jsonl"
+    file_tracer = Tracer(JsonlFileExporter(path))
+    for _ in range(2):
+        with file_tracer.trace("request"):
+            pass
+    file_tracer.close()
+    assert not path.exists()
+    assert "Unable to write the spans" in caplog.text
+
+
+def test_tracing_middleware(mocker: MockerFixture) -> None:
+    """Tests the TracingMiddleware class.
+
+    Tests that each request runs in a trace, whose ID is sent in the `X-Trace-Id` header,
+    and whose root span records the method, path, route and status of the request.
+    """
+    exporter = ListExporter()
+    mocker.patch.object(tracer, "exporter", exporter)
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> int:
+        with tracer.span("get_item"):
+            return item_id
+
+    app.add_middleware(TracingMiddleware)
+    client = TestClient(app)
+    response = client.get("/items/1")
+    client.get("/unknown")
+    assert len(exporter.traces) == 2
+    (step, root), (unknown,) = exporter.traces[0], exporter.traces[1]
+    assert response.headers["X-Trace-Id"] == root.trace_id == step.trace_id
+    assert root.attributes == {
+        "method": "GET",
+        "path": "/items/1",
+        "status": 200,
+        "route": "/items/{item_id}",
+    }
+    assert (unknown.attributes["route"], unknown.attributes["status"]) == (
+        "unmatched",
+        404,
+    )
+
+
+def test_trace_id_filter() -> None:
+    """Tests the TraceIdFilter class.
+
+    Tests that the ID of the running trace, or "-" outside of any trace, is added to the
+    log records.
+    """
+    log_filter = TraceIdFilter()
+    record = logging.makeLogRecord({"msg": "message"})
+    assert log_filter.filter(record) and getattr(record, "trace_id") == "-"
+    with tracer.trace("request") as root:
+        assert log_filter.filter(record)
+        assert getattr(record, "trace_id") == root.trace_id
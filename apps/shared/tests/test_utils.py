@@ -5,7 +5,7 @@ This module contains tests for utility functions that can be used by any app.
 
 from fastapi import status
 
-from apps.shared.utils import get_formatted_content
+from apps.shared.utils import get_formatted_content, is_not_modified
 from stargazer import settings
 
 
@@ -31,3 +31,18 @@ def test_get_formatted_content() -> None:
         assert formatted_content["documentation_url_path"] == "/docs"
     else:
         assert "documentation_url_path" not in formatted_content
+
+
+def test_is_not_modified() -> None:
+    """Tests the `is_not_modified` function.
+
+    Tests that an entity tag matches an `If-None-Match` header listing it, weak or
+    not, or a wildcard, and does not match otherwise.
+    """
+    etag = '"abc"'
+    assert not is_not_modified(None, etag)
+    assert not is_not_modified("", etag)
+    assert not is_not_modified('"def"', etag)
+    assert is_not_modified('"abc"', etag)
+    assert is_not_modified('"def", W/"abc"', etag)
+    assert is_not_modified("*", etag)
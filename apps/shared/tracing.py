@@ -0,0 +1,336 @@
+"""Tracing for the app.
+
+This module contains the spans timing the steps of the requests, their exporters (e.g.
+to a JSON Lines file, to analyse the critical paths offline), a middleware tracing each
+request and a logging filter adding the trace IDs to the logs, that can be used by any
+app.
+"""
+
+import logging
+import queue
+import re
+import threading
+from collections.abc import Awaitable, Callable, Coroutine, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from secrets import token_hex
+from time import perf_counter, time
+from typing import Any, ParamSpec, Protocol, TypeVar
+
+import msgspec
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from stargazer import settings
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+# W3C `traceparent` header, continuing the trace of the caller
+TRACEPARENT_PATTERN = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}")
+
+
+class Span:  # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    """Timed step of a trace."""
+
+    __slots__ = (
+        "attributes",
+        "duration",
+        "error",
+        "name",
+        "parent_id",
+        "span_id",
+        "spans",
+        "start",
+        "start_counter",
+        "trace_id",
+    )
+
+    def __init__(
+        self, name: str, trace_id: str, parent_id: str | None, spans: list["Span"]
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.parent_id = parent_id
+        self.span_id = token_hex(8)
+        self.attributes: dict[str, Any] = {}
+        self.error: str | None = None
+        self.start = time()
+        self.start_counter = perf_counter()
+        self.duration = 0.0
+        # Spans of the trace ended so far, shared by all the spans of the trace
+        self.spans = spans
+
+    def to_dict(self) -> dict[str, Any]:
+        """Formats the span for an exporter.
+
+        Returns:
+            dict[str, Any]: The IDs, name, start time (in seconds since the epoch),
+            duration (in seconds), attributes and error of the span.
+        """
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class SpanExporter(Protocol):  # pylint: disable=too-few-public-methods
+    """Destination of the spans of the traces."""
+
+    def export(self, spans: list[Span]) -> None:
+        """Exports the spans of a trace, once its root span ended.
+
+        Args:
+            spans (list[Span]): The spans of the trace, in order of ending.
+        """
+
+    def close(self) -> None:
+        """Exports the spans not exported yet and releases the resources, on shutdown."""
+
+
+class JsonlFileExporter:
+    """Exporter appending the spans to a JSON Lines file, one span per line.
+
+    The spans are encoded on export but written by a background thread keeping the file
+    open, so that the event loop never waits for the disk. The thread is started on the
+    first export, and stopped on close once all the spans exported are written.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._encoder = msgspec.json.Encoder()
+        # Lines of the traces to write, then None to stop the writer
+        self._queue: queue.SimpleQueue[bytes | None] = queue.SimpleQueue()
+        self._writer: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        """Queues the spans of a trace to be appended to the file, in a single write.
+
+        Args:
+            spans (list[Span]): The spans of the trace, in order of ending.
+        """
+        lines = b"".join(self._encoder.encode(span.to_dict()) + b"\n" for span in spans)
+        with self._lock:
+            self._queue.put(lines)
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write, name="span-writer", daemon=True
+                )
+                self._writer.start()
+
+    def close(self) -> None:
+        """Waits for the spans exported to be written, then stops the writer."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                self._queue.put(None)
+                writer.join()
+
+    def _write(self) -> None:
+        """Appends the lines queued to the file until stopped, flushing once idle."""
+        try:
+            with self.path.open("ab") as file:
+                while (lines := self._queue.get()) is not None:
+                    file.write(lines)
+                    if self._queue.empty():
+                        file.flush()
+                return
+        except OSError:
+            logger.exception("Unable to write the spans to %s", self.path)
+        # Drop the lines queued rather than keeping them in memory
+        while self._queue.get() is not None:
+            pass
+
+
+# Span running in the current context, if any
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """Tracer starting the traces and their spans.
+
+    Each trace has an ID, reported even without exporter. The spans of a trace are only
+    recorded if an exporter is set, so that tracing costs nothing more otherwise, and
+    are exported all at once when the root span of the trace ends.
+    """
+
+    def __init__(self, exporter: SpanExporter | None):
+        self.exporter = exporter
+
+    @contextmanager
+    def trace(
+        self, name: str, traceparent: str | None = None, **attributes: Any
+    ) -> Iterator[Span]:
+        """Starts a trace with its root span.
+
+        Args:
+            name (str): The name of the root span.
+            traceparent (str | None): The W3C `traceparent` header of the caller, whose
+            trace is continued if valid (defaults to None).
+            **attributes (Any): The attributes of the root span.
+
+        Yields:
+            Span: The root span, until the trace ends.
+        """
+        match = TRACEPARENT_PATTERN.fullmatch(traceparent or "")
+        trace_id, parent_id = match.groups() if match else (token_hex(16), None)
+        root = Span(name, trace_id, parent_id, [])
+        try:
+            with self._activate(root, attributes):
+                yield root
+        finally:
+            if self.exporter is not None:
+                self.exporter.export(root.spans)
+
+    def close(self) -> None:
+        """Closes the exporter, if any, once the spans exported so far are exported."""
+        if self.exporter is not None:
+            self.exporter.close()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span | None]:
+        """Starts a span, child of the span running in the current context.
+
+        Args:
+            name (str): The name of the span.
+            **attributes (Any): The attributes of the span.
+
+        Yields:
+            Span | None: The span until it ends, or None if not recorded (i.e. there is
+            no trace running or no exporter).
+        """
+        parent = current_span.get()
+        if parent is None or self.exporter is None:
+            yield None
+            return
+        span = Span(name, parent.trace_id, parent.span_id, parent.spans)
+        with self._activate(span, attributes):
+            yield span
+
+    @staticmethod
+    @contextmanager
+    def _activate(span: Span, attributes: dict[str, Any]) -> Iterator[None]:
+        """Runs a span in the current context, recording its duration and error.
+
+        Args:
+            span (Span): The span to run.
+            attributes (dict[str, Any]): The attributes of the span.
+
+        Yields:
+            None: Until the span ends.
+        """
+        span.attributes.update(attributes)
+        token = current_span.set(span)
+        try:
+            yield
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            span.duration = perf_counter() - span.start_counter
+            current_span.reset(token)
+            span.spans.append(span)
+
+
+def get_exporter() -> SpanExporter | None:
+    """Gets the exporter of the spans set by the `TRACING_EXPORTER` environment variable.
+
+    Returns:
+        SpanExporter | None: The exporter, or None if the spans are not exported.
+    """
+    if settings.TRACING_EXPORTER == "jsonl":
+        return JsonlFileExporter(settings.TRACING_FILE)
+    return None
+
+
+tracer = Tracer(get_exporter())
+
+
+def get_trace_id() -> str | None:
+    """Gets the ID of the trace running in the current context.
+
+    Returns:
+        str | None: The ID of the trace, or None if there is no trace running.
+    """
+    span = current_span.get()
+    return None if span is None else span.trace_id
+
+
+def traced(
+    name: str,
+) -> Callable[[Callable[P, Awaitable[T]]], Callable[P, Coroutine[Any, Any, T]]]:
+    """Decorator running each call of a coroutine function in a span.
+
+    Args:
+        name (str): The name of the spans.
+
+    Returns:
+        Callable: The decorator.
+    """
+
+    def decorator(
+        func: Callable[P, Awaitable[T]],
+    ) -> Callable[P, Coroutine[Any, Any, T]]:
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            with tracer.span(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class TraceIdFilter(logging.Filter):  # pylint: disable=too-few-public-methods
+    """Logging filter adding the ID of the running trace (or "-") to the records.
+
+    The ID is set as the `trace_id` attribute of the records, to be used in the format
+    of the logs (e.g. `%(trace_id)s`).
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.trace_id = get_trace_id() or "-"
+        return True
+
+
+class TracingMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware tracing each request.
+
+    Each request runs in a trace, continuing the one of the W3C `traceparent` header
+    if any, whose ID is sent in the `X-Trace-Id` header of the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = Headers(scope=scope).get("traceparent")
+        with tracer.trace(
+            "request", traceparent, method=scope["method"], path=scope["path"]
+        ) as root:
+
+            async def send_traced(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("X-Trace-Id", root.trace_id)
+                    root.attributes["status"] = message["status"]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_traced)
+            finally:
+                route = getattr(scope.get("route"), "path", "unmatched")
+                root.attributes["route"] = route
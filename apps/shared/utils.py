@@ -3,10 +3,14 @@
 This module contains utility functions that can be used by any app.
 """
 
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
 from typing import Any
 
+from fastapi import HTTPException
+from fastapi import status as http_status
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import OperationalError
 
 from stargazer import settings
 
@@ -19,7 +23,8 @@ def get_formatted_content(
     """Formats a response content.
 
     Formats a response content with a message, documentation URL path,
-    status, and optional details.
+    status, and optional details. Only the details go through `jsonable_encoder`,
+    the other fields being JSON-compatible already.
 
     Args:
         message (str): The message to be included in the response.
@@ -37,5 +42,48 @@ def get_formatted_content(
     if settings.DOCS_ACTIVATE:
         response["documentation_url_path"] = "/docs"
     if detail is not None:
-        response["detail"] = detail
-    return jsonable_encoder(response)
+        response["detail"] = jsonable_encoder(detail)
+    return response
+
+
+@contextmanager
+def handle_database_errors() -> Iterator[None]:
+    """Turns the failures to reach the database into 503 Service Unavailable errors.
+
+    Yields:
+        None: Until the queries to the database are done.
+
+    Raises:
+        HTTPException: If unable to connect to the database, a 503 Service
+        Unavailable exception is raised.
+    """
+    try:
+        yield
+    except OperationalError as exc:
+        raise HTTPException(
+            status_code=http_status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database not available",
+        ) from exc
+
+
+def is_not_modified(if_none_match: str | None, etag: str) -> bool:
+    """Checks whether a representation matches an `If-None-Match` header.
+
+    Compares the entity tag of the representation with each entity tag listed in the
+    `If-None-Match` header, using the weak comparison required for this header.
+
+    Args:
+        if_none_match (str | None): The `If-None-Match` header of the request.
+        etag (str): The quoted entity tag of the representation.
+
+    Returns:
+        bool: True if the representation matches, i.e. a 304 Not Modified response
+        can be sent, otherwise False.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
@@ -4,6 +4,9 @@ This module provides a FastAPI router for Status-related endpoints.
 """
 
 from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from apps.shared.metrics import render_metrics
 
 router = APIRouter()
 
@@ -19,3 +22,16 @@ def health_check() -> dict[str, str]:
         dict[str, str]: A dict with a single key "status" and value "healthy".
     """
     return {"status": "healthy"}
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics() -> str:
+    """Gets the metrics of the FastAPI app.
+
+    Returns the metrics of the app (e.g. the load of the star neighbour computations)
+    in the Prometheus text format, to be scraped by a Prometheus server.
+
+    Returns:
+        str: The metrics in the Prometheus text format.
+    """
+    return render_metrics()
@@ -18,3 +18,23 @@ def test_health_check() -> None:
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
+
+
+def test_get_metrics() -> None:
+    """Tests the /metrics endpoint.
+
+    GET /metrics returns a 200 with the metrics in the Prometheus text format, among
+    which the ones of the star neighbour computations, of the caches and of the
+    requests.
+    """
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE stargazer_neighbours_queued gauge" in response.text
+    assert "# TYPE stargazer_jobs_running gauge" in response.text
+    assert 'stargazer_cache_hit_ratio{cache="neighbours"}' in response.text
+    assert (
+        'stargazer_http_request_duration_seconds_count{method="GET",route="/health",'
+        'status="200"}'
+    ) in response.text
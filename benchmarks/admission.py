@@ -0,0 +1,87 @@
+"""Load test of the admission control of the star neighbour computations.
+
+This module sends a burst of simulated star neighbour computations, alternating CPU
+work (decoding) and waits (GitHub API calls), at once, first without any bound, then
+through the admission gate used by the GitHub app. It reports the latency percentiles
+of the computations done, the number of requests shed and the peak number of
+computations in memory at once.
+
+Usage:
+    python -m benchmarks.admission [--requests N] [--steps N] [--cpu-ms MS]
+"""
+
+import argparse
+import asyncio
+from contextlib import AbstractAsyncContextManager, nullcontext
+from statistics import quantiles
+from time import perf_counter
+from typing import Any
+
+from fastapi import HTTPException
+
+from apps.shared.admission import AdmissionGate
+from stargazer import settings
+
+
+async def main() -> None:
+    """Runs the load test and prints its results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="requests at once")
+    parser.add_argument("--steps", type=int, default=10, help="API calls per request")
+    parser.add_argument("--cpu-ms", type=float, default=2, help="CPU time per call")
+    args = parser.parse_args()
+
+    in_flight = peak = 0
+
+    async def compute(gate: AdmissionGate | None) -> float | None:
+        nonlocal in_flight, peak
+        start = perf_counter()
+        admission: AbstractAsyncContextManager[Any] = (
+            nullcontext() if gate is None else gate.admit()
+        )
+        try:
+            async with admission:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                try:
+                    for _ in range(args.steps):
+                        await asyncio.sleep(0.005)
+                        deadline = perf_counter() + args.cpu_ms / 1e3
+                        while perf_counter() < deadline:
+                            pass
+                finally:
+                    in_flight -= 1
+        except HTTPException:
+            return None
+        return perf_counter() - start
+
+    print(
+        f"{args.requests} requests at once, {args.steps} calls of {args.cpu_ms} ms each, "
+        f"gate of {settings.ADMISSION_MAX_CONCURRENCY} + "
+        f"{settings.ADMISSION_QUEUE_SIZE} queued, {settings.ADMISSION_QUEUE_TIMEOUT} s"
+    )
+    print(f"{'gate':<8}{'p50 (ms)':>10}{'p99 (ms)':>10}{'shed':>6}{'peak':>6}")
+    for name, gate in (
+        ("none", None),
+        (
+            "bounded",
+            AdmissionGate(
+                "benchmark",
+                settings.ADMISSION_MAX_CONCURRENCY,
+                settings.ADMISSION_QUEUE_SIZE,
+                settings.ADMISSION_QUEUE_TIMEOUT,
+            ),
+        ),
+    ):
+        peak = 0
+        results = await asyncio.gather(*(compute(gate) for _ in range(args.requests)))
+        latencies = [latency * 1e3 for latency in results if latency is not None]
+        percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies
+        print(
+            f"{name:<8}{percentiles[49]:>10.0f}{percentiles[-1]:>10.0f}"
+            f"{results.count(None):>6}{peak:>6}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
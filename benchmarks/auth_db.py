@@ -0,0 +1,115 @@
+"""Load test of the user lookups performed on each authenticated request.
+
+This module compares, at a given concurrency, the blocking lookup (a synchronous
+SQLModel session opened on the event loop) with the asynchronous one used by the Auth
+app. It reports the throughput of each, along with the worst lag of the event loop
+while the lookups run, i.e. how long every other request would have been stalled.
+
+Usage:
+    python -m benchmarks.auth_db [--users N] [--requests N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+import tempfile
+from collections.abc import Awaitable, Callable
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from apps.auth import utils
+from apps.auth.models import User
+from benchmarks.utils import run_concurrently
+from stargazer import settings
+
+
+def create_database(path: Path, users: int) -> None:
+    """Creates a SQLite database filled with fake users.
+
+    Args:
+        path (Path): The path of the database file.
+        users (int): The number of users to create.
+    """
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(
+            User(
+                username=f"user-{i}",
+                email=f"user-{i}@stargazer.com",
+                hashed_password="",
+            )
+            for i in range(users)
+        )
+        session.commit()
+    engine.dispose()
+
+
+async def lookup_by_index(
+    lookup: Callable[[str], Awaitable[User | None]], users: int, index: int
+) -> User | None:
+    """Looks a fake user up by its index.
+
+    Args:
+        lookup (Callable[[str], Awaitable[User | None]]): The lookup to run.
+        users (int): The number of users in the database.
+        index (int): The index of the lookup.
+
+    Returns:
+        User | None: The user object if found, otherwise None.
+    """
+    return await lookup(f"user-{index % users}")
+
+
+async def main() -> None:
+    """Runs the load test and prints its results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="users in the database")
+    parser.add_argument("--requests", type=int, default=5000, help="lookups to run")
+    parser.add_argument("--concurrency", type=int, default=50, help="lookups at once")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / "user.db"
+        create_database(path, args.users)
+
+        sync_engine = create_engine(f"sqlite:///{path}")
+
+        async def lookup_blocking(username: str) -> User | None:
+            with Session(sync_engine) as session:
+                statement = select(User).where(User.username == username)
+                return session.exec(statement).first()
+
+        async_engine = create_async_engine(
+            utils.get_async_database_url(f"sqlite:///{path}"),
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_POOL_MAX_OVERFLOW,
+        )
+        event.listen(async_engine.sync_engine, "connect", utils.set_sqlite_pragmas)
+
+        print(f"{args.requests} lookups, concurrency {args.concurrency}")
+        print(f"{'lookup':<10}{'lookups/s':>12}{'max loop lag (ms)':>20}")
+        with patch.object(utils, "get_engine", return_value=async_engine):
+            for name, lookup in (
+                ("blocking", lookup_blocking),
+                ("async", utils.get_user_by_username),
+            ):
+                stats = await run_concurrently(
+                    partial(lookup_by_index, lookup, args.users),
+                    args.requests,
+                    args.concurrency,
+                )
+                print(
+                    f"{name:<10}{stats['throughput']:>12.0f}"
+                    f"{stats['max_lag_ms']:>20.1f}"
+                )
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,257 @@
+"""Micro-benchmark of the decoding of GitHub API payloads.
+
+This module compares, for a synthetic page of 100 starred repositories, the generic
+decoding path (`Response.json` then dictionary lookups) with the schema-specific one
+used by the GitHub app. It reports the parse time and the allocations per page.
+
+Usage:
+    python -m benchmarks.decoding [--repeat N]
+"""
+
+import argparse
+import json
+import timeit
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from apps.github.utils import starred_repos_decoder
+
+PAGE_SIZE = 100
+
+
+def make_owner(index: int) -> dict[str, Any]:
+    """Makes a synthetic owner object, shaped as the ones sent by the GitHub API.
+
+    Args:
+        index (int): The index of the owner, used to make its fields unique.
+
+    Returns:
+        dict[str, Any]: The owner object.
+    """
+    login = f"owner-{index}"
+    url = f"https://api.github.com/users/{login}"
+    return {
+        "login": login,
+        "id": index,
+        "node_id": f"MDQ6VXNlcj{index:08d}",
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{index}?v=4",
+        "gravatar_id": "",
+        "url": url,
+        "html_url": f"https://github.com/{login}",
+        "followers_url": f"{url}/followers",
+        "following_url": f"{url}/following{{/other_user}}",
+        "gists_url": f"{url}/gists{{/gist_id}}",
+        "starred_url": f"{url}/starred{{/owner}}{{/repo}}",
+        "subscriptions_url": f"{url}/subscriptions",
+        "organizations_url": f"{url}/orgs",
+        "repos_url": f"{url}/repos",
+        "events_url": f"{url}/events{{/privacy}}",
+        "received_events_url": f"{url}/received_events",
+        "type": "User",
+        "user_view_type": "public",
+        "site_admin": False,
+    }
+
+
+def make_repo(index: int) -> dict[str, Any]:
+    """Makes a synthetic repository object, shaped as the ones sent by the GitHub API.
+
+    Args:
+        index (int): The index of the repository, used to make its fields unique.
+
+    Returns:
+        dict[str, Any]: The repository object.
+    """
+    owner = make_owner(index)
+    name = f"repo-{index}"
+    full_name = f"{owner['login']}/{name}"
+    url = f"https://api.github.com/repos/{full_name}"
+    repo: dict[str, Any] = {
+        "id": 1_000_000 + index,
+        "node_id": f"MDEwOlJlcG9zaXRvcnk{index:08d}",
+        "name": name,
+        "full_name": full_name,
+        "private": False,
+        "owner": owner,
+        "html_url": f"https://github.com/{full_name}",
+        "description": f"Synthetic repository number {index} used for benchmarking.",
+        "fork": False,
+        "url": url,
+        "homepage": None,
+        "size": 1024 + index,
+        "stargazers_count": 10 * index,
+        "watchers_count": 10 * index,
+        "language": "Python",
+        "has_issues": True,
+        "has_projects": True,
+        "has_downloads": True,
+        "has_wiki": False,
+        "has_pages": False,
+        "has_discussions": False,
+        "forks_count": index,
+        "mirror_url": None,
+        "archived": False,
+        "disabled": False,
+        "open_issues_count": index % 7,
+        "license": {
+            "key": "mit",
+            "name": "MIT License",
+            "spdx_id": "MIT",
+            "url": "https://api.github.com/licenses/mit",
+            "node_id": "MDc6TGljZW5zZTEz",
+        },
+        "allow_forking": True,
+        "is_template": False,
+        "web_commit_signoff_required": False,
+        "topics": ["api", "benchmark", "github", "python"],
+        "visibility": "public",
+        "forks": index,
+        "open_issues": index % 7,
+        "watchers": 10 * index,
+        "default_branch": "main",
+        "permissions": {
+            "admin": False,
+            "maintain": False,
+            "push": False,
+            "triage": False,
+            "pull": True,
+        },
+        "created_at": "2020-01-01T00:00:00Z",
+        "updated_at": "2025-03-23T00:00:00Z",
+        "pushed_at": "2025-03-23T00:00:00Z",
+    }
+    for resource in (
+        "forks",
+        "keys",
+        "collaborators",
+        "teams",
+        "hooks",
+        "issue_events",
+        "events",
+        "assignees",
+        "branches",
+        "tags",
+        "blobs",
+        "git_tags",
+        "git_refs",
+        "trees",
+        "statuses",
+        "languages",
+        "stargazers",
+        "contributors",
+        "subscribers",
+        "subscription",
+        "commits",
+        "git_commits",
+        "comments",
+        "issue_comment",
+        "contents",
+        "compare",
+        "merges",
+        "archive",
+        "downloads",
+        "issues",
+        "pulls",
+        "milestones",
+        "notifications",
+        "labels",
+        "releases",
+        "deployments",
+    ):
+        repo[f"{resource}_url"] = f"{url}/{resource}"
+    return repo
+
+
+def make_page() -> bytes:
+    """Makes a synthetic page of starred repositories.
+
+    Returns:
+        bytes: The JSON-encoded page, as received from the GitHub API.
+    """
+    return json.dumps([make_repo(index) for index in range(PAGE_SIZE)]).encode()
+
+
+def decode_generic(content: bytes) -> list[str]:
+    """Decodes a page of starred repositories through generic dictionaries.
+
+    Args:
+        content (bytes): The JSON-encoded page.
+
+    Returns:
+        list[str]: The full names of the repositories.
+    """
+    return [
+        f"{resp_repo['owner']['login']}/{resp_repo['name']}"
+        for resp_repo in json.loads(content)
+    ]
+
+
+def decode_lean(content: bytes) -> list[str]:
+    """Decodes a page of starred repositories through the schema-specific decoder.
+
+    Args:
+        content (bytes): The JSON-encoded page.
+
+    Returns:
+        list[str]: The full names of the repositories.
+    """
+    return [resp_repo.full_name for resp_repo in starred_repos_decoder.decode(content)]
+
+
+def measure(
+    decode: Callable[[bytes], list[str]], content: bytes, repeat: int
+) -> dict[str, float]:
+    """Measures the parse time and the allocations of a decoding path.
+
+    Args:
+        decode (Callable[[bytes], list[str]]): The decoding path to measure.
+        content (bytes): The JSON-encoded page to decode.
+        repeat (int): The number of decodings to time.
+
+    Returns:
+        dict[str, float]: The best time per page (in microseconds), the peak of
+        allocated memory (in KiB) and the number of allocated blocks still alive
+        at the peak.
+    """
+    best = min(timeit.repeat(lambda: decode(content), number=repeat, repeat=5))
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    snapshot_before = tracemalloc.take_snapshot()
+    result = decode(content)
+    snapshot_after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(
+        stat.count_diff
+        for stat in snapshot_after.compare_to(snapshot_before, "filename")
+    )
+    del result
+    return {
+        "time_us": best / repeat * 1e6,
+        "peak_kib": (peak - before) / 1024,
+        "blocks": float(blocks),
+    }
+
+
+def main() -> None:
+    """Runs the benchmark and prints its results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="decodings to time")
+    args = parser.parse_args()
+
+    content = make_page()
+    assert decode_generic(content) == decode_lean(content)  # nosec B101
+    print(f"Page of {PAGE_SIZE} repositories ({len(content) / 1024:.1f} KiB)")
+    print(f"{'path':<10}{'time/page (µs)':>16}{'peak (KiB)':>12}{'blocks':>10}")
+    for name, decode in (("generic", decode_generic), ("lean", decode_lean)):
+        stats = measure(decode, content, args.repeat)
+        print(
+            f"{name:<10}{stats['time_us']:>16.1f}"
+            f"{stats['peak_kib']:>12.1f}{stats['blocks']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""End-to-end load test of the star neighbours endpoint.
+
+This module drives a running app at a target concurrency: each virtual user gets a
+bearer token from `/token`, then the star neighbours of repositories picked with a
+power-law popularity (so that some are hot in cache) are requested. It reports the
+throughput, the latency percentiles of each endpoint and the status codes, along with
+the GitHub API calls made (read from `benchmarks.mock_github`) and the resident memory
+of the app (read from `/metrics`). The results can be written as JSON, so that runs can
+be compared.
+
+With `--cassette`, the repositories queried while the cassette was recorded (see
+`GITHUB_CASSETTE`) are queried again in the same order, e.g. to replay a production
+workload against an app replaying the cassette, without network. Only the queries that
+missed the caches of the app reached the GitHub API, and thus are in the cassette.
+
+The app is to be run against the mock GitHub API, with rate limits high enough not to
+throttle the load, e.g.
+    python -m benchmarks.mock_github --port 9000
+    GITHUB_API_URL=http://127.0.0.1:9000 RATE_LIMIT_BURST=1000000 \\
+        RATE_LIMIT_GITHUB_CALLS_PER_HOUR=1000000000 uvicorn main:app --port 8000
+
+Usage:
+    python -m benchmarks.load --username USER --password PASSWORD [--url URL]
+        [--github-url URL] [--requests N] [--concurrency N] [--repos N]
+        [--popularity A] [--view VIEW] [--cassette FILE] [--output FILE]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from itertools import accumulate
+from pathlib import Path
+from statistics import quantiles
+from time import perf_counter
+from typing import Any
+
+import httpx
+
+from apps.github.cassette import Cassette
+from benchmarks.utils import run_concurrently
+
+# Target of the first page of stargazers fetched by each star neighbour query
+STARGAZERS_TARGET = re.compile(
+    r"/repos/([^/]+)/([^/]+)/stargazers\?per_page=100&page=1"
+)
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """Summarizes latencies by their percentiles.
+
+    Args:
+        latencies (list[float]): The latencies, in seconds.
+
+    Returns:
+        dict[str, float]: The number of latencies, and their 50th, 95th and 99th
+        percentiles and maximum, in milliseconds.
+    """
+    milliseconds = sorted(latency * 1e3 for latency in latencies)
+    percentiles = (
+        quantiles(milliseconds, n=100, method="inclusive")
+        if len(milliseconds) > 1
+        else []
+    )
+    return {
+        "count": len(milliseconds),
+        "p50": percentiles[49] if percentiles else milliseconds[0],
+        "p95": percentiles[94] if percentiles else milliseconds[0],
+        "p99": percentiles[98] if percentiles else milliseconds[0],
+        "max": milliseconds[-1],
+    }
+
+
+def read_queried_repos(path: Path) -> list[str]:
+    """Reads the repositories queried while a cassette was recorded.
+
+    Args:
+        path (Path): The path of the cassette.
+
+    Returns:
+        list[str]: The names of the repositories queried, in the format "user/repo", in
+        order of query.
+    """
+    return [
+        f"{match[1]}/{match[2]}"
+        for interaction in Cassette.load(path).interactions
+        if (match := STARGAZERS_TARGET.fullmatch(interaction.target))
+    ]
+
+
+async def read_memory(client: httpx.AsyncClient) -> dict[str, float]:
+    """Reads the resident memory of the app from its metrics.
+
+    Args:
+        client (httpx.AsyncClient): The client of the app.
+
+    Returns:
+        dict[str, float]: The current and peak resident memory of the app, in bytes.
+    """
+    names = {
+        "stargazer_process_resident_memory_bytes": "rss",
+        "stargazer_process_max_resident_memory_bytes": "max_rss",
+    }
+    memory = {}
+    for line in (await client.get("/metrics")).text.splitlines():
+        name, _, value = line.partition(" ")
+        if name in names:
+            memory[names[name]] = float(value)
+    return memory
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses the arguments of the load test.
+
+    Returns:
+        argparse.Namespace: The arguments.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="app URL")
+    parser.add_argument("--github-url", help="mock GitHub API URL, for its stats")
+    parser.add_argument("--username", required=True, help="user of the app")
+    parser.add_argument("--password", required=True, help="password of the user")
+    parser.add_argument("--requests", type=int, default=1000, help="requests to run")
+    parser.add_argument("--concurrency", type=int, default=32, help="requests at once")
+    parser.add_argument(
+        "--repos", type=int, help="repositories (defaults to the mock's)"
+    )
+    parser.add_argument(
+        "--popularity", type=float, default=1.1, help="exponent of the popularity"
+    )
+    parser.add_argument("--view", choices=["full", "counts"], default="full")
+    parser.add_argument("--timeout", type=float, default=60, help="request timeout")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--cassette", type=Path, help="cassette of the queries to run")
+    parser.add_argument("--output", type=Path, help="JSON file of the results")
+    return parser.parse_args()
+
+
+async def main() -> None:  # pylint: disable=too-many-locals
+    """Runs the load test, prints its results and writes them if requested."""
+    args = parse_args()
+    rng = random.Random(args.seed)  # nosec B311
+    latencies: defaultdict[str, list[float]] = defaultdict(list)
+    statuses: Counter[str] = Counter()
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with (
+        httpx.AsyncClient(
+            base_url=args.url, timeout=args.timeout, limits=limits
+        ) as client,
+        httpx.AsyncClient(base_url=args.github_url or "") as github,
+    ):
+        upstream = None
+        if args.github_url:
+            upstream = (await github.delete("/_stats")).json()
+        queried = read_queried_repos(args.cassette) if args.cassette else []
+        repos = args.repos = args.repos or (
+            len(set(queried)) or (upstream["repos"] if upstream else 1000)
+        )
+        weights = list(
+            accumulate(1 / rank**args.popularity for rank in range(1, repos + 1))
+        )
+        memory_before = await read_memory(client)
+
+        async def measure(endpoint: str, method: str, url: str, **kwargs: Any) -> Any:
+            start = perf_counter()
+            resp = await client.request(method, url, **kwargs)
+            latencies[endpoint].append(perf_counter() - start)
+            statuses[f"{endpoint} {resp.status_code}"] += 1
+            return resp
+
+        async def login(_: int) -> str:
+            resp = await measure(
+                "token",
+                "POST",
+                "/token",
+                data={
+                    "grant_type": "password",
+                    "username": args.username,
+                    "password": args.password,
+                },
+            )
+            resp.raise_for_status()
+            return str(resp.json()["access_token"])
+
+        tokens = await asyncio.gather(*map(login, range(args.concurrency)))
+
+        async def query(index: int) -> None:
+            if queried:
+                repo_name = queried[index % len(queried)]
+            else:
+                repo = bisect_left(weights, rng.random() * weights[-1])
+                repo_name = f"owner-{repo}/repo-{repo}"
+            await measure(
+                "starneighbours",
+                "GET",
+                f"/repos/{repo_name}/starneighbours",
+                params={"view": args.view},
+                headers={"Authorization": f"Bearer {tokens[index % len(tokens)]}"},
+            )
+
+        stats = await run_concurrently(query, args.requests, args.concurrency)
+        memory_after = await read_memory(client)
+        if args.github_url:
+            upstream = (await github.get("/_stats")).json()
+
+    latency = {endpoint: summarize(values) for endpoint, values in latencies.items()}
+    results = {
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+            if key != "password"
+        },
+        "throughput": stats["throughput"],
+        "client_max_lag_ms": stats["max_lag_ms"],
+        "latency_ms": latency,
+        "statuses": dict(statuses),
+        "upstream": None
+        if upstream is None
+        else {
+            "calls": upstream["calls"],
+            "calls_per_request": upstream["calls"] / args.requests,
+            "errors": upstream["errors"],
+            "rate_limited": upstream["rate_limited"],
+        },
+        "memory_bytes": {
+            "rss_before": memory_before.get("rss"),
+            "rss_after": memory_after.get("rss"),
+            "max_rss": memory_after.get("max_rss"),
+        },
+    }
+
+    print(
+        f"{args.requests} requests, concurrency {args.concurrency}, "
+        f"{repos} repositories, {stats['throughput']:.1f} requests/s"
+    )
+    print(
+        f"{'endpoint':<16}{'count':>8}{'p50 (ms)':>10}{'p95 (ms)':>10}"
+        f"{'p99 (ms)':>10}{'max (ms)':>10}"
+    )
+    for endpoint, summary in latency.items():
+        print(
+            f"{endpoint:<16}{summary['count']:>8}{summary['p50']:>10.1f}"
+            f"{summary['p95']:>10.1f}{summary['p99']:>10.1f}{summary['max']:>10.1f}"
+        )
+    print("statuses:", ", ".join(f"{key}: {n}" for key, n in statuses.items()))
+    if results["upstream"] is not None:
+        print("GitHub API calls:", results["upstream"])
+    print("memory (bytes):", results["memory_bytes"])
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
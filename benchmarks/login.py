@@ -0,0 +1,51 @@
+"""Load test of the password verifications performed on each login.
+
+This module compares, at a given concurrency, the verification of bcrypt passwords on
+the event loop with the one in the bounded pool of worker threads used by the Auth app.
+It reports the login throughput of each, along with the worst lag of the event loop
+while the logins run, i.e. how long every in-flight request would have been stalled.
+
+Usage:
+    python -m benchmarks.login [--requests N] [--concurrency N]
+"""
+
+import argparse
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from apps.auth import utils
+from apps.auth.models import User
+from benchmarks.utils import run_concurrently
+from stargazer import settings
+
+
+async def main() -> None:
+    """Runs the load test and prints its results."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=32, help="logins to run")
+    parser.add_argument("--concurrency", type=int, default=16, help="logins at once")
+    args = parser.parse_args()
+
+    user = User(
+        username="user", email="", hashed_password=utils.get_password_hash("pw")
+    )
+
+    async def login_on_loop(_: int) -> bool:
+        return utils.verify_password("pw", user.hashed_password)
+
+    async def login_in_pool(_: int) -> bool:
+        return bool(await utils.authenticate_user("user", "pw"))
+
+    print(
+        f"{args.requests} logins, concurrency {args.concurrency}, "
+        f"{settings.PASSWORD_HASHING_WORKERS} worker threads"
+    )
+    print(f"{'login':<10}{'logins/s':>12}{'max loop lag (ms)':>20}")
+    with patch.object(utils, "get_user_by_username", AsyncMock(return_value=user)):
+        for name, login in (("on loop", login_on_loop), ("in pool", login_in_pool)):
+            stats = await run_concurrently(login, args.requests, args.concurrency)
+            print(f"{name:<10}{stats['throughput']:>12.1f}{stats['max_lag_ms']:>20.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,437 @@
+"""Micro-benchmarks of the hot paths of the app.
+
+This module times, on synthetic inputs from 1,000 to 1,000,000 star edges, the
+aggregation and sorting of star neighbours (`aggregate_starneighbours`, both views), the
+fetching and decoding of pages of stargazers and starred repositories (`fetch_*`, served
+by an in-memory transport), the creation and verification of access tokens
+(`create_access_token` and `get_current_user`, with and without the token in cache) and
+the formatting of error contents (`get_formatted_content`). Each case is timed several
+times after a warm-up, keeping the median and minimum times and the median time per
+item (edge, stargazer, repository, token or content).
+
+The results are written as JSON, to be kept as a baseline. The `compare` command then
+flags the cases whose minimum time (the least disturbed by the rest of the machine) grew
+beyond a threshold, exiting with a status of 1 if any did, e.g. to check a change before
+merging it.
+
+Usage:
+    python -m benchmarks.micro run [--output FILE] [--repeat N] [--max-size N]
+        [--only NAME [NAME ...]]
+    python -m benchmarks.micro compare BASELINE CURRENT [--threshold RATIO]
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import random
+import sys
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import Any
+
+import msgspec
+from httpx import AsyncClient, MockTransport, Request, Response
+
+from apps.auth.models import User
+from apps.auth.utils import (
+    create_access_token,
+    get_current_user,
+    token_cache,
+    user_cache,
+)
+from apps.github.utils import (
+    aggregate_starneighbours,
+    fetch_stargazers,
+    fetch_starred_repos,
+)
+from apps.shared.utils import get_formatted_content
+from benchmarks.decoding import PAGE_SIZE, make_owner, make_repo
+
+# Numbers of star edges of the synthetic inputs
+SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+# Repositories starred by each synthetic stargazer, and operations per edge of the
+# benchmarks not working on edges (e.g. a token per 100 edges)
+STARS_PER_USER = 50
+EDGES_PER_OPERATION = 100
+
+# A benchmark makes, for a number of edges, the workload to time and its number of items
+Benchmark = Callable[[int, asyncio.Runner], tuple[Callable[[], Any], int]]
+
+
+def make_starred(edges: int, seed: int = 0) -> list[tuple[str, list[str]]]:
+    """Makes synthetic stargazers with the repositories they starred.
+
+    The repository of rank `r` is starred with a weight of `1 / r ** 1.1`, out of a
+    repository per 10 edges, so that a few repositories gather most of the stargazers.
+
+    Args:
+        edges (int): The number of star edges, before the duplicates are dropped.
+        seed (int): The random seed (defaults to 0).
+
+    Returns:
+        list[tuple[str, list[str]]]: The stargazers, each with the names of the
+        repositories they starred.
+    """
+    rng = random.Random(seed)  # nosec B311
+    repos = [f"owner-{index}/repo-{index}" for index in range(max(1, edges // 10))]
+    weights = list(accumulate(1 / rank**1.1 for rank in range(1, len(repos) + 1)))
+    return [
+        (
+            f"owner-{user}",
+            list(
+                dict.fromkeys(
+                    rng.choices(
+                        repos, cum_weights=weights, k=min(STARS_PER_USER, edges - start)
+                    )
+                )
+            ),
+        )
+        for user, start in enumerate(range(0, edges, STARS_PER_USER))
+    ]
+
+
+def bench_aggregate_full(
+    edges: int, _: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the aggregation of star neighbours with the "full" view.
+
+    Args:
+        edges (int): The number of star edges.
+        _ (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of edges.
+    """
+    starred = make_starred(edges)
+    return lambda: aggregate_starneighbours(starred), edges
+
+
+def bench_aggregate_counts(
+    edges: int, _: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the aggregation of star neighbours with the "counts" view.
+
+    Args:
+        edges (int): The number of star edges.
+        _ (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of edges.
+    """
+    starred = make_starred(edges)
+    return lambda: aggregate_starneighbours(starred, "counts"), edges
+
+
+def make_fetch_client(make_item: Callable[[int], dict[str, Any]]) -> AsyncClient:
+    """Makes a client served a full page of items, with a next page, from memory.
+
+    Args:
+        make_item (Callable[[int], dict[str, Any]]): The maker of the items of the page.
+
+    Returns:
+        AsyncClient: The client.
+    """
+    content = msgspec.json.encode([make_item(index) for index in range(PAGE_SIZE)])
+
+    def handler(request: Request) -> Response:
+        return Response(
+            200,
+            content=content,
+            headers={"Link": f'<{request.url}>; rel="next"'},
+        )
+
+    return AsyncClient(transport=MockTransport(handler))
+
+
+def bench_fetch_stargazers(
+    edges: int, runner: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the fetching and decoding of pages of stargazers.
+
+    Args:
+        edges (int): The number of star edges, i.e. stargazers fetched.
+        runner (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of stargazers.
+    """
+    client = make_fetch_client(make_owner)
+    pages = max(1, edges // PAGE_SIZE)
+
+    async def fetch() -> None:
+        for page in range(1, pages + 1):
+            await fetch_stargazers(client, "owner-0", "repo-0", page)
+
+    return lambda: runner.run(fetch()), pages * PAGE_SIZE
+
+
+def bench_fetch_starred_repos(
+    edges: int, runner: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the fetching and decoding of pages of starred repositories.
+
+    Args:
+        edges (int): The number of star edges, i.e. repositories fetched.
+        runner (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of repositories.
+    """
+    client = make_fetch_client(make_repo)
+    pages = max(1, edges // PAGE_SIZE)
+
+    async def fetch() -> None:
+        for page in range(1, pages + 1):
+            await fetch_starred_repos(client, "owner-0", page)
+
+    return lambda: runner.run(fetch()), pages * PAGE_SIZE
+
+
+def bench_create_access_token(
+    edges: int, _: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the creation of access tokens.
+
+    Args:
+        edges (int): The number of star edges, scaling the number of tokens.
+        _ (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of tokens.
+    """
+    tokens = max(1, edges // EDGES_PER_OPERATION)
+
+    def create() -> None:
+        for _ in range(tokens):
+            create_access_token({"sub": "bench"}, timedelta(minutes=30))
+
+    return create, tokens
+
+
+def make_verify_tokens(
+    edges: int, runner: asyncio.Runner, cached: bool
+) -> tuple[Callable[[], Any], int]:
+    """Makes the workload verifying access tokens, of a user in cache.
+
+    Args:
+        edges (int): The number of star edges, scaling the number of tokens.
+        runner (asyncio.Runner): The runner of the asynchronous workloads.
+        cached (bool): Whether the verified tokens are kept in cache, or dropped
+        before each run so that their signatures are checked.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of tokens.
+    """
+    tokens = [
+        create_access_token({"sub": "bench", "jti": str(index)})
+        for index in range(max(1, edges // EDGES_PER_OPERATION))
+    ]
+    user = User(username="bench", email="bench@stargazer.com", hashed_password="")
+
+    async def verify() -> None:
+        user_cache.set("bench", user)
+        if not cached:
+            token_cache.clear()
+        for token in tokens:
+            await get_current_user(token)
+
+    return lambda: runner.run(verify()), len(tokens)
+
+
+def bench_get_current_user(
+    edges: int, runner: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the verification of access tokens (JWT decoding).
+
+    Args:
+        edges (int): The number of star edges, scaling the number of tokens.
+        runner (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of tokens.
+    """
+    return make_verify_tokens(edges, runner, cached=False)
+
+
+def bench_get_current_user_cached(
+    edges: int, runner: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the verification of access tokens already in cache.
+
+    Args:
+        edges (int): The number of star edges, scaling the number of tokens.
+        runner (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of tokens.
+    """
+    return make_verify_tokens(edges, runner, cached=True)
+
+
+def bench_get_formatted_content(
+    edges: int, _: asyncio.Runner
+) -> tuple[Callable[[], Any], int]:
+    """Benchmarks the formatting of error contents, half of them with details.
+
+    Args:
+        edges (int): The number of star edges, scaling the number of contents.
+        _ (asyncio.Runner): The runner of the asynchronous workloads.
+
+    Returns:
+        tuple[Callable[[], Any], int]: The workload and its number of contents.
+    """
+    contents = max(2, edges // EDGES_PER_OPERATION)
+    detail = [
+        {"type": "missing", "loc": ("query", "view"), "msg": "Field required"},
+        {"type": "enum", "loc": ("query", "format"), "msg": "Input should be 'a'"},
+    ]
+
+    def format_contents() -> None:
+        for _ in range(contents // 2):
+            get_formatted_content("Not Found", 404)
+            get_formatted_content("Invalid input", 422, detail)
+
+    return format_contents, contents // 2 * 2
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "aggregate_full": bench_aggregate_full,
+    "aggregate_counts": bench_aggregate_counts,
+    "fetch_stargazers": bench_fetch_stargazers,
+    "fetch_starred_repos": bench_fetch_starred_repos,
+    "create_access_token": bench_create_access_token,
+    "get_current_user": bench_get_current_user,
+    "get_current_user_cached": bench_get_current_user_cached,
+    "get_formatted_content": bench_get_formatted_content,
+}
+
+
+def measure(workload: Callable[[], Any], repeat: int) -> list[float]:
+    """Times a workload, after a warm-up run.
+
+    The garbage is collected before each run, so that no run pays for the garbage of
+    the previous ones.
+
+    Args:
+        workload (Callable[[], Any]): The workload to time.
+        repeat (int): The number of timed runs.
+
+    Returns:
+        list[float]: The duration of each run, in seconds.
+    """
+    workload()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = perf_counter()
+        workload()
+        times.append(perf_counter() - start)
+    return times
+
+
+def run(args: argparse.Namespace) -> None:
+    """Runs the benchmarks, prints their results and writes them if requested.
+
+    Args:
+        args (argparse.Namespace): The `only`, `max_size`, `repeat` and `output`
+        arguments.
+    """
+    results = {}
+    print(f"{'case':<40}{'median (ms)':>14}{'min (ms)':>12}{'per item (ns)':>16}")
+    with asyncio.Runner() as runner:
+        for name in args.only or BENCHMARKS:
+            for size in (size for size in SIZES if size <= args.max_size):
+                workload, items = BENCHMARKS[name](size, runner)
+                times = measure(workload, args.repeat)
+                case = f"{name}[{size}]"
+                results[case] = {
+                    "median_s": median(times),
+                    "min_s": min(times),
+                    "per_item_ns": median(times) / items * 1e9,
+                    "items": items,
+                }
+                print(
+                    f"{case:<40}{median(times) * 1e3:>14.3f}{min(times) * 1e3:>12.3f}"
+                    f"{results[case]['per_item_ns']:>16.1f}"
+                )
+    if args.output is not None:
+        report = {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+def compare(args: argparse.Namespace) -> int:
+    """Compares results with a baseline, flagging the regressions.
+
+    Args:
+        args (argparse.Namespace): The `baseline`, `current` and `threshold` arguments.
+
+    Returns:
+        int: The exit status, 1 if any case regressed beyond the threshold, else 0.
+    """
+    baseline = json.loads(args.baseline.read_text())["results"]
+    current = json.loads(args.current.read_text())["results"]
+    regressions = 0
+    print(
+        f"{'case':<40}{'baseline min (ms)':>19}{'current min (ms)':>19}{'change':>10}"
+    )
+    for case in {**baseline, **current}:
+        if case not in baseline or case not in current:
+            where = "current" if case in current else "baseline"
+            print(f"{case:<40}{'only in ' + where:>48}")
+            continue
+        before, after = baseline[case]["min_s"], current[case]["min_s"]
+        change = after / before - 1
+        flag = ""
+        if change > args.threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif change < -args.threshold:
+            flag = "  improvement"
+        print(
+            f"{case:<40}{before * 1e3:>19.3f}{after * 1e3:>19.3f}{change:>+10.1%}{flag}"
+        )
+    print(f"{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    """Parses the command line and runs the requested command."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parser_run = subparsers.add_parser("run", help="run the benchmarks")
+    parser_run.add_argument("--output", type=Path, help="JSON file of the results")
+    parser_run.add_argument("--repeat", type=int, default=5, help="timed runs")
+    parser_run.add_argument(
+        "--max-size", type=int, default=SIZES[-1], help="largest number of edges"
+    )
+    parser_run.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run"
+    )
+    parser_compare = subparsers.add_parser("compare", help="compare with a baseline")
+    parser_compare.add_argument("baseline", type=Path, help="JSON file of the baseline")
+    parser_compare.add_argument("current", type=Path, help="JSON file of the results")
+    parser_compare.add_argument(
+        "--threshold", type=float, default=0.1, help="relative slowdown flagged"
+    )
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        sys.exit(compare(args))
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
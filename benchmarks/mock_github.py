@@ -0,0 +1,240 @@
+"""Mock of the GitHub API serving a synthetic star graph.
+
+This module serves, as an ASGI app, the stargazers and starred repositories endpoints of
+the GitHub API over a synthetic star graph, so that the app can be benchmarked without
+spending any real rate limit. The popularity of the repositories and the number of
+repositories starred by each user follow power laws, the graph being generated from a
+seed so that runs are reproducible. Each response can be delayed (latency and jitter),
+fail (error rate) and carries the `X-RateLimit-*` headers of a rate limit, answering 403
+Forbidden once exhausted, as the GitHub API does.
+
+The users are named "owner-<i>" and the repositories "owner-<i>/repo-<i>", shaped as the
+ones of `benchmarks.decoding`. The number of calls, errors and rate-limited calls is
+served at `/_stats` (reset with `DELETE /_stats`).
+
+Usage:
+    python -m benchmarks.mock_github [--port N] [--users N] [--repos N]
+        [--mean-stars N] [--popularity A] [--latency-ms MS] [--jitter-ms MS]
+        [--error-rate P] [--rate-limit N] [--seed N]
+
+Then run the app against it, e.g.
+    GITHUB_API_URL=http://127.0.0.1:9000 uvicorn main:app
+"""
+
+import argparse
+import random
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable
+from functools import lru_cache
+from itertools import accumulate
+from time import time
+
+import anyio
+import msgspec
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from benchmarks.decoding import make_owner, make_repo
+
+# Length of the window of the rate limit, in seconds
+RATE_LIMIT_WINDOW = 3600
+
+
+class StarGraph:  # pylint: disable=too-few-public-methods
+    """Synthetic star graph, from the users to the repositories they starred."""
+
+    def __init__(self, starred: list[list[int]], repos: int):
+        self.starred = starred
+        self.stargazers: list[list[int]] = [[] for _ in range(repos)]
+        for user, user_repos in enumerate(starred):
+            for repo in user_repos:
+                self.stargazers[repo].append(user)
+
+    @classmethod
+    def generate(cls, args: argparse.Namespace) -> "StarGraph":
+        """Generates a star graph with power-law popularities and numbers of stars.
+
+        The repository of rank `r` is starred with a weight of `1 / r ** popularity`,
+        and the number of repositories starred by each user follows a Pareto
+        distribution of mean `mean_stars`.
+
+        Args:
+            args (argparse.Namespace): The `users`, `repos`, `mean_stars`, `popularity`
+            and `seed` arguments.
+
+        Returns:
+            StarGraph: The star graph.
+        """
+        rng = random.Random(args.seed)  # nosec B311
+        weights = list(
+            accumulate(1 / rank**args.popularity for rank in range(1, args.repos + 1))
+        )
+        # Pareto distribution of shape 2 (heavy-tailed), scaled to the requested mean
+        shape = 2.0
+        scale = args.mean_stars * (shape - 1) / shape
+        starred = []
+        for _ in range(args.users):
+            stars = min(args.repos, max(1, round(scale * rng.paretovariate(shape))))
+            user_repos: dict[int, None] = {}
+            while len(user_repos) < stars:
+                point = rng.random() * weights[-1]
+                user_repos[bisect_left(weights, point)] = None
+            starred.append(list(user_repos))
+        return cls(starred, args.repos)
+
+
+@lru_cache(maxsize=100_000)
+def encode_user(index: int) -> bytes:
+    """Encodes a user object, shaped as the ones sent by the GitHub API.
+
+    Args:
+        index (int): The index of the user.
+
+    Returns:
+        bytes: The JSON-encoded user object.
+    """
+    return msgspec.json.encode(make_owner(index))
+
+
+@lru_cache(maxsize=100_000)
+def encode_repo(index: int) -> bytes:
+    """Encodes a repository object, shaped as the ones sent by the GitHub API.
+
+    Args:
+        index (int): The index of the repository.
+
+    Returns:
+        bytes: The JSON-encoded repository object.
+    """
+    return msgspec.json.encode(make_repo(index))
+
+
+def parse_index(name: str, prefix: str) -> int | None:
+    """Parses the index out of the name of a user or a repository.
+
+    Args:
+        name (str): The name, e.g. "owner-3".
+        prefix (str): The prefix of the name before the index, e.g. "owner-".
+
+    Returns:
+        int | None: The index, or None if the name is not of the expected form.
+    """
+    index = name.removeprefix(prefix)
+    return int(index) if name.startswith(prefix) and index.isdigit() else None
+
+
+def create_app(graph: StarGraph, args: argparse.Namespace) -> Starlette:
+    """Creates the ASGI app serving the star graph.
+
+    Args:
+        graph (StarGraph): The star graph to serve.
+        args (argparse.Namespace): The `latency_ms`, `jitter_ms`, `error_rate`,
+        `rate_limit` and `seed` arguments.
+
+    Returns:
+        Starlette: The app.
+    """
+    rng = random.Random(args.seed)  # nosec B311
+    stats: Counter[str] = Counter()
+    window = {"reset": time() + RATE_LIMIT_WINDOW, "used": 0}
+
+    async def serve_page(
+        request: Request, items: list[int], encode: Callable[[int], bytes]
+    ) -> Response:
+        stats["calls"] += 1
+        delay = rng.gauss(args.latency_ms, args.jitter_ms) / 1e3
+        await anyio.sleep(max(delay, 0))
+        if time() >= window["reset"]:
+            window["reset"], window["used"] = time() + RATE_LIMIT_WINDOW, 0
+        window["used"] += 1
+        remaining = max(args.rate_limit - window["used"], 0)
+        headers = {
+            "X-RateLimit-Limit": str(args.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(int(window["reset"])),
+            "X-RateLimit-Used": str(min(window["used"], args.rate_limit)),
+        }
+        if window["used"] > args.rate_limit:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"message": "API rate limit exceeded"}, 403, headers=headers
+            )
+        if rng.random() < args.error_rate:
+            stats["errors"] += 1
+            return JSONResponse({"message": "Server Error"}, 502, headers=headers)
+        per_page = min(int(request.query_params.get("per_page", "30")), 100)
+        page = max(int(request.query_params.get("page", "1")), 1)
+        chunk = items[(page - 1) * per_page : page * per_page]
+        if page * per_page < len(items):
+            next_url = request.url.include_query_params(page=page + 1)
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        body = b"[" + b",".join(map(encode, chunk)) + b"]"
+        return Response(body, headers=headers, media_type="application/json")
+
+    async def get_stargazers(request: Request) -> Response:
+        owner = parse_index(request.path_params["owner"], "owner-")
+        repo = parse_index(request.path_params["repo"], "repo-")
+        if owner is None or owner != repo or owner >= len(graph.stargazers):
+            return JSONResponse({"message": "Not Found"}, 404)
+        return await serve_page(request, graph.stargazers[owner], encode_user)
+
+    async def get_starred(request: Request) -> Response:
+        user = parse_index(request.path_params["user"], "owner-")
+        if user is None or user >= len(graph.starred):
+            return JSONResponse({"message": "Not Found"}, 404)
+        return await serve_page(request, graph.starred[user], encode_repo)
+
+    async def get_stats(request: Request) -> Response:
+        if request.method == "DELETE":
+            stats.clear()
+        return JSONResponse(
+            {
+                "users": len(graph.starred),
+                "repos": len(graph.stargazers),
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "rate_limited": stats["rate_limited"],
+            }
+        )
+
+    return Starlette(
+        routes=[
+            Route("/repos/{owner}/{repo}/stargazers", get_stargazers),
+            Route("/users/{user}/starred", get_starred),
+            Route("/_stats", get_stats, methods=["GET", "DELETE"]),
+        ]
+    )
+
+
+def main() -> None:
+    """Generates the star graph and serves it until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--port", type=int, default=9000, help="port to listen on")
+    parser.add_argument("--users", type=int, default=10_000, help="users")
+    parser.add_argument("--repos", type=int, default=5_000, help="repositories")
+    parser.add_argument("--mean-stars", type=float, default=20, help="stars per user")
+    parser.add_argument(
+        "--popularity", type=float, default=1.1, help="exponent of the popularity"
+    )
+    parser.add_argument("--latency-ms", type=float, default=50, help="mean latency")
+    parser.add_argument("--jitter-ms", type=float, default=10, help="latency std dev")
+    parser.add_argument("--error-rate", type=float, default=0, help="share of 502s")
+    parser.add_argument(
+        "--rate-limit", type=int, default=1_000_000, help="calls per hour"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    graph = StarGraph.generate(args)
+    edges = sum(map(len, graph.starred))
+    print(f"{args.users} users, {args.repos} repositories, {edges} stars")
+    uvicorn.run(create_app(graph, args), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Startup-time benchmark of the app.
+
+This module measures how fast a fresh process of the app becomes useful: the time to
+import the app (with the heaviest modules imported directly by `main`, as reported by
+`python -X importtime`), then, for each run, the time until `/health` answers and, if
+credentials are given, until the star neighbours of a repository are served. The app is
+stopped after each run, so that the next one restarts it, e.g. from the snapshot of its
+caches dumped on shutdown (see `CACHE_SNAPSHOT_FILE`). With `--github-url`, the GitHub
+API calls made by the first star neighbours request are read from
+`benchmarks.mock_github`: none once served from a warm cache.
+
+The app is run with the environment of the benchmark, e.g.
+    python -m benchmarks.mock_github --port 9000
+    GITHUB_API_URL=http://127.0.0.1:9000 CACHE_SNAPSHOT_FILE=cache.snapshot \\
+        python -m benchmarks.startup --username USER --password PASSWORD \\
+        --repo owner-0/repo-0 --github-url http://127.0.0.1:9000
+
+Usage:
+    python -m benchmarks.startup [--runs N] [--port PORT] [--username USER]
+        [--password PASSWORD] [--repo OWNER/REPO] [--github-url URL] [--output FILE]
+"""
+
+import argparse
+import json
+import re
+import signal
+import subprocess  # nosec B404
+import sys
+from pathlib import Path
+from statistics import median
+from time import perf_counter, sleep
+from typing import Any
+
+import httpx
+
+# Line of `python -X importtime`: self and cumulative microseconds, then the module
+# indented by two spaces per level of nesting
+IMPORT_TIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def measure_imports(top: int) -> dict[str, Any]:
+    """Measures the time to import the app in a fresh interpreter.
+
+    Args:
+        top (int): The number of modules imported directly by `main` to report.
+
+    Returns:
+        dict[str, Any]: The time to import `main` and the heaviest modules it imports
+        directly, in milliseconds.
+    """
+    stderr = subprocess.run(  # nosec B603
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stderr
+    total = 0.0
+    modules: dict[str, float] = {}
+    for match in IMPORT_TIME.finditer(stderr):
+        cumulative, indent, module = int(match[2]) / 1e3, len(match[3]), match[4]
+        if module == "main" and indent == 0:
+            total = cumulative
+        elif indent == 2:
+            modules[module] = modules.get(module, 0.0) + cumulative
+    heaviest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {"import_ms": total, "heaviest_ms": dict(heaviest)}
+
+
+def wait_until(func: Any, timeout: float) -> Any:
+    """Calls a function until it returns a result, i.e. once the app is up.
+
+    Args:
+        func (Any): The function to call, raising an `httpx.TransportError` while the
+        app is not up.
+        timeout (float): The maximum number of seconds to wait.
+
+    Returns:
+        Any: The result of the function.
+
+    Raises:
+        TimeoutError: If the app is not up within the timeout, a TimeoutError is raised.
+    """
+    deadline = perf_counter() + timeout
+    while perf_counter() < deadline:
+        try:
+            return func()
+        except httpx.TransportError:
+            sleep(0.005)
+    raise TimeoutError("The app did not start in time")
+
+
+def run_app(args: argparse.Namespace) -> dict[str, Any]:
+    """Starts the app, measures when it is ready and stops it.
+
+    Args:
+        args (argparse.Namespace): The arguments of the benchmark.
+
+    Returns:
+        dict[str, Any]: The number of milliseconds until the app was healthy, until
+        the star neighbours were served and until it stopped, along with the status of
+        the star neighbours response and the GitHub API calls it made.
+    """
+    url = f"http://127.0.0.1:{args.port}"
+    github = httpx.Client(base_url=args.github_url or "")
+    if args.github_url:
+        github.delete("/_stats")
+    start = perf_counter()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with  # nosec B603
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    run: dict[str, Any] = {}
+    try:
+        with httpx.Client(base_url=url, timeout=60) as client:
+            wait_until(lambda: client.get("/health").raise_for_status(), 60)
+            run["ready_ms"] = (perf_counter() - start) * 1e3
+            if args.username and args.password and args.repo:
+                token = client.post(
+                    "/token",
+                    data={
+                        "username": args.username,
+                        "password": args.password,
+                        "grant_type": "password",
+                    },
+                ).json()["access_token"]
+                resp = client.get(
+                    f"/repos/{args.repo}/starneighbours",
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                run["first_result_ms"] = (perf_counter() - start) * 1e3
+                run["status"] = resp.status_code
+                if args.github_url:
+                    run["github_calls"] = github.get("/_stats").json()["calls"]
+    finally:
+        stop = perf_counter()
+        process.send_signal(signal.SIGINT)
+        process.wait(timeout=60)
+        run["shutdown_ms"] = (perf_counter() - stop) * 1e3
+        github.close()
+    return run
+
+
+def main() -> None:
+    """Runs the benchmark, prints its results and writes them if requested."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="starts of the app")
+    parser.add_argument("--port", type=int, default=8000, help="port of the app")
+    parser.add_argument("--username", help="user of the app")
+    parser.add_argument("--password", help="password of the user")
+    parser.add_argument("--repo", help="repository whose star neighbours are served")
+    parser.add_argument("--github-url", help="mock GitHub API URL, for its stats")
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports shown")
+    parser.add_argument("--output", type=Path, help="JSON file of the results")
+    args = parser.parse_args()
+
+    imports = measure_imports(args.top)
+    print(f"import of main: {imports['import_ms']:.0f} ms, heaviest direct imports:")
+    for module, elapsed in imports["heaviest_ms"].items():
+        print(f"  {module:<32}{elapsed:>8.0f} ms")
+
+    runs = []
+    print(f"{'run':<6}{'ready (ms)':>12}{'result (ms)':>13}{'status':>8}{'calls':>7}")
+    for index in range(args.runs):
+        run = run_app(args)
+        runs.append(run)
+        print(
+            f"{index + 1:<6}{run['ready_ms']:>12.0f}"
+            f"{run.get('first_result_ms', float('nan')):>13.0f}"
+            f"{run.get('status', '-'):>8}{run.get('github_calls', '-'):>7}"
+        )
+    results = {
+        **imports,
+        "runs": runs,
+        "ready_ms_median": median(run["ready_ms"] for run in runs),
+    }
+    if all("first_result_ms" in run for run in runs):
+        # The first run may start cold, the next ones restart from the snapshot if any
+        results["restart_first_result_ms_median"] = median(
+            run["first_result_ms"] for run in runs[1:] or runs
+        )
+    print(f"median ready: {results['ready_ms_median']:.0f} ms")
+    if "restart_first_result_ms_median" in results:
+        print(
+            "median first result after a restart: "
+            f"{results['restart_first_result_ms_median']:.0f} ms"
+        )
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
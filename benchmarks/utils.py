@@ -0,0 +1,49 @@
+"""Utilities for the benchmarks.
+
+This module provides utility functions shared by the benchmarks.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from time import perf_counter
+from typing import Any
+
+
+async def run_concurrently(
+    task: Callable[[int], Awaitable[Any]], requests: int, concurrency: int
+) -> dict[str, float]:
+    """Runs concurrent tasks while measuring the lag of the event loop.
+
+    The lag of the event loop is how late a timer set to fire every millisecond
+    actually fires, i.e. how long every other request would have been stalled.
+
+    Args:
+        task (Callable[[int], Awaitable[Any]]): The task to run, given its index.
+        requests (int): The total number of tasks to run.
+        concurrency (int): The number of tasks running at once.
+
+    Returns:
+        dict[str, float]: The throughput (in tasks per second) and the worst lag of
+        the event loop (in milliseconds).
+    """
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def measure_lag() -> None:
+        nonlocal max_lag
+        while not done.is_set():
+            start = perf_counter()
+            await asyncio.sleep(0.001)
+            max_lag = max(max_lag, perf_counter() - start - 0.001)
+
+    async def worker(offset: int) -> None:
+        for index in range(offset, requests, concurrency):
+            await task(index)
+
+    lag_task = asyncio.create_task(measure_lag())
+    start = perf_counter()
+    await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+    elapsed = perf_counter() - start
+    done.set()
+    await lag_task
+    return {"throughput": requests / elapsed, "max_lag_ms": max_lag * 1e3}
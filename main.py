@@ -3,26 +3,81 @@
 This module contains the entrypoint of the FastAPI app.
 """
 
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 import apps.github.exceptions as exceptions_github
 import apps.shared.exceptions as exceptions_shared
+from apps.admin.router import router as router_admin
 from apps.auth.router import router as router_auth
+from apps.auth.utils import is_admin_authorization
 from apps.github.router import router as router_github
+from apps.github.snapshot import load_snapshot, save_snapshot
+from apps.github.utils import save_github_cassette
+from apps.jobs.router import router as router_jobs
+from apps.jobs.utils import job_runner
+from apps.shared.compression import CompressionMiddleware
+from apps.shared.eventloop import loop_monitor
+from apps.shared.memory import start_tracing
+from apps.shared.metrics import MetricsMiddleware
+from apps.shared.profiling import ProfilingMiddleware
+from apps.shared.tracing import TracingMiddleware, tracer
 from apps.status.router import router as router_status
 from stargazer import settings
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Runs the background workers and the event loop monitor of the app while it is up.
+
+    The memory allocations are traced from startup if `MEMORY_ACCOUNTING` is set, and the
+    responses of the GitHub API recorded are saved on shutdown (see `GITHUB_CASSETTE`).
+    The caches of the GitHub app are loaded from their snapshot on startup and dumped
+    to it on shutdown, if any (see `CACHE_SNAPSHOT_FILE`), and the spans exported are
+    written before the exporter is closed (see `TRACING_EXPORTER`).
+
+    Args:
+        _ (FastAPI): The app.
+
+    Yields:
+        None: Once the workers and the monitor are started, until the app shuts down.
+    """
+    if settings.MEMORY_ACCOUNTING:
+        start_tracing()
+    if settings.CACHE_SNAPSHOT_FILE:
+        load_snapshot(settings.CACHE_SNAPSHOT_FILE)
+    try:
+        async with loop_monitor.run(), job_runner.run():
+            yield
+    finally:
+        save_github_cassette()
+        tracer.close()
+        if settings.CACHE_SNAPSHOT_FILE:
+            save_snapshot(settings.CACHE_SNAPSHOT_FILE)
+
+
 # Create FastAPI app
 app = FastAPI(
     docs_url="/docs" if settings.DOCS_ACTIVATE else None,
     redoc_url="/redoc" if settings.DOCS_ACTIVATE else None,
+    lifespan=lifespan,
 )
 
 # Setup routers to the app
+app.include_router(router_admin)
 app.include_router(router_auth)
 app.include_router(router_github)
+app.include_router(router_jobs)
 app.include_router(router_status)
 
+# Setup middlewares to the app
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware, authorize=is_admin_authorization)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
+
 # Setup exceptions to the app
 exceptions_github.include_app(app)
 exceptions_shared.include_app(app)
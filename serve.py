@@ -0,0 +1,90 @@
+"""Launcher of the Stargazer app.
+
+This script serves the app with one or more worker processes, each running on uvloop
+with the httptools HTTP parser. The number of workers is set by the `WORKERS`
+environment variable (one by default), unless given. Several workers, to use all the
+CPUs, require the rate limits to be kept in the database (`RATE_LIMIT_BACKEND`).
+
+With more than one worker, the star neighbour results and the lists of starred
+repositories are cached in a file shared by the workers (see `SHARED_CACHE_FILE`),
+so that adding workers does not multiply the GitHub API calls. Unless set, the file is
+created on /dev/shm if it has room for it (see `SHARED_CACHE_SIZE`), else in the
+temporary directory, and removed on exit. Recording the responses of the GitHub API
+(`GITHUB_CASSETTE=record`) requires a single worker, so that one cassette has them all.
+
+Usage:
+    python serve.py [--host HOST] [--port PORT] [--workers N] [--log-config FILE]
+"""
+
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+import uvicorn
+
+from stargazer import settings
+
+
+def create_shared_cache_file() -> Path:
+    """Creates an empty file for the shared cache, preferably on a tmpfs.
+
+    The file is created with a unique name, readable by the current user only.
+
+    Returns:
+        Path: The path of the file, on /dev/shm if it has room for the shared cache,
+        otherwise in the temporary directory.
+    """
+    directory = None
+    shm = Path("/dev/shm")  # nosec B108
+    if shm.is_dir():
+        stats = os.statvfs(shm)
+        if stats.f_bavail * stats.f_frsize >= settings.SHARED_CACHE_SIZE * 2**20:
+            directory = shm
+    fd, path = tempfile.mkstemp(suffix=".cache", prefix="stargazer-", dir=directory)
+    os.close(fd)
+    return Path(path)
+
+
+def main() -> None:
+    """Runs the script."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind to")
+    parser.add_argument("--port", type=int, default=8000, help="port to bind to")
+    parser.add_argument(
+        "--workers", type=int, default=settings.WORKERS, help="worker processes"
+    )
+    parser.add_argument("--log-config", help="logging configuration file")
+    args = parser.parse_args()
+    workers = max(1, args.workers)
+    if workers > 1 and settings.GITHUB_CASSETTE == "record":
+        # Each worker would record its own responses, replacing the cassette of the others
+        parser.error("GITHUB_CASSETTE=record requires a single worker (--workers 1)")
+    if workers > 1 and settings.RATE_LIMIT_BACKEND == "memory":
+        # Each worker would enforce the whole quotas of the users on its own
+        parser.error("Several workers require RATE_LIMIT_BACKEND=database")
+
+    # Read by the workers, which import the settings again
+    os.environ.setdefault("SERVER_STARTED_AT", str(settings.SERVER_STARTED_AT))
+    shared_cache_path = None
+    if workers > 1 and not settings.SHARED_CACHE_FILE:
+        shared_cache_path = create_shared_cache_file()
+        os.environ["SHARED_CACHE_FILE"] = str(shared_cache_path)
+
+    try:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            loop="uvloop",
+            http="httptools",
+            log_config=args.log_config or uvicorn.config.LOGGING_CONFIG,
+        )
+    finally:
+        if shared_cache_path is not None:
+            shared_cache_path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
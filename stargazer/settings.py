@@ -5,19 +5,110 @@ This module contains settings used by the app.
 Attributes:
     ACCESS_TOKEN_EXPIRE_MINUTES (float): The number of minutes the access token to the app remains
         valid (defaults to 30).
-    DATABASE_URL (str): The URL of the database used by the app.
+    ADMIN_USERNAMES (frozenset[str]): The usernames of the admin users, allowed to profile
+        requests and to download the profiles, as a comma-separated list (defaults to none).
+    ADMISSION_MAX_CONCURRENCY (int): The maximum number of star neighbour computations running at
+        once (defaults to 8).
+    ADMISSION_QUEUE_SIZE (int): The maximum number of star neighbour computations waiting to run,
+        beyond which requests get a 503 Service Unavailable (defaults to 16).
+    ADMISSION_QUEUE_TIMEOUT (float): The maximum number of seconds a star neighbour computation
+        waits to run, beyond which the request gets a 503 Service Unavailable (defaults to 2).
+    API_KEY_SECRET_KEY (str): The secret key used to hash API keys (defaults to JWT_SECRET_KEY).
+        Changing it invalidates all the API keys.
+    AUTH_CACHE_SIZE (int): The maximum number of verified tokens and of users kept in cache
+        (defaults to 10000).
+    AUTH_CACHE_TTL (float): The number of seconds a verified token or a user remains in cache, i.e.
+        the longest time a change to a user (e.g. disabling) takes to apply (defaults to 30).
+    CACHE_SNAPSHOT_FILE (str | None): The file the star neighbour results and the lists of
+        stargazers and of starred repositories in cache are dumped to on shutdown, and loaded
+        from on startup (defaults to none, i.e. no snapshot).
+    COMPRESSION_MINIMUM_SIZE (int): The minimum size in bytes of a response body to compress it
+        (defaults to 1024).
+    COMPRESSION_OFFLOAD_SIZE (int): The minimum size in bytes of a response body to compress it in
+        a worker thread rather than on the event loop (defaults to 65536).
+    DATABASE_POOL_MAX_OVERFLOW (int): The maximum number of connections to the database opened
+        beyond the pool size under load (defaults to 10).
+    DATABASE_POOL_SIZE (int): The number of connections to the database kept open (defaults to 5).
+    DATABASE_URL (str): The URL of the database used by the app. Drivers are replaced with their
+        asynchronous counterparts (e.g. aiosqlite for SQLite, asyncpg for PostgreSQL).
     DOCS_ACTIVATE (bool): Whether to make the documentation available (defaults to True).
+    GITHUB_API_URL (str): The base URL of the GitHub API, e.g. to target a mock server
+        (defaults to "https://api.github.com").
+    GITHUB_CACHE_SIZE (int): The maximum number of lists of stargazers and of starred
+        repositories kept in cache (defaults to 10000).
+    GITHUB_CACHE_TTL (float): The number of seconds a list of stargazers or of starred
+        repositories remains in cache (defaults to 3600).
+    GITHUB_CASSETTE (str): What is done with the responses of the GitHub API. Possible values:
+        "none" (default), "record" (recorded to GITHUB_CASSETTE_FILE, saved on shutdown) and
+        "replay" (served from GITHUB_CASSETTE_FILE, without network).
+    GITHUB_CASSETTE_FILE (str): The cassette the responses of the GitHub API are recorded to or
+        replayed from (defaults to "github.cassette").
+    GITHUB_CASSETTE_TIME_SCALE (float): The factor applied to the recorded latencies of the
+        responses replayed, e.g. 0 to serve them at once (defaults to 1).
     GITHUB_TOKEN (str): A GitHub API access token.
     GITHUB_MAX_PAGE_REPO (int): The maximum number of pages to fetch for the requested repository
         (defaults to 1).
     GITHUB_MAX_PAGE_STARGAZER (int): The maximum number of pages to fetch for a stargazer of the
         requested repository (defaults to 1).
+    GRAPH_FANOUT (int): The maximum number of neighbours kept for each repository expanded by a
+        star neighbourhood exploration (defaults to 10).
+    GRAPH_MAX_CALLS (int): The maximum number of GitHub API calls made by a star neighbourhood
+        exploration, beyond which it stops expanding (defaults to 200).
+    GRAPH_MAX_DEPTH (int): The maximum number of hops of a star neighbourhood exploration
+        (defaults to 3).
+    GRAPH_SAMPLE_SIZE (int): The maximum number of stargazers whose starred repositories are
+        fetched for each repository expanded by a star neighbourhood exploration (defaults
+        to 20).
+    JOB_RESULT_TTL (float): The number of seconds the result of a job is kept and reused by
+        identical jobs (defaults to 86400).
+    JOB_WORKERS (int): The number of jobs running at once in the background (defaults to 2).
     JWT_ALGORITHM (str): The algorithm used to sign JSON Web Tokens (JWT). Possible values: "HS256"
         (default), "HS384" and "HS512".
     JWT_SECRET_KEY (str): The secret key used to sign JSON Web Tokens (JWT).
+    LOOP_MONITOR_DEBUG (bool): Whether to capture and log the stack of the code blocking the
+        event loop for more than LOOP_MONITOR_THRESHOLD (defaults to False).
+    LOOP_MONITOR_INTERVAL (float): The number of seconds between two measures of the lag of
+        the event loop (defaults to 0.1).
+    LOOP_MONITOR_THRESHOLD (float): The number of seconds the event loop has to be blocked for
+        its blocking to be logged in debug mode (defaults to 0.1).
+    MEMORY_ACCOUNTING (bool): Whether to trace the memory allocations from startup, to export
+        the peak memory allocated by each star neighbour computation (defaults to False).
+    MEMORY_TRACEBACK_FRAMES (int): The number of frames kept for each memory allocation traced
+        (defaults to 1).
+    NEIGHBOURS_CACHE_SIZE (int): The maximum number of star neighbour results kept in cache
+        (defaults to 1024).
+    NEIGHBOURS_CACHE_TTL (float): The number of seconds a star neighbour result remains in
+        cache (defaults to 600).
+    PASSWORD_HASHING_QUEUE_SIZE (int): The maximum number of password hashing tasks waiting for a
+        worker thread, beyond which logins get a 503 Service Unavailable (defaults to 64).
+    PASSWORD_HASHING_WORKERS (int): The number of worker threads hashing passwords (defaults to
+        the number of CPUs).
+    PROFILING_INTERVAL (float): The number of seconds between two samples of the stack of a
+        profiled request (defaults to 0.001).
+    RATE_LIMIT_BACKEND (str): The backend keeping the rate limits of the users. Possible values:
+        "memory" (default, per process) and "database" (shared by all the processes).
+    RATE_LIMIT_BURST (int): The maximum number of star neighbour requests a user can make in a
+        burst (defaults to 20).
+    RATE_LIMIT_GITHUB_CALLS_PER_HOUR (int): The number of GitHub API calls each user can cause
+        per hour, charged by the calls actually made (defaults to 1000).
+    RATE_LIMIT_REQUESTS_PER_MINUTE (float): The number of star neighbour requests each user can
+        make per minute, once the burst is spent (defaults to 60).
+    SERVER_STARTED_AT (float): The Unix time the server was started at, set by the launcher so
+        that all its worker processes agree on it (defaults to the time the settings are loaded).
+    SHARED_CACHE_FILE (str | None): The file shared by the worker processes to cache the star
+        neighbour results and the starred repositories, preferably on a tmpfs (defaults to
+        none, i.e. no shared cache, unless set by the launcher for several workers).
+    SHARED_CACHE_SIZE (int): The size of the shared cache in mebibytes (defaults to 256).
+    TRACING_EXPORTER (str): The exporter of the spans of the traces. Possible values: "none"
+        (default, only the trace IDs are reported) and "jsonl" (appended to TRACING_FILE).
+    TRACING_FILE (str): The JSON Lines file the spans are appended to by the "jsonl" exporter
+        (defaults to "traces.jsonl").
+    WORKERS (int): The number of worker processes started by the launcher (defaults to 1). More
+        than one requires RATE_LIMIT_BACKEND to be "database".
 """
 
-from os import getenv
+from os import cpu_count, getenv
+from time import time
 
 # Authentification settings
 ACCESS_TOKEN_EXPIRE_MINUTES = max(1, float(getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30")))
@@ -27,16 +118,98 @@ JWT_ALGORITHM = (
     else "HS256"
 )
 JWT_SECRET_KEY = getenv("JWT_SECRET_KEY", "my-dev-secret-key")
+API_KEY_SECRET_KEY = getenv("API_KEY_SECRET_KEY", JWT_SECRET_KEY)
+ADMIN_USERNAMES = frozenset(
+    username
+    for username in map(str.strip, getenv("ADMIN_USERNAMES", "").split(","))
+    if username
+)
+AUTH_CACHE_SIZE = max(1, int(getenv("AUTH_CACHE_SIZE", "10000")))
+AUTH_CACHE_TTL = max(0, float(getenv("AUTH_CACHE_TTL", "30")))
+PASSWORD_HASHING_QUEUE_SIZE = max(0, int(getenv("PASSWORD_HASHING_QUEUE_SIZE", "64")))
+PASSWORD_HASHING_WORKERS = max(
+    1, int(getenv("PASSWORD_HASHING_WORKERS", str(cpu_count() or 1)))
+)
+
+# Compression settings
+COMPRESSION_MINIMUM_SIZE = max(0, int(getenv("COMPRESSION_MINIMUM_SIZE", "1024")))
+COMPRESSION_OFFLOAD_SIZE = max(0, int(getenv("COMPRESSION_OFFLOAD_SIZE", "65536")))
 
 # Database settings
 # Here we use a simple database (SQLite) for the development environment
 # In production, we should use a better database (e.g. PostgreSQL)
 DATABASE_URL = getenv("DATABASE_URL", "sqlite:///database/user.db")
+DATABASE_POOL_SIZE = max(1, int(getenv("DATABASE_POOL_SIZE", "5")))
+DATABASE_POOL_MAX_OVERFLOW = max(0, int(getenv("DATABASE_POOL_MAX_OVERFLOW", "10")))
 
 # Documentation settings
 DOCS_ACTIVATE = getenv("DOCS_ACTIVATE", "1") == "1"
 
 # GitHub-API-related settings
+GITHUB_API_URL = getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
 GITHUB_TOKEN = getenv("GITHUB_TOKEN")
 GITHUB_MAX_PAGE_REPO = max(1, int(getenv("GITHUB_MAX_PAGE_REPO", "1")))
 GITHUB_MAX_PAGE_STARGAZER = max(1, int(getenv("GITHUB_MAX_PAGE_STARGAZERS", "1")))
+GITHUB_CASSETTE = (
+    cassette
+    if ((cassette := getenv("GITHUB_CASSETTE")) in ["record", "replay"])
+    else "none"
+)
+GITHUB_CASSETTE_FILE = getenv("GITHUB_CASSETTE_FILE", "github.cassette")
+GITHUB_CASSETTE_TIME_SCALE = max(0, float(getenv("GITHUB_CASSETTE_TIME_SCALE", "1")))
+
+# Graph-exploration settings
+GRAPH_FANOUT = max(1, int(getenv("GRAPH_FANOUT", "10")))
+GRAPH_MAX_CALLS = max(1, int(getenv("GRAPH_MAX_CALLS", "200")))
+GRAPH_MAX_DEPTH = max(1, int(getenv("GRAPH_MAX_DEPTH", "3")))
+GRAPH_SAMPLE_SIZE = max(1, int(getenv("GRAPH_SAMPLE_SIZE", "20")))
+
+# Admission control settings
+ADMISSION_MAX_CONCURRENCY = max(1, int(getenv("ADMISSION_MAX_CONCURRENCY", "8")))
+ADMISSION_QUEUE_SIZE = max(0, int(getenv("ADMISSION_QUEUE_SIZE", "16")))
+ADMISSION_QUEUE_TIMEOUT = max(0, float(getenv("ADMISSION_QUEUE_TIMEOUT", "2")))
+
+# Job-related settings
+JOB_RESULT_TTL = max(0, float(getenv("JOB_RESULT_TTL", "86400")))
+JOB_WORKERS = max(1, int(getenv("JOB_WORKERS", "2")))
+
+# Rate-limiting settings
+RATE_LIMIT_BACKEND = (
+    "database" if getenv("RATE_LIMIT_BACKEND") == "database" else "memory"
+)
+RATE_LIMIT_BURST = max(1, int(getenv("RATE_LIMIT_BURST", "20")))
+RATE_LIMIT_GITHUB_CALLS_PER_HOUR = max(
+    1, int(getenv("RATE_LIMIT_GITHUB_CALLS_PER_HOUR", "1000"))
+)
+RATE_LIMIT_REQUESTS_PER_MINUTE = max(
+    1e-3, float(getenv("RATE_LIMIT_REQUESTS_PER_MINUTE", "60"))
+)
+
+# Event loop monitoring settings
+LOOP_MONITOR_DEBUG = getenv("LOOP_MONITOR_DEBUG", "0") == "1"
+LOOP_MONITOR_INTERVAL = max(1e-3, float(getenv("LOOP_MONITOR_INTERVAL", "0.1")))
+LOOP_MONITOR_THRESHOLD = max(1e-3, float(getenv("LOOP_MONITOR_THRESHOLD", "0.1")))
+
+# Memory instrumentation settings
+MEMORY_ACCOUNTING = getenv("MEMORY_ACCOUNTING", "0") == "1"
+MEMORY_TRACEBACK_FRAMES = max(1, int(getenv("MEMORY_TRACEBACK_FRAMES", "1")))
+
+# Profiling settings
+PROFILING_INTERVAL = max(1e-4, float(getenv("PROFILING_INTERVAL", "0.001")))
+
+# Server settings
+SERVER_STARTED_AT = float(getenv("SERVER_STARTED_AT", str(time())))
+WORKERS = max(1, int(getenv("WORKERS", "1")))
+
+# Tracing settings
+TRACING_EXPORTER = "jsonl" if getenv("TRACING_EXPORTER") == "jsonl" else "none"
+TRACING_FILE = getenv("TRACING_FILE", "traces.jsonl")
+
+# Cache-related settings
+NEIGHBOURS_CACHE_SIZE = max(1, int(getenv("NEIGHBOURS_CACHE_SIZE", "1024")))
+NEIGHBOURS_CACHE_TTL = max(0, float(getenv("NEIGHBOURS_CACHE_TTL", "600")))
+GITHUB_CACHE_SIZE = max(1, int(getenv("GITHUB_CACHE_SIZE", "10000")))
+GITHUB_CACHE_TTL = max(0, float(getenv("GITHUB_CACHE_TTL", "3600")))
+SHARED_CACHE_FILE = getenv("SHARED_CACHE_FILE") or None
+CACHE_SNAPSHOT_FILE = getenv("CACHE_SNAPSHOT_FILE") or None
+SHARED_CACHE_SIZE = max(1, int(getenv("SHARED_CACHE_SIZE", "256")))
@@ -0,0 +1,53 @@
+"""Bootstrap of the utility scripts.
+
+This module contains the dynamic import of the modules of the app by the utility
+scripts, which are run from the `utilities` directory rather than as modules of the app.
+"""
+
+import sys
+from importlib.util import module_from_spec, spec_from_file_location
+from os import path
+from types import ModuleType
+
+parent_dir = path.abspath(path.join(path.dirname(__file__), ".."))
+
+
+def import_module(module_name: str, file_path: str) -> ModuleType:
+    """Dynamically imports a Python module from a file path.
+
+    Dynamically imports a Python module from a given file path. If the module
+    cannot be imported, the script exits with a code 1.
+
+    Args:
+        module_name (str): The name of the module to import.
+        file_path (str): The path to the Python file containing the module.
+
+    Returns:
+        The imported module.
+    """
+    spec = spec_from_file_location(module_name, file_path)
+    if spec is None or spec.loader is None:
+        print(f"Unable to import the '{module_name}' module.")
+        sys.exit(1)
+    module = module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def import_auth_modules() -> tuple[ModuleType, ModuleType]:
+    """Dynamically imports the models and the utils of the auth app.
+
+    Returns:
+        tuple[ModuleType, ModuleType]: The `apps.auth.models` and `apps.auth.utils`
+        modules.
+    """
+    _ = import_module("stargazer", path.join(parent_dir, "stargazer/__init__.py"))
+    _ = import_module("apps", path.join(parent_dir, "apps/__init__.py"))
+    models = import_module(
+        "apps.auth.models", path.join(parent_dir, "apps/auth/models.py")
+    )
+    utils = import_module(
+        "apps.auth.utils", path.join(parent_dir, "apps/auth/utils.py")
+    )
+    return models, utils
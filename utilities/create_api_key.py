@@ -0,0 +1,108 @@
+"""Utility script to create or revoke an API key of a user.
+
+This script creates a long-lived API key for a user of the database, to be used as a
+bearer token instead of the one returned by the `/token` endpoint. The key is printed
+once and only its hashed version is stored, so it cannot be retrieved afterwards.
+
+With `--revoke <prefix>`, the script instead revokes the API key with the given prefix
+(i.e. the part between `sgz_` and the next `_`). The revocation takes effect within the
+time set by the `AUTH_CACHE_TTL` environment variable.
+
+Usage:
+    python utilities/create_api_key.py USERNAME [--name NAME]
+    python utilities/create_api_key.py --revoke PREFIX
+"""
+
+import argparse
+import sys
+from os import chdir, path
+
+# Found next to the scripts, which are run from their directory
+from bootstrap import (  # pylint: disable=import-error
+    import_auth_modules,
+    parent_dir,
+)
+from sqlmodel import Session, SQLModel, create_engine, select
+
+# Import dynamically `ApiKey` and `User` models (ORM) and `create_api_key` function
+models, utils = import_auth_modules()
+ApiKey = models.ApiKey
+User = models.User
+create_api_key = utils.create_api_key
+
+DATABASE_FILE = "database/user.db"
+
+
+def create_user_api_key(username: str, name: str) -> None:
+    """Creates an API key for a user and prints it.
+
+    If the user does not exist, the script exits with a code 1.
+
+    Args:
+        username (str): The username of the owner of the API key.
+        name (str): A name describing the API key (e.g. the service using it).
+    """
+    engine = create_engine(f"sqlite:///{DATABASE_FILE}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = session.exec(select(User).where(User.username == username)).first()
+        if user is None:
+            print(f"User '{username}' not found.")
+            sys.exit(1)
+        api_key, prefix, hashed_key = create_api_key()
+        session.add(
+            ApiKey(prefix=prefix, hashed_key=hashed_key, name=name, user_id=user.id)
+        )
+        session.commit()
+
+    print(f"API key of '{username}' (prefix '{prefix}'), shown only once:")
+    print(api_key)
+
+
+def revoke_api_key(prefix: str) -> None:
+    """Revokes the API key with the given prefix.
+
+    If the API key does not exist, the script exits with a code 1.
+
+    Args:
+        prefix (str): The prefix of the API key to revoke.
+    """
+    engine = create_engine(f"sqlite:///{DATABASE_FILE}")
+    with Session(engine) as session:
+        api_key = session.exec(select(ApiKey).where(ApiKey.prefix == prefix)).first()
+        if api_key is None:
+            print(f"API key with prefix '{prefix}' not found.")
+            sys.exit(1)
+        api_key.revoked = True
+        session.add(api_key)
+        session.commit()
+
+    print(f"API key with prefix '{prefix}' revoked.")
+
+
+def main() -> None:
+    """Runs the script."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("username", nargs="?", help="owner of the API key to create")
+    parser.add_argument("--name", default="", help="name describing the API key")
+    parser.add_argument("--revoke", metavar="PREFIX", help="prefix of a key to revoke")
+    args = parser.parse_args()
+    if (args.username is None) == (args.revoke is None):
+        parser.error("either a username or --revoke is required")
+
+    # Change the working directory to the script's parent directory
+    # Thus the script can be executed from anywhere
+    chdir(parent_dir)
+
+    if not path.exists(DATABASE_FILE):
+        print("Database does not exist.")
+        sys.exit(1)
+
+    if args.revoke is None:
+        create_user_api_key(args.username, args.name)
+    else:
+        revoke_api_key(args.revoke)
+
+
+if __name__ == "__main__":
+    main()
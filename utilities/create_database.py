@@ -2,94 +2,242 @@
 
 This script creates a simple database with fake users to test the app. It is not
 intended for production use.
+
+With `--bulk <file>`, the script instead provisions the users listed in a CSV file
+(with a header row) or a JSON Lines file (with a `.jsonl` extension), each having a
+`username`, an `email`, a `password` and an optional `disabled` field. Passwords are
+hashed in parallel across a pool of processes and users are inserted in batched
+transactions, updating the users that already exist (the last row of a username listed
+several times wins). A file missing a required field exits the script with a code 1.
+
+Usage:
+    python utilities/create_database.py [--bulk FILE] [--batch-size N] [--workers N]
 """
 
+import argparse
+import csv
+import json
 import sys
-from importlib.util import module_from_spec, spec_from_file_location
-from os import chdir, makedirs, path
-from types import ModuleType
-
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import batched
+from os import chdir, cpu_count, makedirs, path
+from time import perf_counter
+from typing import Any
+
+# Found next to the scripts, which are run from their directory
+from bootstrap import (  # pylint: disable=import-error
+    import_auth_modules,
+    parent_dir,
+)
+from sqlalchemy.dialects.sqlite import insert
 from sqlmodel import Session, SQLModel, create_engine
 
+# Import dynamically `User` model (ORM) and `get_password_hash` function
+models, utils = import_auth_modules()
+User = models.User
+get_password_hash = utils.get_password_hash
 
-def import_module(module_name: str, file_path: str) -> ModuleType:
-    """Dynamically imports a Python module from a file path.
+DATABASE_FILE = "database/user.db"
 
-    Dynamically imports a Python module from a given file path. If the module
-    cannot be imported, the script exits with a code 1.
+# Fields each user to provision must have, `disabled` being optional
+REQUIRED_FIELDS = ("username", "email", "password")
 
-    Args:
-        module_name (str): The name of the module to import.
-        file_path (str): The path to the Python file containing the module.
 
-    Returns:
-        The imported module.
+def create_fake_users() -> None:
+    """Creates the database with fake users, prompting for their passwords.
+
+    If the database already exists, the script exits with a code 1.
+    """
+    # Check if 'database/user.db' already exists
+    if path.exists(DATABASE_FILE):
+        print("Database already exists.")
+        sys.exit(1)
+
+    # Create the 'database/user.db' database
+    # Here we create a simple database (SQLite) for the development environment
+    # In production, we should use a better database (e.g. PostgreSQL)
+    engine = create_engine(f"sqlite:///{DATABASE_FILE}")
+    SQLModel.metadata.create_all(engine)
+
+    # Fake user list
+    fake_users = [
+        {
+            "username": "jd",
+            "email": "jd@stargazer.com",
+            "disabled": False,
+        },
+        {
+            "username": "sileht",
+            "email": "sileht@stargazer.com",
+            "disabled": False,
+        },
+        {
+            "username": "aurele",
+            "email": "aurele@stargazer.com",
+            "disabled": True,
+        },
+    ]
+
+    # Insert fake users into the 'database/users.db' database
+    with Session(engine) as session:
+        for i, fake_user in enumerate(fake_users):
+            print(f"Creating fake user {i + 1}/{len(fake_users)}...")
+            password = input(f"Enter the password for '{fake_user['username']}': ")
+            fake_user["hashed_password"] = get_password_hash(password)
+            session.add(User(**fake_user))
+        session.commit()
+
+    print("Database and fake users created successfully.")
+
+
+def check_fields(fields: Iterable[str], location: str) -> None:
+    """Checks that the required fields of the users to provision are present.
+
+    If any is missing, the script exits with a code 1.
+
+    Args:
+        fields (Iterable[str]): The fields present.
+        location (str): Where the fields were read (e.g. the header of the file), for
+        the error message.
     """
-    spec = spec_from_file_location(module_name, file_path)
-    if spec is None or spec.loader is None:
-        print(f"Unable to import the '{module_name}' module.")
+    present = set(fields)
+    missing = [field for field in REQUIRED_FIELDS if field not in present]
+    if missing:
+        print(f"Missing {', '.join(missing)} in {location}.")
         sys.exit(1)
-    module = module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-    return module
 
 
-parent_dir = path.abspath(path.join(path.dirname(__file__), ".."))
+def read_users(file_path: str) -> Iterator[dict[str, Any]]:
+    """Reads the users to provision from a CSV or a JSON Lines file.
 
-# Import dynamically `User` model (ORM) and `get_password_hash` function
-_ = import_module("stargazer", path.join(parent_dir, "stargazer/__init__.py"))
-_ = import_module("apps", path.join(parent_dir, "apps/__init__.py"))
-models = import_module("apps.auth.models", path.join(parent_dir, "apps/auth/models.py"))
-utils = import_module("apps.auth.utils", path.join(parent_dir, "apps/auth/utils.py"))
-User = models.User
-get_password_hash = utils.get_password_hash
+    The header of a CSV file is checked before any user is read, and each user is
+    checked as it is read. If a required field is missing, the script exits with a
+    code 1.
 
-# Change the working directory to the script's parent directory
-# Thus the script can be executed from anywhere
-chdir(parent_dir)
+    Args:
+        file_path (str): The path to the file, read as JSON Lines if its extension is
+        `.jsonl`, otherwise as CSV with a header row.
 
-# Create the 'database' folder if not present
-makedirs("database", exist_ok=True)
+    Yields:
+        dict[str, Any]: The users, with a `username`, an `email`, a `password` and a
+        `disabled` field.
+    """
+    with open(file_path, encoding="utf-8", newline="") as file:
+        rows: Iterator[tuple[int, dict[str, Any]]]
+        if file_path.endswith(".jsonl"):
+            rows = (
+                (number, json.loads(line))
+                for number, line in enumerate(file, 1)
+                if line.strip()
+            )
+        else:
+            reader = csv.DictReader(file)
+            check_fields(reader.fieldnames or [], f"the header of {file_path}")
+            rows = ((reader.line_num, row) for row in reader)
+        for number, row in rows:
+            # Short rows of a CSV file have their last fields set to None
+            check_fields(
+                (field for field, value in row.items() if value is not None),
+                f"line {number} of {file_path}",
+            )
+            disabled = row.get("disabled", False)
+            if isinstance(disabled, str):
+                disabled = disabled.strip().lower() in ("1", "true", "yes")
+            yield {
+                "username": row["username"],
+                "email": row["email"],
+                "password": row["password"],
+                "disabled": bool(disabled),
+            }
+
+
+def provision_users(file_path: str, batch_size: int, workers: int | None) -> None:
+    """Provisions the users listed in a file, updating the ones that already exist.
+
+    Passwords are hashed in parallel across a pool of processes, while users are
+    inserted in one transaction per batch. The number of distinct users written and the
+    throughput are reported once done, the rows of a username listed several times
+    being merged into one user.
 
-# Check if 'database/user.db' already exists
-DATABASE_FILE = "database/user.db"
-if path.exists(DATABASE_FILE):
-    print("Database already exists.")
-    sys.exit(1)
-
-# Create the 'database/user.db' database
-# Here we create a simple database (SQLite) for the development environment
-# In production, we should use a better database (e.g. PostgreSQL)
-engine = create_engine(f"sqlite:///{DATABASE_FILE}")
-SQLModel.metadata.create_all(engine)
-
-# Fake user list
-fake_users = [
-    {
-        "username": "jd",
-        "email": "jd@stargazer.com",
-        "disabled": False,
-    },
-    {
-        "username": "sileht",
-        "email": "sileht@stargazer.com",
-        "disabled": False,
-    },
-    {
-        "username": "aurele",
-        "email": "aurele@stargazer.com",
-        "disabled": True,
-    },
-]
-
-# Insert fake users into the 'database/users.db' database
-with Session(engine) as session:
-    for i, fake_user in enumerate(fake_users):
-        print(f"Creating fake user {i + 1}/{len(fake_users)}...")
-        password = input(f"Enter the password for '{fake_user['username']}': ")
-        fake_user["hashed_password"] = get_password_hash(password)
-        session.add(User(**fake_user))
-    session.commit()
-
-print("Database and fake users created successfully.")
+    Args:
+        file_path (str): The path to the CSV or JSON Lines file listing the users.
+        batch_size (int): The number of users inserted per transaction.
+        workers (int | None): The number of processes hashing passwords, or None to
+        use one per CPU.
+    """
+    engine = create_engine(f"sqlite:///{DATABASE_FILE}")
+    SQLModel.metadata.create_all(engine)
+
+    workers = workers or cpu_count() or 1
+    start = perf_counter()
+    rows_read = 0
+    usernames: set[str] = set()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for batch in batched(read_users(file_path), batch_size):
+            hashed_passwords = executor.map(
+                get_password_hash,
+                [user.pop("password") for user in batch],
+                chunksize=max(1, len(batch) // (4 * workers)),
+            )
+            rows = [
+                {**user, "hashed_password": hashed_password}
+                for user, hashed_password in zip(batch, hashed_passwords)
+            ]
+            statement = insert(User).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=["username"],
+                set_={
+                    "email": statement.excluded.email,
+                    "disabled": statement.excluded.disabled,
+                    "hashed_password": statement.excluded.hashed_password,
+                },
+            )
+            with engine.begin() as connection:
+                connection.execute(statement)
+            rows_read += len(rows)
+            usernames.update(row["username"] for row in rows)
+            elapsed = perf_counter() - start
+            print(
+                f"Provisioned {len(usernames)} users "
+                f"({rows_read / elapsed:.1f} rows/s)...",
+                flush=True,
+            )
+
+    elapsed = perf_counter() - start
+    print(
+        f"{len(usernames)} users provisioned from {rows_read} rows in {elapsed:.1f} s "
+        f"({rows_read / elapsed if elapsed else 0:.1f} rows/s)."
+    )
+
+
+def main() -> None:
+    """Runs the script."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--bulk", metavar="FILE", help="CSV or JSON Lines file of users to provision"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=500, help="users inserted per transaction"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="processes hashing passwords"
+    )
+    args = parser.parse_args()
+    bulk_file = path.abspath(args.bulk) if args.bulk else None
+
+    # Change the working directory to the script's parent directory
+    # Thus the script can be executed from anywhere
+    chdir(parent_dir)
+
+    # Create the 'database' folder if not present
+    makedirs("database", exist_ok=True)
+
+    if bulk_file is None:
+        create_fake_users()
+    else:
+        provision_users(bulk_file, max(1, args.batch_size), args.workers)
+
+
+if __name__ == "__main__":
+    main()